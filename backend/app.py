@@ -1,24 +1,41 @@
-from flask import Flask, jsonify, request, send_from_directory, session, send_file
+from flask import Flask, jsonify, request, send_from_directory, session, send_file, g, has_app_context
 from flask_cors import CORS
 import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
 import os
 from datetime import date
 from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
 from functools import wraps
-import subprocess
-import shutil
 import time
 from datetime import datetime, timedelta
 import uuid
 import re
 import io
+import json
+import hashlib
+import mimetypes
+import heapq
+import threading
+import tempfile
+import zlib
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
 
 # Import F-1.03 module
 F103_AVAILABLE = False
 f103_bp = None
 
 try:
-    from f103 import f103_bp
+    import fcntl  # Kunci file sesi upload bertahap (tidak tersedia di Windows)
+except ImportError:
+    fcntl = None
+
+try:
+    from f103 import f103_bp, RenderBusyError, RenderTimeoutError
     F103_AVAILABLE = True
     print("✅ F-1.03 module loaded successfully")
 except ImportError as e:
@@ -27,6 +44,11 @@ except ImportError as e:
     F103_AVAILABLE = False
     f103_bp = None
 
+from backup import (backup_arsip_incremental, dump_database, file_sha256, iter_archive_files, job_dict,
+                    BackupJobRunner, MemoryJobStore)
+from arsip_pdf import (check_dependencies, convert_settings, describe_archive_file, file_extension, merge_to_pdf,
+                       optimize_enabled, optimize_settings, optimize_pdf_safely, optimize_arsip_tree)
+
 # Inisialisasi aplikasi Flask
 app = Flask(
     __name__,
@@ -39,7 +61,9 @@ CORS(app,
      supports_credentials=True, 
      origins='*',  # Allow all origins
      allow_headers=['Content-Type', 'Authorization'],
-     methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
+     methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'],
+     expose_headers=['Content-Disposition', 'X-Total-Count', 'X-Total-Estimated',
+                     'X-Batch-Total', 'X-Batch-Succeeded', 'X-Batch-Failed', 'X-Batch-Errors'])
 
 # Konfigurasi
 UPLOAD_FOLDER = os.getenv('ARSIP_UPLOAD_FOLDER', './arsip')
@@ -52,13 +76,43 @@ app.secret_key = os.getenv('APP_SECRET_KEY', 'sicakap_secret_key_yang_sangat_ama
 SESSION_TIMEOUT = 3600   # 120 seconds total session time
 WARNING_TIME = 3000       # 115 seconds warning before timeout
 
+# Batas kolom pencatatan: reg_number INTEGER, service_code VARCHAR(10)
+PG_INT_MAX = 2147483647
+SERVICE_CODE_MAX_LENGTH = 10
+
 def allowed_file(filename):
     """Mengecek apakah ekstensi file diizinkan."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def validate_arsip_registration(reg_date, reg_number):
+    """Validasi tanggal dan nomor registrasi di nama file arsip; pesan error atau None."""
+    if reg_date:
+        try:
+            datetime.strptime(str(reg_date).replace('-', ''), '%Y%m%d')
+        except ValueError:
+            return 'Tanggal registrasi tidak valid (gunakan YYYY-MM-DD)'
+    if not re.match(r'^\d{1,10}$', str(reg_number or '')) or not 0 < int(reg_number) <= PG_INT_MAX:
+        return 'Nomor registrasi wajib berupa angka'
+    return None
+
+def validate_arsip_upload(reg_date, reg_number, nik):
+    """Validasi field yang membentuk nama file arsip; pesan error atau None."""
+    field_error = validate_arsip_registration(reg_date, reg_number)
+    if field_error:
+        return field_error
+    if not re.match(r'^\d{16}$', str(nik or '')):
+        return 'NIK wajib 16 digit angka'
+    return None
+
 # --- Koneksi Database ---
-def get_db_connection():
-    """Membuat koneksi ke database PostgreSQL."""
+# Ukuran pool dan batas waktu tunggu koneksi (dapat diatur lewat environment)
+PG_POOL_MIN = int(os.getenv('PG_POOL_MIN', '2'))
+PG_POOL_MAX = int(os.getenv('PG_POOL_MAX', '10'))
+PG_POOL_TIMEOUT = float(os.getenv('PG_POOL_TIMEOUT', '10'))
+PG_POOL_CHECK_IDLE = float(os.getenv('PG_POOL_CHECK_IDLE', '30'))  # Cek koneksi yang idle lebih lama dari ini (detik)
+
+def _connect_db():
+    """Membuat koneksi baru ke database PostgreSQL."""
     try:
         conn = psycopg2.connect(
             dbname=os.getenv('PG_DB', 'sicakap_db'),
@@ -72,6 +126,393 @@ def get_db_connection():
         print(f"Database connection error: {e}")
         raise Exception(f"Cannot connect to database: {e}")
 
+class DatabasePool:
+    """Pool koneksi PostgreSQL yang thread-safe dengan batas maksimum koneksi."""
+
+    def __init__(self, minconn, maxconn, timeout):
+        self.minconn = max(0, minconn)
+        self.maxconn = max(1, maxconn, self.minconn)
+        self.timeout = timeout
+        self._idle = []  # [(conn, waktu_kembali)]
+        self._in_use = 0
+        self._waiters = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'discarded': 0,
+            'total_wait_time': 0.0,
+            'max_wait_time': 0.0
+        }
+
+    def _is_healthy(self, conn, idle_since):
+        """Cek koneksi sebelum dipinjamkan; ping hanya jika sudah lama idle."""
+        if conn.closed:
+            return False
+        if time.time() - idle_since < PG_POOL_CHECK_IDLE:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        self._stats['discarded'] += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self):
+        """Meminjam koneksi dari pool, menunggu jika semua koneksi sedang dipakai."""
+        started = time.time()
+        with self._cond:
+            while not self._idle and self._in_use >= self.maxconn:
+                remaining = self.timeout - (time.time() - started)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise Exception(f"Database pool exhausted: {self.maxconn} koneksi sedang dipakai")
+                self._waiters += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiters -= 1
+
+            waited = time.time() - started
+            self._stats['checkouts'] += 1
+            self._stats['total_wait_time'] += waited
+            self._stats['max_wait_time'] = max(self._stats['max_wait_time'], waited)
+            # Reservasi slot dulu supaya koneksi baru bisa dibuat di luar lock
+            self._in_use += 1
+            candidate = self._idle.pop() if self._idle else None
+
+        try:
+            if candidate is not None:
+                conn, idle_since = candidate
+                if self._is_healthy(conn, idle_since):
+                    return conn
+                with self._cond:
+                    self._discard(conn)
+            return _connect_db()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def putconn(self, conn):
+        """Mengembalikan koneksi ke pool (rollback transaksi yang belum selesai)."""
+        healthy = not conn.closed
+        if healthy and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                healthy = False
+        with self._cond:
+            self._in_use -= 1
+            if healthy and len(self._idle) + self._in_use < self.maxconn:
+                self._idle.append((conn, time.time()))
+            else:
+                self._discard(conn)
+            self._cond.notify()
+
+    def warm_up(self):
+        """Membuka koneksi minimum di awal agar request pertama tidak menunggu handshake."""
+        for _ in range(self.minconn - len(self._idle)):
+            conn = _connect_db()
+            with self._cond:
+                self._idle.append((conn, time.time()))
+
+    def metrics(self):
+        with self._cond:
+            checkouts = self._stats['checkouts']
+            return {
+                'min': self.minconn,
+                'max': self.maxconn,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiters': self._waiters,
+                'checkouts': checkouts,
+                'timeouts': self._stats['timeouts'],
+                'discarded': self._stats['discarded'],
+                'avg_wait_ms': round(self._stats['total_wait_time'] / checkouts * 1000, 2) if checkouts else 0.0,
+                'max_wait_ms': round(self._stats['max_wait_time'] * 1000, 2)
+            }
+
+class PooledConnection:
+    """Pembungkus koneksi pool; close() mengembalikan koneksi ke pool, bukan menutupnya.
+
+    Koneksi milik request (scoped) dipakai bersama oleh handler dan helper,
+    sehingga close() di sana diabaikan dan koneksi baru dilepas saat teardown.
+    """
+
+    def __init__(self, pool, conn, scoped=False):
+        self._pool = pool
+        self._conn = conn
+        self._scoped = scoped
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise Exception("Koneksi database sudah dikembalikan ke pool")
+        return getattr(self._conn, name)
+
+    @property
+    def released(self):
+        return self._conn is None
+
+    def close(self):
+        if not self._scoped:
+            self.release()
+
+    def release(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.putconn(conn)
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+def get_db_pool():
+    """Membuat pool secara lazy agar import modul tidak langsung membuka koneksi."""
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                pool = DatabasePool(PG_POOL_MIN, PG_POOL_MAX, PG_POOL_TIMEOUT)
+                try:
+                    pool.warm_up()
+                except Exception as e:
+                    print(f"⚠️ Database pool warm-up failed: {e}")
+                _db_pool = pool
+    return _db_pool
+
+def get_db_connection():
+    """Mengambil koneksi dari pool; di dalam request koneksi dipakai bersama dan dilepas saat teardown."""
+    pool = get_db_pool()
+    if not has_app_context():
+        return PooledConnection(pool, pool.getconn())
+    conn = g.get('db_conn')
+    if conn is None or conn.released:
+        conn = PooledConnection(pool, pool.getconn(), scoped=True)
+        g.db_conn = conn
+    return conn
+
+@app.teardown_appcontext
+def release_db_connection(exc):
+    """Mengembalikan koneksi request ke pool setelah request selesai."""
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        conn.release()
+
+# --- Skema Database & Migrasi ---
+# Setiap migrasi dijalankan sekali dan dicatat di tabel schema_migrations.
+# Tambahkan migrasi baru di akhir daftar dengan nomor versi berikutnya.
+MIGRATIONS = [
+    (1, 'create_pencatatan', """
+        CREATE TABLE IF NOT EXISTS pencatatan (
+            id SERIAL PRIMARY KEY,
+            reg_number INTEGER NOT NULL,
+            reg_date DATE NOT NULL,
+            service_code VARCHAR(10),
+            nik VARCHAR(16) NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            phone_number VARCHAR(20),
+            email VARCHAR(255),
+            no_skpwni VARCHAR(50),
+            no_skdwni VARCHAR(50),
+            no_kk VARCHAR(50),
+            no_skbwni VARCHAR(50),
+            status VARCHAR(50) DEFAULT 'DIPROSES',
+            archive_path TEXT,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        -- NIK tidak unik karena bisa ada orang yang pindah domisili lebih dari 1x
+        ALTER TABLE pencatatan DROP CONSTRAINT IF EXISTS pencatatan_nik_key;
+    """),
+    (2, 'create_redaksi', """
+        CREATE TABLE IF NOT EXISTS redaksi (
+            id SERIAL PRIMARY KEY,
+            title VARCHAR(255) NOT NULL,
+            content TEXT NOT NULL,
+            category VARCHAR(50) DEFAULT 'umum',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        ALTER TABLE redaksi ADD COLUMN IF NOT EXISTS category VARCHAR(50) DEFAULT 'umum';
+        UPDATE redaksi SET category = 'umum' WHERE category IS NULL OR category = '';
+    """),
+    (3, 'create_user_sessions', """
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            id SERIAL PRIMARY KEY,
+            session_id VARCHAR(255) UNIQUE NOT NULL,
+            username VARCHAR(100) NOT NULL,
+            last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ip_address INET,
+            user_agent TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_user_sessions_expires_at ON user_sessions(expires_at);
+        CREATE INDEX IF NOT EXISTS idx_user_sessions_last_activity ON user_sessions(last_activity);
+    """),
+    (4, 'pencatatan_reg_date_id_index', """
+        CREATE INDEX IF NOT EXISTS idx_pencatatan_reg_date_id ON pencatatan (reg_date DESC, id DESC);
+    """),
+    (5, 'pencatatan_search_indexes', """
+        CREATE INDEX IF NOT EXISTS idx_pencatatan_nik_pattern ON pencatatan (nik varchar_pattern_ops);
+        CREATE INDEX IF NOT EXISTS idx_pencatatan_no_kk_pattern ON pencatatan (no_kk varchar_pattern_ops);
+        CREATE INDEX IF NOT EXISTS idx_pencatatan_reg_number ON pencatatan (reg_number);
+        -- pg_trgm butuh hak superuser di beberapa instalasi; jika gagal, pencarian nama tetap jalan tanpa indeks
+        DO $$
+        BEGIN
+            CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        EXCEPTION WHEN insufficient_privilege OR undefined_file THEN
+            RAISE NOTICE 'pg_trgm tidak tersedia, indeks trigram nama dilewati';
+        END $$;
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+                CREATE INDEX IF NOT EXISTS idx_pencatatan_name_trgm ON pencatatan USING gin (name gin_trgm_ops);
+            END IF;
+        END $$;
+    """),
+    (6, 'pencatatan_filter_indexes', """
+        CREATE INDEX IF NOT EXISTS idx_pencatatan_reg_date_reg_number ON pencatatan (reg_date, reg_number);
+        CREATE INDEX IF NOT EXISTS idx_pencatatan_status_reg_date ON pencatatan (status, reg_date DESC, id DESC);
+        CREATE INDEX IF NOT EXISTS idx_pencatatan_service_code_reg_date ON pencatatan (service_code, reg_date DESC, id DESC);
+        ANALYZE pencatatan;
+    """),
+    (7, 'create_reg_number_reservations', """
+        CREATE TABLE IF NOT EXISTS reg_number_reservations (
+            reg_date DATE NOT NULL,
+            reg_number INTEGER NOT NULL,
+            session_id VARCHAR(255) NOT NULL,
+            expires_at TIMESTAMP NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (reg_date, reg_number)
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_reservations_session_date ON reg_number_reservations (session_id, reg_date);
+        CREATE INDEX IF NOT EXISTS idx_reservations_expires_at ON reg_number_reservations (expires_at);
+    """),
+    (8, 'create_arsip_catalog', """
+        -- Satu baris per file di UPLOAD_FOLDER; path relatif sama dengan pencatatan.archive_path.
+        -- mtime_ns + size dipakai rekonsiliasi untuk melewati file yang tidak berubah.
+        CREATE TABLE IF NOT EXISTS arsip_catalog (
+            id SERIAL PRIMARY KEY,
+            path TEXT UNIQUE NOT NULL,
+            size BIGINT NOT NULL,
+            mtime_ns BIGINT NOT NULL,
+            sha256 CHAR(64) NOT NULL,
+            pages INTEGER,
+            mime_type VARCHAR(100),
+            pencatatan_id INTEGER REFERENCES pencatatan(id) ON DELETE SET NULL,
+            missing_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_arsip_catalog_path_pattern ON arsip_catalog (path text_pattern_ops);
+        CREATE INDEX IF NOT EXISTS idx_arsip_catalog_pencatatan_id ON arsip_catalog (pencatatan_id);
+        CREATE INDEX IF NOT EXISTS idx_arsip_catalog_sha256 ON arsip_catalog (sha256);
+        CREATE INDEX IF NOT EXISTS idx_arsip_catalog_orphan ON arsip_catalog (path) WHERE pencatatan_id IS NULL;
+        CREATE INDEX IF NOT EXISTS idx_arsip_catalog_missing ON arsip_catalog (missing_at) WHERE missing_at IS NOT NULL;
+        CREATE INDEX IF NOT EXISTS idx_pencatatan_archive_path ON pencatatan (archive_path);
+    """),
+    (9, 'create_backup_jobs', """
+        CREATE TABLE IF NOT EXISTS backup_jobs (
+            id VARCHAR(32) PRIMARY KEY,
+            kind VARCHAR(30) NOT NULL,
+            state VARCHAR(20) NOT NULL,
+            bytes_processed BIGINT DEFAULT 0,
+            created_at TIMESTAMP NOT NULL,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            output TEXT,
+            report JSONB,
+            error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_backup_jobs_created_at ON backup_jobs (created_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_backup_jobs_active ON backup_jobs (kind) WHERE state IN ('queued', 'running');
+    """),
+    (10, 'create_app_settings', """
+        CREATE TABLE IF NOT EXISTS app_settings (
+            key VARCHAR(50) PRIMARY KEY,
+            value TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """),
+    (11, 'pencatatan_substring_search_indexes', """
+        -- Pencarian substring NIK/No. KK/nomor registrasi (LIKE '%...%') lewat indeks trigram
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+                CREATE INDEX IF NOT EXISTS idx_pencatatan_nik_trgm ON pencatatan USING gin (nik gin_trgm_ops);
+                CREATE INDEX IF NOT EXISTS idx_pencatatan_no_kk_trgm ON pencatatan USING gin (no_kk gin_trgm_ops);
+                CREATE INDEX IF NOT EXISTS idx_pencatatan_reg_number_trgm
+                    ON pencatatan USING gin ((reg_number::text) gin_trgm_ops);
+            END IF;
+        END $$;
+    """),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+SCHEMA_LOCK_ID = 7210301  # Kunci advisory agar hanya satu worker yang menjalankan migrasi
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def ensure_schema(force=False):
+    """Menjalankan migrasi yang belum diterapkan; hasilnya di-cache per proses."""
+    global _schema_ready
+    if _schema_ready and not force:
+        return []
+    with _schema_lock:
+        if _schema_ready and not force:
+            return []
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_ID,))
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(100) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.execute("SELECT version FROM schema_migrations")
+            done = set(row[0] for row in cur.fetchall())
+            applied = []
+            for version, name, sql in MIGRATIONS:
+                if version in done:
+                    continue
+                cur.execute(sql)
+                cur.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (version, name)
+                )
+                applied.append(f"{version}_{name}")
+            conn.commit()
+            if applied:
+                print(f"✅ Schema migrated to version {SCHEMA_VERSION}: {', '.join(applied)}")
+            _schema_ready = True
+            return applied
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
+def require_schema():
+    """Dipanggil handler sebelum query; tanpa round-trip ke database setelah skema siap."""
+    if not _schema_ready:
+        ensure_schema()
+
 # --- Otentikasi & Otorisasi ---
 def login_required(f):
     """Decorator untuk melindungi rute yang memerlukan login."""
@@ -122,13 +563,10 @@ def logout():
     # Release any booked numbers for this session
     session_id = session.get('session_id')
     if session_id:
-        numbers_to_release = []
-        for reg_num, booking in booked_numbers.items():
-            if booking['session_id'] == session_id:
-                numbers_to_release.append(reg_num)
-        
-        for reg_num in numbers_to_release:
-            del booked_numbers[reg_num]
+        try:
+            booking_store.release_session(session_id)
+        except Exception as e:
+            print(f"Release bookings on logout error: {str(e)}")
     
     session.clear()
     return jsonify({'message': 'Logout berhasil'})
@@ -218,107 +656,243 @@ def validate_pencatatan(data):
     return errors
 
 # --- Endpoint Statistik ---
-@app.route('/api/statistik', methods=['GET'])
-@login_required
-def statistik():
+# Cache ringan untuk dashboard: banyak loket me-refresh statistik bersamaan,
+# jadi hasil agregasi disimpan sebentar dan dibuang setiap ada perubahan data.
+STATISTIK_CACHE_TTL = float(os.getenv('STATISTIK_CACHE_TTL', '30'))
+_statistik_cache = {}  # {tanggal_iso: (waktu_simpan, hasil)}
+_statistik_cache_lock = threading.Lock()
+_statistik_generation = 0  # naik setiap invalidasi; hasil hitungan generasi lama tidak disimpan
+
+def invalidate_statistik_cache():
+    """Menghapus cache statistik setelah data pencatatan berubah."""
+    global _statistik_generation
+    with _statistik_cache_lock:
+        _statistik_generation += 1
+        _statistik_cache.clear()
+
+def compute_statistik(today):
+    """Menghitung semua angka dashboard dengan satu kali scan tabel pencatatan."""
+    conn = get_db_connection()
+    cur = conn.cursor()
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Check if table exists first
-        cur.execute("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = 'pencatatan');")
-        table_exists = cur.fetchone()[0]
-        
-        if not table_exists:
-            # Return empty stats if table doesn't exist
-            return jsonify({
-                'total': 0,
-                'per_status': {},
-                'per_service': {},
-                'hari_ini': 0
-            })
-        
-        # Get statistics
-        cur.execute("SELECT COUNT(*) FROM pencatatan")
-        total = cur.fetchone()[0]
-        
-        cur.execute("SELECT status, COUNT(*) FROM pencatatan GROUP BY status")
-        status_rows = cur.fetchall()
-        per_status = dict(status_rows) if status_rows else {}
-        
-        cur.execute("SELECT service_code, COUNT(*) FROM pencatatan GROUP BY service_code")
-        service_rows = cur.fetchall()
-        per_service = dict(service_rows) if service_rows else {}
-        
-        cur.execute("SELECT COUNT(*) FROM pencatatan WHERE reg_date = %s", (date.today(),))
-        hari_ini = cur.fetchone()[0]
-        
-        cur.close()
-        conn.close()
-        
-        return jsonify({
+        cur.execute("""
+            SELECT
+                GROUPING(status) AS by_status,
+                GROUPING(service_code) AS by_service,
+                status,
+                service_code,
+                COUNT(*),
+                COUNT(*) FILTER (WHERE reg_date = %s)
+            FROM pencatatan
+            GROUP BY GROUPING SETS ((), (status), (service_code))
+        """, (today,))
+        total = 0
+        hari_ini = 0
+        per_status = {}
+        per_service = {}
+        for by_status, by_service, status, service_code, count, count_today in cur.fetchall():
+            if by_status and by_service:
+                total = count
+                hari_ini = count_today
+            elif not by_status:
+                per_status[status] = count
+            else:
+                per_service[service_code] = count
+        return {
             'total': total,
             'per_status': per_status,
             'per_service': per_service,
             'hari_ini': hari_ini
-        })
+        }
+    finally:
+        cur.close()
+        conn.close()
+
+@app.route('/api/statistik', methods=['GET'])
+@login_required
+def statistik():
+    try:
+        require_schema()
+        today = date.today().isoformat()
+        now = time.time()
+        with _statistik_cache_lock:
+            cached = _statistik_cache.get(today)
+            generation = _statistik_generation
+        if cached and now - cached[0] < STATISTIK_CACHE_TTL:
+            return jsonify(cached[1])
+
+        result = compute_statistik(today)
+        with _statistik_cache_lock:
+            # Data berubah selama menghitung: hasil ini mungkin sudah basi, jangan di-cache
+            if generation == _statistik_generation:
+                # Entri tanggal lain sudah tidak terpakai setelah pergantian hari
+                _statistik_cache.clear()
+                _statistik_cache[today] = (now, result)
+        return jsonify(result)
     except Exception as e:
         print(f"Statistik error: {str(e)}")
         return jsonify({'error': f'Database error: {str(e)}'}), 500
 
 # --- Rute API (CRUD Pencatatan) ---
+PENCATATAN_MAX_PER_PAGE = int(os.getenv('PENCATATAN_MAX_PER_PAGE', '1000'))
+PENCATATAN_EXACT_COUNT_LIMIT = int(os.getenv('PENCATATAN_EXACT_COUNT_LIMIT', '10000'))
+
+def build_search_filter(search):
+    """Menyusun filter pencarian substring yang bisa memakai indeks.
+
+    - hanya angka (spasi diabaikan): 16 digit dicocokkan persis ke NIK/No. KK lewat indeks
+      btree; kurang dari itu dicari sebagai bagian NIK, No. KK, atau nomor registrasi
+    - teks yang mengandung angka (mis. "3201-12"): dicari di nama, NIK, No. KK, dan nomor
+      registrasi apa adanya
+    - teks tanpa angka: dicari sebagai bagian nama
+    LIKE '%...%' didukung indeks trigram (migrasi 5 dan 11) jika pg_trgm terpasang.
+    """
+    term = search.strip()
+    if re.fullmatch(r'[\d\s]+', term):
+        # Spasi hanya dibuang jika seluruh isian angka, mis. NIK yang diketik berkelompok
+        digits = re.sub(r'\s+', '', term)
+        if len(digits) == 16:
+            # NIK / No. KK lengkap: cukup pencocokan persis
+            return "(nik = %s OR no_kk = %s)", [digits, digits]
+        pattern = f"%{digits}%"
+        return "(nik LIKE %s OR no_kk LIKE %s OR reg_number::text LIKE %s)", [pattern, pattern, pattern]
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    pattern = f"%{escaped}%"
+    if re.search(r'\d', term):
+        return ("(name ILIKE %s OR nik LIKE %s OR no_kk LIKE %s OR reg_number::text LIKE %s)",
+                [pattern, pattern, pattern, pattern])
+    return "name ILIKE %s", [pattern]
+
+def build_pencatatan_filters(params):
+    """Menyusun klausa WHERE dan nilai parameternya dari query string daftar pencatatan."""
+    search = params.get('search')
+    status = params.get('status')
+    service_code = params.get('service_code')
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+
+    where = "TRUE"
+    values = []
+    if search:
+        search_sql, search_values = build_search_filter(search)
+        where += f" AND {search_sql}"
+        values += search_values
+    if status:
+        where += " AND status = %s"
+        values.append(status)
+    if service_code:
+        where += " AND service_code = %s"
+        values.append(service_code)
+    if start_date:
+        where += " AND reg_date >= %s"
+        values.append(start_date)
+    if end_date:
+        where += " AND reg_date <= %s"
+        values.append(end_date)
+    return where, values
+
+def build_pencatatan_page_query(where, values, per_page, offset=0, after=None, cursor_mode=False):
+    """Query satu halaman daftar pencatatan (juga dipakai tes rencana eksekusi)."""
+    query = f"SELECT * FROM pencatatan WHERE {where}"
+    values = list(values)
+    if cursor_mode:
+        # Seek lewat indeks (reg_date, id) sehingga halaman dalam tetap cepat
+        if after:
+            query += " AND (reg_date, id) < (%s, %s)"
+            values += [after[0], after[1]]
+        query += " ORDER BY reg_date DESC, id DESC LIMIT %s"
+        values.append(per_page + 1)
+    else:
+        query += " ORDER BY reg_date DESC, id DESC LIMIT %s OFFSET %s"
+        values += [per_page, offset]
+    return query, values
+
+def parse_pencatatan_cursor(token):
+    """Mengurai token cursor 'YYYY-MM-DD,id' menjadi (reg_date, id)."""
+    try:
+        reg_date_str, id_str = token.split(',', 1)
+        return datetime.strptime(reg_date_str.strip(), '%Y-%m-%d').date(), int(id_str)
+    except ValueError:
+        raise ValueError('Format cursor tidak valid (gunakan YYYY-MM-DD,id)')
+
+def count_pencatatan(cur, where, values):
+    """Menghitung total baris; memakai estimasi planner jika hasilnya besar."""
+    cur.execute(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM pencatatan WHERE {where}", tuple(values))
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = int(plan[0]['Plan']['Plan Rows'])
+    if estimate > PENCATATAN_EXACT_COUNT_LIMIT:
+        return estimate, True
+    cur.execute(f"SELECT COUNT(*) FROM pencatatan WHERE {where}", tuple(values))
+    return cur.fetchone()[0], False
+
 @app.route('/api/pencatatan', methods=['GET'])
 @login_required
 def get_pencatatan():
     try:
         # Mendukung filter: ?search=...&status=...&service_code=...&start_date=...&end_date=...
+        # Mode halaman: ?page=...&per_page=... (mengembalikan list seperti sebelumnya)
+        # Mode cursor: ?after=YYYY-MM-DD,id (kosongkan untuk halaman pertama) -> {data, next_cursor}
         params = request.args
-        search = params.get('search')
-        status = params.get('status')
-        service_code = params.get('service_code')
-        start_date = params.get('start_date')
-        end_date = params.get('end_date')
-        page = int(params.get('page', 1))
-        per_page = int(params.get('per_page', 20))
+        try:
+            page = max(1, int(params.get('page', 1)))
+            per_page = int(params.get('per_page', 20))
+        except ValueError:
+            return jsonify({'error': 'Parameter page/per_page harus berupa angka'}), 400
+        per_page = min(max(1, per_page), PENCATATAN_MAX_PER_PAGE)
         offset = (page - 1) * per_page
+        cursor_mode = 'after' in params or params.get('cursor') in ('1', 'true')
+        with_total = params.get('with_total') in ('1', 'true')
+
+        after = None
+        if cursor_mode and params.get('after'):
+            try:
+                after = parse_pencatatan_cursor(params.get('after'))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
 
+        require_schema()
         conn = get_db_connection()
         cur = conn.cursor()
-        
-        # Check if table exists
-        cur.execute("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = 'pencatatan');")
-        table_exists = cur.fetchone()[0]
-        
-        if not table_exists:
-            return jsonify([])
-
-        query = "SELECT * FROM pencatatan WHERE TRUE"
-        values = []
-        if search:
-            query += " AND (nik ILIKE %s OR name ILIKE %s OR CAST(reg_number AS TEXT) ILIKE %s)"
-            values += [f"%{search}%", f"%{search}%", f"%{search}%"]
-        if status:
-            query += " AND status = %s"
-            values.append(status)
-        if service_code:
-            query += " AND service_code = %s"
-            values.append(service_code)
-        if start_date:
-            query += " AND reg_date >= %s"
-            values.append(start_date)
-        if end_date:
-            query += " AND reg_date <= %s"
-            values.append(end_date)
-        query += " ORDER BY reg_date DESC, id DESC LIMIT %s OFFSET %s"
-        values += [per_page, offset]
 
+        where, values = build_pencatatan_filters(params)
+        total = None
+        total_estimated = False
+        if with_total:
+            total, total_estimated = count_pencatatan(cur, where, values)
+
+        query, values = build_pencatatan_page_query(where, values, per_page, offset, after, cursor_mode)
         cur.execute(query, tuple(values))
         rows = cur.fetchall()
         columns = [desc[0] for desc in cur.description]
-        data = [dict(zip(columns, row)) for row in rows]
         cur.close()
         conn.close()
-        return jsonify(data)
+
+        if not cursor_mode:
+            data = [dict(zip(columns, row)) for row in rows]
+            response = jsonify(data)
+            if total is not None:
+                response.headers['X-Total-Count'] = str(total)
+                response.headers['X-Total-Estimated'] = 'true' if total_estimated else 'false'
+            return response
+
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        data = [dict(zip(columns, row)) for row in rows]
+        next_cursor = None
+        if has_more and data:
+            last = data[-1]
+            next_cursor = f"{last['reg_date'].isoformat()},{last['id']}"
+        result = {
+            'data': data,
+            'next_cursor': next_cursor,
+            'per_page': per_page
+        }
+        if total is not None:
+            result['total'] = total
+            result['total_estimated'] = total_estimated
+        return jsonify(result)
     except Exception as e:
         print(f"Get pencatatan error: {str(e)}")
         return jsonify({'error': f'Database error: {str(e)}'}), 500
@@ -367,7 +941,11 @@ def create_pencatatan():
             data.get('no_skbwni'), data.get('status', 'DIPROSES'), archive_path, data.get('notes')
         ))
         new_id = cur.fetchone()[0]
+        link_catalog_pencatatan(cur, new_id, archive_path)
         conn.commit()
+        invalidate_statistik_cache()
+        if data.get('reg_date') and str(data.get('reg_number') or '').isdigit():
+            booking_store.mark_used(data['reg_date'], int(data['reg_number']))
         return jsonify({'message': 'Data berhasil ditambahkan', 'id': new_id})
     except Exception as e:
         conn.rollback()
@@ -393,7 +971,12 @@ def update_pencatatan(id):
             data.get('phone_number'), data.get('email'), data.get('no_skpwni'), data.get('no_skdwni'), data.get('no_kk'),
             data.get('no_skbwni'), data.get('status', 'DIPROSES'), data.get('archive_path'), data.get('notes'), id
         ))
+        if cur.rowcount:
+            link_catalog_pencatatan(cur, id, data.get('archive_path'))
         conn.commit()
+        invalidate_statistik_cache()
+        # Nomor/tanggal lama tidak diketahui di sini; heap nomor bebas diisi ulang
+        booking_store.forget_free_numbers()
         return jsonify({'message': 'Data berhasil diperbarui'})
     except Exception as e:
         conn.rollback()
@@ -410,6 +993,8 @@ def delete_pencatatan(id):
     try:
         cur.execute("DELETE FROM pencatatan WHERE id=%s", (id,))
         conn.commit()
+        invalidate_statistik_cache()
+        booking_store.forget_free_numbers()
         return jsonify({'message': 'Data berhasil dihapus'})
     except Exception as e:
         conn.rollback()
@@ -423,16 +1008,10 @@ def delete_pencatatan(id):
 @login_required
 def get_all_redaksi():
     try:
+        require_schema()
         conn = get_db_connection()
         cur = conn.cursor()
         
-        # Check if redaksi table exists
-        cur.execute("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = 'redaksi');")
-        table_exists = cur.fetchone()[0]
-        
-        if not table_exists:
-            return jsonify([])
-        
         cur.execute("SELECT * FROM redaksi ORDER BY id DESC")
         rows = cur.fetchall()
         columns = [desc[0] for desc in cur.description]
@@ -515,48 +1094,256 @@ def delete_redaksi(id):
         cur.close()
         conn.close()
 
-# --- Backup Database ---
+# --- Backup (dijalankan sebagai job latar) ---
+BACKUP_FOLDER = os.getenv('BACKUP_FOLDER', './backup')
+JOB_LOCK_ID = 7210303  # Kunci advisory job latar: (JOB_LOCK_ID, crc32 jenis job)
+JOB_HISTORY = 50
+JOB_COLUMNS = ("id, kind, state, bytes_processed, created_at, started_at, finished_at, "
+               "output, report, error")
+
+class DatabaseJobStore:
+    """Status job di tabel backup_jobs sehingga bisa dibaca dari worker mana pun.
+
+    Satu job aktif per jenis dijaga pg_try_advisory_lock pada koneksi khusus yang dipegang
+    selama job berjalan; jika proses mati, lock ikut lepas bersama koneksinya.
+    """
+
+    def __init__(self, max_history=JOB_HISTORY):
+        self.max_history = max_history
+        self._conns = {}  # {job_id: (koneksi pemegang lock, lock)}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _lock_key(kind):
+        return zlib.crc32(kind.encode()) & 0x7fffffff
+
+    def try_start(self, job):
+        require_schema()
+        conn = _connect_db()
+        conn.autocommit = True
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT pg_try_advisory_lock(%s, %s)", (JOB_LOCK_ID, self._lock_key(job.kind)))
+            if not cur.fetchone()[0]:
+                conn.close()
+                return False, self._active(job.kind)
+            # Baris queued/running tanpa pemegang lock adalah sisa proses yang berhenti di tengah job
+            cur.execute("""
+                UPDATE backup_jobs SET state = 'failed', error = 'Proses berhenti sebelum job selesai',
+                    finished_at = %s
+                WHERE kind = %s AND state IN ('queued', 'running')
+            """, (datetime.now(), job.kind))
+            cur.execute(
+                "INSERT INTO backup_jobs (id, kind, state, created_at) VALUES (%s, %s, %s, %s)",
+                (job.id, job.kind, job.state, job.created_at)
+            )
+        except Exception:
+            conn.close()
+            raise
+        finally:
+            cur.close()
+        with self._lock:
+            self._conns[job.id] = (conn, threading.Lock())
+        return True, None
+
+    def _active(self, kind):
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(f"""
+                SELECT {JOB_COLUMNS} FROM backup_jobs
+                WHERE kind = %s AND state IN ('queued', 'running')
+                ORDER BY created_at DESC LIMIT 1
+            """, (kind,))
+            row = cur.fetchone()
+        finally:
+            cur.close()
+            conn.close()
+        # Lock sudah diambil worker lain tapi barisnya belum tertulis
+        return job_dict(*row) if row else {'id': None, 'kind': kind, 'state': 'queued'}
+
+    def _execute(self, job, sql, values):
+        with self._lock:
+            conn, conn_lock = self._conns.get(job.id, (None, None))
+        if conn is None:
+            return None
+        with conn_lock:
+            cur = conn.cursor()
+            try:
+                cur.execute(sql, values)
+            finally:
+                cur.close()
+        return conn
+
+    def save(self, job):
+        try:
+            self._execute(job, """
+                UPDATE backup_jobs SET state = %s, bytes_processed = %s, started_at = %s WHERE id = %s
+            """, (job.state, job.bytes_processed, job.started_at, job.id))
+        except Exception as e:
+            print(f"⚠️ Status job {job.id} gagal disimpan: {e}")
+
+    def finish(self, job):
+        try:
+            conn = self._execute(job, """
+                UPDATE backup_jobs SET state = %s, bytes_processed = %s, started_at = %s, finished_at = %s,
+                    output = %s, report = %s, error = %s
+                WHERE id = %s
+            """, (job.state, job.bytes_processed, job.started_at, job.finished_at, job.output,
+                  json.dumps(job.report, default=str) if job.report is not None else None, job.error, job.id))
+            if conn is not None:
+                self._execute(job, """
+                    DELETE FROM backup_jobs WHERE finished_at IS NOT NULL AND id NOT IN (
+                        SELECT id FROM backup_jobs ORDER BY created_at DESC LIMIT %s)
+                """, (self.max_history,))
+        except Exception as e:
+            print(f"⚠️ Status akhir job {job.id} gagal disimpan: {e}")
+        finally:
+            with self._lock:
+                conn, _ = self._conns.pop(job.id, (None, None))
+            if conn is not None:
+                # Menutup koneksi melepas advisory lock sesi meski unlock gagal
+                try:
+                    cur = conn.cursor()
+                    cur.execute("SELECT pg_advisory_unlock(%s, %s)", (JOB_LOCK_ID, self._lock_key(job.kind)))
+                    cur.close()
+                except Exception:
+                    pass
+                conn.close()
+
+    def get(self, job_id):
+        require_schema()
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(f"SELECT {JOB_COLUMNS} FROM backup_jobs WHERE id = %s", (job_id,))
+            row = cur.fetchone()
+        finally:
+            cur.close()
+            conn.close()
+        return job_dict(*row) if row else None
+
+    def list(self):
+        require_schema()
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(f"SELECT {JOB_COLUMNS} FROM backup_jobs ORDER BY created_at DESC LIMIT %s",
+                        (self.max_history,))
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+            conn.close()
+        return [job_dict(*row) for row in rows]
+
+# 'database' (default) berlaku untuk banyak worker; 'memory' hanya untuk satu proses
+JOB_STORE = os.getenv('JOB_STORE', 'database').lower()
+backup_jobs = BackupJobRunner(
+    max_workers=int(os.getenv('BACKUP_MAX_WORKERS', '2')),
+    store=MemoryJobStore(JOB_HISTORY) if JOB_STORE == 'memory' else DatabaseJobStore()
+)
+
+def _run_backup_db(job):
+    result = dump_database(BACKUP_FOLDER, progress=job.add_progress)
+    return {'output': result['file'], 'report': result}
+
+def _run_backup_arsip(job):
+    report = backup_arsip_incremental(app.config['UPLOAD_FOLDER'], BACKUP_FOLDER, progress=job.add_progress)
+    print(f"Backup arsip: {report['copied']} disalin, {report['linked']} di-link, "
+          f"{report['bytes_copied']} byte disalin, {report['bytes_skipped']} byte dilewati")
+    return {'output': report['snapshot'], 'report': report}
+
+def _enqueue_backup(kind, func, label, noun='Backup'):
+    try:
+        job, created = backup_jobs.submit(kind, func)
+    except Exception as e:
+        print(f"Enqueue job {kind} error: {str(e)}")
+        return jsonify({'error': f'{noun} {label} gagal dijadwalkan: {str(e)}'}), 500
+    if not created:
+        return jsonify({
+            'error': f'{noun} {label} masih berjalan',
+            'job_id': job['id'],
+            'job': job
+        }), 409
+    return jsonify({
+        'message': f'{noun} {label} dijadwalkan',
+        'job_id': job['id'],
+        'status_url': f"/api/backup/jobs/{job['id']}"
+    }), 202
+
 @app.route('/api/backup/db', methods=['POST'])
 @login_required
 def backup_db():
-    backup_dir = os.getenv('BACKUP_FOLDER', './backup')
-    os.makedirs(backup_dir, exist_ok=True)
-    db_name = os.getenv('PG_DB', 'sicakap_db')
-    user = os.getenv('PG_USER', 'postgres')
-    host = os.getenv('PG_HOST', 'localhost')
-    port = os.getenv('PG_PORT', '5432')
-    backup_file = os.path.join(backup_dir, f"{db_name}_backup_{date.today()}.sql")
-    try:
-        subprocess.check_call([
-            'pg_dump',
-            '-h', host,
-            '-p', port,
-            '-U', user,
-            '-F', 'c',
-            '-b',
-            '-v',
-            '-f', backup_file,
-            db_name
-        ], env={**os.environ, 'PGPASSWORD': os.getenv('PG_PASS', 'postgres')})
-        return jsonify({'message': 'Backup database berhasil', 'file': backup_file})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return _enqueue_backup('db', _run_backup_db, 'database')
 
-# --- Backup Arsip ---
 @app.route('/api/backup/arsip', methods=['POST'])
 @login_required
 def backup_arsip():
-    src = app.config['UPLOAD_FOLDER']
-    backup_dir = os.getenv('BACKUP_FOLDER', './backup')
-    os.makedirs(backup_dir, exist_ok=True)
-    dst = os.path.join(backup_dir, f"arsip_backup_{date.today()}")
+    return _enqueue_backup('arsip', _run_backup_arsip, 'arsip')
+
+# --- Optimasi PDF arsip ---
+# Setelah upload, PDF dikompres ulang (ARSIP_OPTIMIZE=1) lalu dicatat ke katalog (sha256,
+# jumlah halaman) di thread latar agar request upload tetap cepat
+arsip_optimizer = ThreadPoolExecutor(max_workers=1)
+
+def schedule_arsip_processing(entries):
+    """entries: [(archive_path, sha256 atau None)] untuk file yang baru disimpan."""
+    if entries:
+        arsip_optimizer.submit(_process_uploaded_arsip, list(entries))
+
+def _process_uploaded_arsip(entries):
     try:
-        if os.path.exists(dst):
-            shutil.rmtree(dst)
-        shutil.copytree(src, dst)
-        return jsonify({'message': 'Backup arsip berhasil', 'folder': dst})
+        catalog_entries = []
+        for archive_path, sha256 in entries:
+            full_path = get_archive_file_path(archive_path)
+            if optimize_enabled() and full_path.lower().endswith('.pdf'):
+                report = optimize_pdf_safely(full_path, **optimize_settings())
+                if report and report['optimized']:
+                    # Isi file berubah: checksum dari upload tidak berlaku lagi
+                    sha256 = None
+            catalog_entries.append((archive_path, sha256))
+        # Optimasi dulu agar file cukup di-hash sekali, dengan isi akhirnya
+        catalog_arsip_files(catalog_entries)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        print(f"⚠️ Pemrosesan arsip setelah upload gagal: {e}")
+
+def _run_optimize_arsip(job, day=None):
+    report = optimize_arsip_tree(app.config['UPLOAD_FOLDER'], day=day, progress=job.add_progress)
+    totals = report['totals']
+    print(f"Optimasi arsip: {totals['optimized']}/{totals['files']} file, hemat {totals['bytes_saved']} byte")
+    if totals['optimized']:
+        report['catalog'] = reconcile_arsip_catalog(day=day)
+    return {'output': f"{totals['bytes_saved']} byte dihemat", 'report': report}
+
+@app.route('/api/arsip/optimize', methods=['POST'])
+@login_required
+def optimize_arsip():
+    """Jalankan optimasi PDF untuk seluruh pohon arsip (atau satu folder hari) sebagai job latar."""
+    if check_dependencies():
+        return jsonify({'error': check_dependencies()}), 400
+    day = (request.get_json(silent=True) or {}).get('day')
+    if day and not re.match(r'^\d{8}$', str(day)):
+        return jsonify({'error': 'day harus berformat YYYYMMDD'}), 400
+    return _enqueue_backup('optimize', lambda job: _run_optimize_arsip(job, day), 'arsip', noun='Optimasi')
+
+@app.route('/api/backup/jobs', methods=['GET'])
+@login_required
+def list_backup_jobs():
+    try:
+        return jsonify(backup_jobs.list())
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+
+@app.route('/api/backup/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_backup_job(job_id):
+    try:
+        job = backup_jobs.get(job_id)
+    except Exception as e:
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    if not job:
+        return jsonify({'error': 'Job backup tidak ditemukan'}), 404
+    return jsonify(job)
 
 # --- Helper Functions for Archive Paths ---
 def create_archive_path(reg_date_str, filename):
@@ -595,6 +1382,250 @@ def get_archive_file_path(archive_path):
         return None
     return os.path.join(app.config['UPLOAD_FOLDER'], archive_path)
 
+# --- Katalog Arsip ---
+# arsip_catalog mencatat setiap file arsip (ukuran, sha256, halaman, mime, pencatatan) sehingga
+# pencarian dan audit file yatim/hilang cukup dengan query, bukan menelusuri folder.
+# Semua jalur upload menjadwalkan katalog lewat schedule_arsip_processing; rekonsiliasi
+# menyusulkan perubahan yang terjadi di luar aplikasi (file disalin/dihapus manual, restore backup).
+CATALOG_BATCH_SIZE = 500
+CATALOG_STATUSES = ('all', 'orphan', 'missing', 'unindexed')
+
+def _upsert_catalog(cur, rows):
+    """rows: [(archive_path, info dari describe_archive_file)]; link pencatatan lewat archive_path."""
+    # created_at memakai default (waktu dicatat); mtime bisa berubah karena optimasi PDF
+    psycopg2.extras.execute_values(cur, """
+        INSERT INTO arsip_catalog (path, size, mtime_ns, sha256, pages, mime_type)
+        VALUES %s
+        ON CONFLICT (path) DO UPDATE SET
+            size = EXCLUDED.size, mtime_ns = EXCLUDED.mtime_ns, sha256 = EXCLUDED.sha256,
+            pages = EXCLUDED.pages, mime_type = EXCLUDED.mime_type, missing_at = NULL, updated_at = NOW()
+    """, [(path, info['size'], info['mtime_ns'], info['sha256'], info['pages'], info['mime_type'])
+          for path, info in rows], page_size=CATALOG_BATCH_SIZE)
+    cur.execute("""
+        UPDATE arsip_catalog AS c SET pencatatan_id = p.id
+        FROM pencatatan AS p
+        WHERE p.archive_path = c.path AND c.path = ANY(%s) AND c.pencatatan_id IS DISTINCT FROM p.id
+    """, ([path for path, _ in rows],))
+
+def catalog_arsip_files(entries):
+    """Mencatat file arsip yang baru disimpan. entries: [(archive_path, sha256 atau None)].
+
+    Kegagalan hanya dicatat di log: upload tetap berhasil dan rekonsiliasi akan menyusul.
+    """
+    rows = []
+    for archive_path, sha256 in entries:
+        try:
+            rows.append((archive_path, describe_archive_file(get_archive_file_path(archive_path), sha256)))
+        except OSError as e:
+            print(f"⚠️ Katalog arsip: {archive_path} tidak bisa dibaca: {e}")
+    if not rows:
+        return 0
+    try:
+        require_schema()
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            _upsert_catalog(cur, rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+    except Exception as e:
+        print(f"⚠️ Katalog arsip gagal diperbarui: {e}")
+        return 0
+    return len(rows)
+
+def link_catalog_pencatatan(cur, pencatatan_id, archive_path):
+    """Dipanggil di transaksi create/update pencatatan agar link katalog ikut berpindah."""
+    cur.execute(
+        "UPDATE arsip_catalog SET pencatatan_id = NULL WHERE pencatatan_id = %s AND path IS DISTINCT FROM %s",
+        (pencatatan_id, archive_path)
+    )
+    if archive_path:
+        cur.execute(
+            "UPDATE arsip_catalog SET pencatatan_id = %s WHERE path = %s AND pencatatan_id IS DISTINCT FROM %s",
+            (pencatatan_id, archive_path, pencatatan_id)
+        )
+
+def _catalog_prefix(day):
+    """Prefix path untuk satu folder hari (yyyy/yyyymm/yyyymmdd/), '' untuk seluruh arsip."""
+    return f"{day[:4]}/{day[:6]}/{day}/" if day else ''
+
+def reconcile_arsip_catalog(day=None, progress=None):
+    """Menyamakan arsip_catalog dengan isi UPLOAD_FOLDER (seluruhnya atau satu folder hari).
+
+    Folder hanya di-stat; sha256 dan jumlah halaman dihitung ulang untuk file baru atau yang
+    ukuran/mtime-nya berubah. Baris yang filenya hilang ditandai missing_at, tidak dihapus.
+    """
+    root = app.config['UPLOAD_FOLDER']
+    prefix = _catalog_prefix(day)
+    scan_root = os.path.join(root, *prefix.strip('/').split('/')) if prefix else root
+    on_disk = {}  # {archive_path: (full_path, size, mtime_ns)}
+    if os.path.isdir(scan_root):
+        for rel_path, full_path in iter_archive_files(scan_root):
+            try:
+                st = os.stat(full_path)
+            except OSError:
+                continue
+            on_disk[prefix + rel_path] = (full_path, st.st_size, st.st_mtime_ns)
+
+    report = {'day': day, 'files': len(on_disk), 'added': 0, 'updated': 0, 'unchanged': 0,
+              'missing': 0, 'linked': 0, 'unlinked': 0, 'errors': 0, 'bytes_hashed': 0}
+    require_schema()
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT path, size, mtime_ns, missing_at IS NOT NULL FROM arsip_catalog WHERE path LIKE %s",
+            (prefix + '%',)
+        )
+        catalog = {row[0]: row[1:] for row in cur.fetchall()}
+
+        batch = []
+        for path, (full_path, size, mtime_ns) in sorted(on_disk.items()):
+            known = catalog.get(path)
+            if known and known[0] == size and known[1] == mtime_ns and not known[2]:
+                report['unchanged'] += 1
+                continue
+            try:
+                info = describe_archive_file(full_path)
+            except OSError as e:
+                print(f"⚠️ Rekonsiliasi katalog: {path} dilewati: {e}")
+                report['errors'] += 1
+                continue
+            report['added' if known is None else 'updated'] += 1
+            report['bytes_hashed'] += info['size']
+            if progress:
+                progress(info['size'])
+            batch.append((path, info))
+            if len(batch) >= CATALOG_BATCH_SIZE:
+                _upsert_catalog(cur, batch)
+                conn.commit()
+                batch = []
+        if batch:
+            _upsert_catalog(cur, batch)
+
+        gone = [path for path, known in catalog.items() if path not in on_disk and not known[2]]
+        if gone:
+            cur.execute(
+                "UPDATE arsip_catalog SET missing_at = NOW(), updated_at = NOW() WHERE path = ANY(%s)",
+                (gone,)
+            )
+        report['missing'] = len(gone)
+
+        # archive_path bisa berubah lewat edit data atau query manual: link disegarkan di sini
+        cur.execute("""
+            UPDATE arsip_catalog AS c SET pencatatan_id = p.id
+            FROM pencatatan AS p
+            WHERE p.archive_path = c.path AND c.path LIKE %s AND c.pencatatan_id IS DISTINCT FROM p.id
+        """, (prefix + '%',))
+        report['linked'] = cur.rowcount
+        cur.execute("""
+            UPDATE arsip_catalog AS c SET pencatatan_id = NULL
+            WHERE c.pencatatan_id IS NOT NULL AND c.path LIKE %s
+              AND NOT EXISTS (SELECT 1 FROM pencatatan p WHERE p.id = c.pencatatan_id AND p.archive_path = c.path)
+        """, (prefix + '%',))
+        report['unlinked'] = cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+    return report
+
+def _run_reconcile_catalog(job, day=None):
+    report = reconcile_arsip_catalog(day=day, progress=job.add_progress)
+    print(f"Rekonsiliasi katalog arsip: {report['added']} baru, {report['updated']} berubah, "
+          f"{report['unchanged']} tetap, {report['missing']} hilang")
+    return {'output': f"{report['files']} file diperiksa", 'report': report}
+
+@app.route('/api/arsip/catalog/reconcile', methods=['POST'])
+@login_required
+def reconcile_arsip():
+    """Jalankan rekonsiliasi katalog (seluruh arsip atau satu folder hari) sebagai job latar."""
+    day = (request.get_json(silent=True) or {}).get('day')
+    if day and not re.match(r'^\d{8}$', str(day)):
+        return jsonify({'error': 'day harus berformat YYYYMMDD'}), 400
+    return _enqueue_backup('catalog', lambda job: _run_reconcile_catalog(job, day), 'katalog arsip',
+                           noun='Rekonsiliasi')
+
+@app.route('/api/arsip/catalog', methods=['GET'])
+@login_required
+def get_arsip_catalog():
+    """Daftar katalog arsip beserta ringkasan.
+
+    status: all, orphan (file tanpa pencatatan), missing (file hilang dari disk),
+    unindexed (pencatatan yang archive_path-nya tidak ada di katalog atau filenya hilang).
+    """
+    params = request.args
+    status = params.get('status', 'all')
+    day = params.get('day')
+    if status not in CATALOG_STATUSES:
+        return jsonify({'error': f"status harus salah satu dari: {', '.join(CATALOG_STATUSES)}"}), 400
+    if day and not re.match(r'^\d{8}$', day):
+        return jsonify({'error': 'day harus berformat YYYYMMDD'}), 400
+    try:
+        limit = min(max(int(params.get('limit', 100)), 1), 1000)
+        offset = max(int(params.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({'error': 'limit dan offset harus berupa angka'}), 400
+    prefix = _catalog_prefix(day) + '%'
+
+    try:
+        require_schema()
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("""
+                SELECT COUNT(*) FILTER (WHERE missing_at IS NULL),
+                       COALESCE(SUM(size) FILTER (WHERE missing_at IS NULL), 0),
+                       COALESCE(SUM(pages) FILTER (WHERE missing_at IS NULL), 0),
+                       COUNT(*) FILTER (WHERE pencatatan_id IS NULL AND missing_at IS NULL),
+                       COUNT(*) FILTER (WHERE missing_at IS NOT NULL)
+                FROM arsip_catalog WHERE path LIKE %s
+            """, (prefix,))
+            files, size, pages, orphans, missing = cur.fetchone()
+            summary = {'files': files, 'bytes': size, 'pages': pages, 'orphan': orphans, 'missing': missing}
+
+            if status == 'unindexed':
+                cur.execute("""
+                    SELECT p.id AS pencatatan_id, p.archive_path AS path, p.reg_date, p.reg_number,
+                           c.missing_at
+                    FROM pencatatan p
+                    LEFT JOIN arsip_catalog c ON c.path = p.archive_path
+                    WHERE p.archive_path LIKE %s AND p.archive_path <> '' AND p.archive_path NOT LIKE 'http%%'
+                      AND (c.id IS NULL OR c.missing_at IS NOT NULL)
+                    ORDER BY p.reg_date DESC, p.id DESC LIMIT %s OFFSET %s
+                """, (prefix, limit, offset))
+            else:
+                conditions = {
+                    'all': '',
+                    'orphan': ' AND pencatatan_id IS NULL AND missing_at IS NULL',
+                    'missing': ' AND missing_at IS NOT NULL',
+                }
+                query = ("SELECT id, path, size, sha256, pages, mime_type, pencatatan_id, missing_at, "
+                         "created_at, updated_at FROM arsip_catalog WHERE path LIKE %s" + conditions[status])
+                values = [prefix]
+                if params.get('sha256'):
+                    # Cari duplikat: file dengan isi yang sama
+                    query += " AND sha256 = %s"
+                    values.append(params['sha256'].lower())
+                cur.execute(query + " ORDER BY path LIMIT %s OFFSET %s", tuple(values + [limit, offset]))
+            columns = [desc[0] for desc in cur.description]
+            data = [dict(zip(columns, row)) for row in cur.fetchall()]
+        finally:
+            cur.close()
+            conn.close()
+        return jsonify({'status': status, 'summary': summary, 'data': data, 'limit': limit, 'offset': offset})
+    except Exception as e:
+        print(f"Get katalog arsip error: {str(e)}")
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+
 # --- Endpoint Upload Arsip ---
 @app.route('/api/arsip', methods=['POST'])
 @login_required
@@ -610,6 +1641,9 @@ def upload_arsip():
         name = request.form.get('name')
         if not (file and allowed_file(file.filename)):
             return jsonify({'error': 'Tipe file tidak diizinkan'}), 400
+        field_error = validate_arsip_upload(reg_date, reg_number, nik)
+        if field_error:
+            return jsonify({'error': field_error}), 400
         
         # Format nama file: YYYYMMDD_REG_KODE.ext
         ext = file.filename.rsplit('.', 1)[1].lower()
@@ -622,6 +1656,7 @@ def upload_arsip():
         
         # Save file
         file.save(full_save_path)
+        schedule_arsip_processing([(archive_path, None)])
         
         return jsonify({
             'message': 'File berhasil diunggah', 
@@ -632,22 +1667,391 @@ def upload_arsip():
         print(f"Upload arsip error: {str(e)}")
         return jsonify({'error': f'Upload error: {str(e)}'}), 500
 
+# --- Upload Arsip Bertahap (chunked & resumable) ---
+# Body request dibaca langsung dari stream per potongan dan ditulis ke file .part
+# di folder tujuan, jadi memori tetap rata berapa pun ukuran file.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_SESSION_FOLDER = os.path.join(UPLOAD_FOLDER, '.uploads')
+UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', str(24 * 3600)))  # sesi tanpa aktivitas dihapus
+UPLOAD_SWEEP_INTERVAL = 600
+_upload_hashers = {}  # {upload_id: (offset, hasher)} agar checksum tidak dihitung ulang
+_upload_hashers_lock = threading.Lock()
+_last_upload_sweep = 0.0
+
+class UploadSessionLock:
+    """flock non-blocking pada file meta sesi: satu PATCH/DELETE per sesi di semua worker.
+
+    Tanpa fcntl (Windows, development) kunci dilewati.
+    """
+
+    def __init__(self, upload_id):
+        self.meta_path = _upload_meta_path(upload_id)
+        self._file = None
+
+    def acquire(self):
+        """True jika kunci didapat; False jika sesi sedang dipakai request lain.
+
+        FileNotFoundError berarti sesi sudah selesai/dibatalkan.
+        """
+        self._file = open(self.meta_path, 'r')
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            self.release()
+            return False
+
+    def release(self):
+        if self._file is not None:
+            # Menutup file melepas flock
+            self._file.close()
+            self._file = None
+
+def _remove_upload_session(meta):
+    part_path = _upload_part_path(meta)
+    if os.path.exists(part_path):
+        os.remove(part_path)
+    meta_path = _upload_meta_path(meta['upload_id'])
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    with _upload_hashers_lock:
+        _upload_hashers.pop(meta['upload_id'], None)
+
+def sweep_upload_sessions(now=None):
+    """Menghapus sesi upload yang tidak ada aktivitas lebih dari UPLOAD_SESSION_TTL."""
+    now = now or time.time()
+    removed = 0
+    if not os.path.isdir(UPLOAD_SESSION_FOLDER):
+        return removed
+    for name in os.listdir(UPLOAD_SESSION_FOLDER):
+        upload_id = name[:-len('.json')] if name.endswith('.json') else None
+        meta = _load_upload_meta(upload_id) if upload_id else None
+        if not meta:
+            continue
+        part_path = _upload_part_path(meta)
+        meta_path = _upload_meta_path(upload_id)
+        try:
+            last_activity = max(os.path.getmtime(p) for p in (part_path, meta_path) if os.path.exists(p))
+        except (OSError, ValueError):
+            continue
+        if now - last_activity < UPLOAD_SESSION_TTL:
+            continue
+        lock = UploadSessionLock(upload_id)
+        try:
+            if not lock.acquire():
+                continue  # masih ada PATCH yang berjalan
+            _remove_upload_session(meta)
+            removed += 1
+        except FileNotFoundError:
+            continue
+        finally:
+            lock.release()
+    if removed:
+        print(f"🧹 {removed} sesi upload kedaluwarsa dihapus")
+    return removed
+
+def _maybe_sweep_upload_sessions():
+    global _last_upload_sweep
+    now = time.time()
+    if now - _last_upload_sweep < UPLOAD_SWEEP_INTERVAL:
+        return
+    _last_upload_sweep = now
+    try:
+        sweep_upload_sessions(now)
+    except Exception as e:
+        print(f"⚠️ Pembersihan sesi upload gagal: {e}")
+
+def _upload_meta_path(upload_id):
+    if not re.match(r'^[0-9a-f]{32}$', upload_id or ''):
+        return None
+    return os.path.join(UPLOAD_SESSION_FOLDER, f"{upload_id}.json")
+
+def _load_upload_meta(upload_id):
+    meta_path = _upload_meta_path(upload_id)
+    if not meta_path or not os.path.isfile(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+def _upload_part_path(meta):
+    full_path = get_archive_file_path(meta['archive_path'])
+    return os.path.join(os.path.dirname(full_path), f".{meta['upload_id']}.part")
+
+def _upload_hasher(upload_id, part_path, offset):
+    """Mengambil state sha256 untuk offset ini; dibangun ulang dari file .part jika perlu."""
+    with _upload_hashers_lock:
+        cached = _upload_hashers.get(upload_id)
+    if cached and cached[0] == offset:
+        return cached[1]
+    # Lanjutan upload di worker lain/setelah restart: hitung ulang dari isi .part
+    hasher = hashlib.sha256()
+    with open(part_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher
+
+@app.route('/api/arsip/uploads', methods=['POST'])
+@login_required
+def create_upload_session():
+    """Memulai upload bertahap. JSON: filename, reg_date, reg_number, nik, total_size, sha256 (opsional)."""
+    try:
+        data = request.json or {}
+        original_name = data.get('filename', '')
+        reg_date = data.get('reg_date')
+        reg_number = data.get('reg_number')
+        nik = data.get('nik')
+        try:
+            total_size = int(data.get('total_size'))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'total_size wajib diisi (byte)'}), 400
+        if total_size <= 0:
+            return jsonify({'error': 'total_size harus lebih dari 0'}), 400
+        if not allowed_file(original_name):
+            return jsonify({'error': 'Tipe file tidak diizinkan'}), 400
+        field_error = validate_arsip_upload(reg_date, reg_number, nik)
+        if field_error:
+            return jsonify({'error': field_error}), 400
+        _maybe_sweep_upload_sessions()
+
+        # Format nama file sama dengan upload_arsip: YYYYMMDD_REG_NIK.ext
+        ext = original_name.rsplit('.', 1)[1].lower()
+        reg_date_str = reg_date.replace('-', '') if reg_date else date.today().strftime('%Y%m%d')
+        filename = secure_filename(f"{reg_date_str}_{reg_number}_{nik}.{ext}")
+        archive_path = create_archive_path(reg_date or reg_date_str, filename)
+
+        upload_id = uuid.uuid4().hex
+        meta = {
+            'upload_id': upload_id,
+            'archive_path': archive_path,
+            'total_size': total_size,
+            'sha256': (data.get('sha256') or '').lower() or None,
+            'created_at': datetime.now().isoformat()
+        }
+        os.makedirs(UPLOAD_SESSION_FOLDER, exist_ok=True)
+        open(_upload_part_path(meta), 'wb').close()
+        with open(_upload_meta_path(upload_id), 'w') as f:
+            json.dump(meta, f)
+
+        return jsonify({
+            'upload_id': upload_id,
+            'archive_path': archive_path,
+            'offset': 0,
+            'chunk_size': UPLOAD_CHUNK_SIZE
+        })
+    except Exception as e:
+        print(f"Create upload session error: {str(e)}")
+        return jsonify({'error': f'Upload error: {str(e)}'}), 500
+
+@app.route('/api/arsip/uploads/<upload_id>', methods=['GET'])
+@login_required
+def get_upload_session(upload_id):
+    """Status upload untuk melanjutkan dari offset terakhir."""
+    meta = _load_upload_meta(upload_id)
+    if not meta:
+        return jsonify({'error': 'Sesi upload tidak ditemukan'}), 404
+    part_path = _upload_part_path(meta)
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    return jsonify({
+        'upload_id': upload_id,
+        'archive_path': meta['archive_path'],
+        'offset': offset,
+        'total_size': meta['total_size'],
+        'complete': False
+    })
+
+@app.route('/api/arsip/uploads/<upload_id>', methods=['PATCH'])
+@login_required
+def append_upload_chunk(upload_id):
+    """Menambahkan potongan data (body mentah) di ?offset=N; selesai otomatis saat ukuran tercapai."""
+    meta = _load_upload_meta(upload_id)
+    if not meta:
+        return jsonify({'error': 'Sesi upload tidak ditemukan'}), 404
+    lock = UploadSessionLock(upload_id)
+    try:
+        # Cek offset, tulis, dan penyelesaian dalam satu kunci agar dua PATCH di offset
+        # yang sama tidak sama-sama lolos lalu menulis ganda ke .part
+        try:
+            if not lock.acquire():
+                part_path = _upload_part_path(meta)
+                current = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+                return jsonify({'error': 'Potongan lain sedang ditulis untuk sesi ini', 'offset': current}), 409
+        except FileNotFoundError:
+            return jsonify({'error': 'Sesi upload tidak ditemukan'}), 404
+        part_path = _upload_part_path(meta)
+        if not os.path.exists(part_path):
+            return jsonify({'error': 'File sementara upload tidak ditemukan'}), 404
+
+        current = os.path.getsize(part_path)
+        try:
+            offset = int(request.args.get('offset', current))
+        except ValueError:
+            return jsonify({'error': 'offset harus berupa angka'}), 400
+        if offset != current:
+            # Klien harus melanjutkan dari offset yang benar-benar tersimpan
+            return jsonify({'error': 'Offset tidak sesuai', 'offset': current}), 409
+
+        hasher = _upload_hasher(upload_id, part_path, offset)
+        written = offset
+        with open(part_path, 'ab') as f:
+            while True:
+                chunk = request.stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if written + len(chunk) > meta['total_size']:
+                    f.truncate(offset)
+                    with _upload_hashers_lock:
+                        _upload_hashers.pop(upload_id, None)
+                    return jsonify({'error': 'Data melebihi total_size', 'offset': offset}), 400
+                f.write(chunk)
+                hasher.update(chunk)
+                written += len(chunk)
+
+        if written < meta['total_size']:
+            with _upload_hashers_lock:
+                _upload_hashers[upload_id] = (written, hasher)
+            return jsonify({'upload_id': upload_id, 'offset': written, 'complete': False})
+
+        with _upload_hashers_lock:
+            _upload_hashers.pop(upload_id, None)
+        checksum = hasher.hexdigest()
+        if meta['sha256'] and meta['sha256'] != checksum:
+            _remove_upload_session(meta)
+            return jsonify({'error': 'Checksum tidak cocok, silakan unggah ulang', 'sha256': checksum}), 422
+
+        # Rename atomik: file arsip tidak pernah terlihat setengah jadi
+        full_save_path = get_archive_file_path(meta['archive_path'])
+        os.replace(part_path, full_save_path)
+        os.remove(_upload_meta_path(upload_id))
+        schedule_arsip_processing([(meta['archive_path'], checksum)])
+        return jsonify({
+            'message': 'File berhasil diunggah',
+            'upload_id': upload_id,
+            'archive_path': meta['archive_path'],
+            'offset': written,
+            'sha256': checksum,
+            'complete': True
+        })
+    except Exception as e:
+        print(f"Upload chunk error: {str(e)}")
+        return jsonify({'error': f'Upload error: {str(e)}'}), 500
+    finally:
+        lock.release()
+
+@app.route('/api/arsip/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def cancel_upload_session(upload_id):
+    meta = _load_upload_meta(upload_id)
+    if not meta:
+        return jsonify({'error': 'Sesi upload tidak ditemukan'}), 404
+    lock = UploadSessionLock(upload_id)
+    try:
+        if not lock.acquire():
+            return jsonify({'error': 'Potongan sedang ditulis, coba batalkan lagi sebentar'}), 409
+        _remove_upload_session(meta)
+    except FileNotFoundError:
+        return jsonify({'error': 'Sesi upload tidak ditemukan'}), 404
+    finally:
+        lock.release()
+    return jsonify({'message': 'Upload dibatalkan'})
+
+# --- Pengiriman File lewat Web Server ---
+# FILE_DELIVERY=stream (default): file dikirim oleh worker Python.
+# FILE_DELIVERY=x-accel: nginx mengirim file lewat location internal, contoh:
+#     location /internal/arsip/    { internal; alias /srv/sicakap/backend/arsip/; }
+#     location /internal/frontend/ { internal; alias /srv/sicakap/frontend/; }
+# FILE_DELIVERY=x-sendfile: Apache mod_xsendfile / lighttpd membaca path absolut dari header.
+FILE_DELIVERY = os.getenv('FILE_DELIVERY', 'stream').lower()
+ACCEL_ARSIP_PREFIX = os.getenv('ACCEL_ARSIP_PREFIX', '/internal/arsip/')
+ACCEL_STATIC_PREFIX = os.getenv('ACCEL_STATIC_PREFIX', '/internal/frontend/')
+
+def offload_file(full_path, root, internal_prefix, etag=None):
+    """Response tanpa isi berisi X-Accel-Redirect / X-Sendfile; None jika mode stream.
+
+    Dipanggil setelah login dan validasi path. 304 tetap dijawab di sini agar web server
+    tidak perlu membuka file; Range ditangani oleh web server.
+    """
+    if FILE_DELIVERY not in ('x-accel', 'x-sendfile'):
+        return None
+    st = os.stat(full_path)
+    response = app.response_class(mimetype=mimetypes.guess_type(full_path)[0] or 'application/octet-stream')
+    if FILE_DELIVERY == 'x-accel':
+        rel_path = os.path.relpath(full_path, root).replace(os.sep, '/')
+        response.headers['X-Accel-Redirect'] = internal_prefix.rstrip('/') + '/' + quote(rel_path)
+    else:
+        response.headers['X-Sendfile'] = os.path.abspath(full_path)
+    response.set_etag(etag or f"{st.st_mtime_ns:x}-{st.st_size:x}")
+    response.last_modified = st.st_mtime
+    response.make_conditional(request)
+    if response.status_code == 304:
+        # Jangan sampai web server tetap mengirim file untuk respons 304
+        response.headers.pop('X-Accel-Redirect', None)
+        response.headers.pop('X-Sendfile', None)
+    return response
+
+# ETag arsip = sha256 isi file, di-cache per identitas file (inode, ukuran, mtime)
+# sehingga hash hanya dihitung ulang jika file diganti
+ARSIP_CACHE_MAX_AGE = int(os.getenv('ARSIP_CACHE_MAX_AGE', '300'))
+ARSIP_ETAG_CACHE_SIZE = 2048
+_arsip_etags = OrderedDict()  # {(path, ino, size, mtime_ns): sha256}
+_arsip_etags_lock = threading.Lock()
+
+def resolve_archive_file(archive_path):
+    """Path absolut file arsip, atau None jika keluar dari folder arsip / bukan file."""
+    root = os.path.realpath(app.config['UPLOAD_FOLDER'])
+    full_path = os.path.realpath(os.path.join(root, archive_path or ''))
+    if not full_path.startswith(root + os.sep):
+        return None
+    # File internal (.uploads, manifest) tidak ikut disajikan
+    if any(part.startswith('.') for part in os.path.relpath(full_path, root).split(os.sep)):
+        return None
+    return full_path if os.path.isfile(full_path) else None
+
+def archive_etag(full_path, st):
+    key = (full_path, st.st_ino, st.st_size, st.st_mtime_ns)
+    with _arsip_etags_lock:
+        etag = _arsip_etags.get(key)
+        if etag:
+            _arsip_etags.move_to_end(key)
+            return etag
+    etag = file_sha256(full_path)
+    with _arsip_etags_lock:
+        _arsip_etags[key] = etag
+        while len(_arsip_etags) > ARSIP_ETAG_CACHE_SIZE:
+            _arsip_etags.popitem(last=False)
+    return etag
+
 @app.route('/api/arsip/download/<path:archive_path>', methods=['GET'])
 @login_required
 def download_arsip(archive_path):
-    """Download arsip with hierarchical path support"""
+    """Download arsip with hierarchical path support.
+
+    Mendukung If-None-Match/If-Modified-Since (304) dan Range/If-Range (206),
+    sehingga viewer PDF bisa memuat sebagian dan preview berulang tidak mengunduh ulang.
+    """
     try:
-        # Construct full file path
-        full_file_path = get_archive_file_path(archive_path)
-        
-        if not full_file_path or not os.path.isfile(full_file_path):
+        full_file_path = resolve_archive_file(archive_path)
+        if not full_file_path:
             return jsonify({'error': 'File tidak ditemukan'}), 404
-        
-        # Get directory and filename
-        directory = os.path.dirname(full_file_path)
-        filename = os.path.basename(full_file_path)
-        
-        return send_from_directory(directory, filename)
+
+        st = os.stat(full_file_path)
+        etag = archive_etag(full_file_path, st)
+        response = offload_file(full_file_path, app.config['UPLOAD_FOLDER'], ACCEL_ARSIP_PREFIX, etag)
+        if response is None:
+            response = send_file(
+                full_file_path,
+                conditional=True,
+                etag=etag,
+                last_modified=st.st_mtime
+            )
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = ARSIP_CACHE_MAX_AGE
+        # Dokumen warga: hanya boleh disimpan di cache browser, bukan proxy bersama
+        response.cache_control.public = False
+        response.cache_control.private = True
+        response.headers['Vary'] = 'Cookie'
+        return response
     except Exception as e:
         print(f"Download arsip error: {str(e)}")
         return jsonify({'error': f'Download error: {str(e)}'}), 500
@@ -672,8 +2076,14 @@ def convert_and_upload_mixed_files():
             return jsonify({'error': 'Format nama file tidak valid. Gunakan: YYYYMMDD_NUMBER_CODE'}), 400
         
         # Extract date from filename for hierarchical structure
-        date_part = custom_filename[:8]
+        date_part, reg_number, service_code = custom_filename.split('_')
         reg_date_formatted = f"{date_part[:4]}-{date_part[4:6]}-{date_part[6:8]}"
+        # Validasi sama dengan upload arsip lain, sebelum file apa pun disimpan (termasuk PDF tunggal)
+        field_error = validate_arsip_registration(reg_date_formatted, reg_number)
+        if field_error:
+            return jsonify({'error': field_error}), 400
+        if len(service_code) > SERVICE_CODE_MAX_LENGTH:
+            return jsonify({'error': f'Kode layanan maksimal {SERVICE_CODE_MAX_LENGTH} karakter'}), 400
         
         # Create PDF filename
         pdf_filename = f"{custom_filename}.pdf"
@@ -682,25 +2092,40 @@ def convert_and_upload_mixed_files():
         archive_path = create_archive_path(reg_date_formatted, pdf_filename)
         full_save_path = os.path.join(app.config['UPLOAD_FOLDER'], archive_path)
         
-        # Simple file handling - if only PDF files, merge them
-        # If mixed files, this would need more complex conversion logic
-        pdf_files = [f for f in files if f.filename.lower().endswith('.pdf')]
-        
-        if len(files) == 1 and len(pdf_files) == 1:
+        for f in files:
+            if file_extension(f.filename) not in ALLOWED_EXTENSIONS:
+                return jsonify({'error': f'Tipe file tidak didukung: {f.filename}'}), 400
+
+        page_count = None
+        if len(files) == 1 and file_extension(files[0].filename) == 'pdf':
             # Single PDF file - just save it
             files[0].save(full_save_path)
         else:
-            # Multiple files or mixed types - would need additional libraries
-            # For now, save the first PDF file or return error
-            if pdf_files:
-                pdf_files[0].save(full_save_path)
-            else:
-                return jsonify({'error': 'Konversi file campuran memerlukan library tambahan'}), 400
+            dependency_error = check_dependencies()
+            if dependency_error:
+                return jsonify({'error': dependency_error}), 400
+            settings = convert_settings()
+            # File disimpan ke disk dulu agar halaman bisa diproses satu per satu, bukan semuanya di memori
+            os.makedirs(UPLOAD_SESSION_FOLDER, exist_ok=True)
+            with tempfile.TemporaryDirectory(dir=UPLOAD_SESSION_FOLDER) as work_dir:
+                paths = []
+                for index, f in enumerate(files):
+                    name = secure_filename(f.filename) or f"file.{file_extension(f.filename)}"
+                    path = os.path.join(work_dir, f"{index:03d}_{name}")
+                    f.save(path)
+                    paths.append(path)
+                try:
+                    page_count = merge_to_pdf(paths, full_save_path, **settings)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+            print(f"✅ Convert upload: {len(files)} file -> {page_count} halaman ({os.path.getsize(full_save_path)} bytes)")
+        schedule_arsip_processing([(archive_path, None)])
         
         return jsonify({
             'message': 'File berhasil dikonversi dan diunggah',
             'archive_path': archive_path,
-            'filename': pdf_filename
+            'filename': pdf_filename,
+            'pages': page_count
         })
         
     except Exception as e:
@@ -708,9 +2133,60 @@ def convert_and_upload_mixed_files():
         return jsonify({'error': f'Convert upload error: {str(e)}'}), 500
 
 # --- Penyajian Frontend ---
+# STATIC_ASSETS=dist: sajikan hasil build_assets.py (frontend/dist) — nama file ber-hash
+# di-cache immutable 1 tahun, varian .br/.gz dipilih dari Accept-Encoding, index.html
+# selalu divalidasi ulang. File yang tidak ada di dist tetap diambil dari folder frontend.
+# Untuk FILE_DELIVERY=x-accel, aktifkan gzip_static/brotli_static di location internal
+# frontend agar nginx yang memilih varian terkompresi.
+STATIC_ASSETS = os.getenv('STATIC_ASSETS', 'source').lower()
+STATIC_DIST_FOLDER = os.path.join(app.static_folder, 'dist')
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+HASHED_ASSET_RE = re.compile(r'\.[0-9a-f]{10}\.(?:js|css)$')
+STATIC_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+def _dist_enabled():
+    return STATIC_ASSETS == 'dist' and os.path.isfile(os.path.join(STATIC_DIST_FOLDER, 'index.html'))
+
+def _accepted_encodings():
+    """Encoding dari header Accept-Encoding dengan q > 0."""
+    return {enc for enc in request.accept_encodings.values() if request.accept_encodings[enc] > 0}
+
+def send_dist_file(path, immutable):
+    """Kirim file dari dist, memakai varian .br/.gz terkecil yang diterima klien."""
+    full_path = safe_join(STATIC_DIST_FOLDER, path)
+    mimetype = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    response = offload_file(full_path, app.static_folder, ACCEL_STATIC_PREFIX)
+    if response is None:
+        accepted = _accepted_encodings()
+        send_path, encoding = full_path, None
+        for name, suffix in STATIC_ENCODINGS:
+            if name in accepted and os.path.isfile(full_path + suffix):
+                send_path, encoding = full_path + suffix, name
+                break
+        response = send_file(send_path, mimetype=mimetype, conditional=True,
+                             max_age=STATIC_IMMUTABLE_MAX_AGE if immutable else None)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # index.html: boleh disimpan tapi wajib divalidasi ulang (ETag) agar build baru langsung dipakai
+        response.cache_control.no_cache = True
+    return response
+
 @app.route('/')
 def serve_index():
     """Menyajikan file index.html dari folder frontend."""
+    if _dist_enabled():
+        return send_dist_file('index.html', immutable=False)
+    index_path = os.path.join(app.static_folder, 'index.html')
+    if os.path.isfile(index_path):
+        response = offload_file(index_path, app.static_folder, ACCEL_STATIC_PREFIX)
+        if response is not None:
+            return response
     return send_from_directory(app.static_folder, 'index.html')
 
 @app.route('/<path:path>')
@@ -719,78 +2195,423 @@ def serve_static(path):
     # Menghindari penyajian file di luar folder statis
     if ".." in path or path.startswith("/"):
         return jsonify({"error": "Invalid path"}), 400
+    if _dist_enabled():
+        dist_path = safe_join(STATIC_DIST_FOLDER, path)
+        if dist_path and os.path.isfile(dist_path):
+            return send_dist_file(path, immutable=bool(HASHED_ASSET_RE.search(path)))
+    full_path = safe_join(app.static_folder, path)
+    if full_path and os.path.isfile(full_path):
+        response = offload_file(full_path, app.static_folder, ACCEL_STATIC_PREFIX)
+        if response is not None:
+            return response
     return send_from_directory(app.static_folder, path)
 
+# Route static bawaan Flask (static_url_path='') mencocokkan file yang ada lebih dulu dari
+# serve_static, jadi view-nya diarahkan ke serve_static agar mode pengiriman yang sama berlaku
+app.view_functions['static'] = lambda filename: serve_static(filename)
+
 # --- Health Check ---
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'ok'})
+    return jsonify({
+        'status': 'ok',
+        'db_pool': get_db_pool().metrics()
+    })
 
 # --- Database Setup Route (untuk testing) ---
 @app.route('/api/setup-db', methods=['POST'])
 def setup_database():
     """Setup database tables if they don't exist"""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Create pencatatan table - hapus UNIQUE constraint dari NIK
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS pencatatan (
-                id SERIAL PRIMARY KEY,
-                reg_number INTEGER NOT NULL,
-                reg_date DATE NOT NULL,
-                service_code VARCHAR(10),
-                nik VARCHAR(16) NOT NULL,
-                name VARCHAR(255) NOT NULL,
-                phone_number VARCHAR(20),
-                email VARCHAR(255),
-                no_skpwni VARCHAR(50),
-                no_skdwni VARCHAR(50),
-                no_kk VARCHAR(50),
-                no_skbwni VARCHAR(50),
-                status VARCHAR(50) DEFAULT 'DIPROSES',
-                archive_path TEXT,
-                notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-        
-        # Hapus constraint UNIQUE dari NIK jika ada
-        cur.execute("""
-            ALTER TABLE pencatatan DROP CONSTRAINT IF EXISTS pencatatan_nik_key;
-        """)
-        
-        # Create redaksi table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS redaksi (
-                id SERIAL PRIMARY KEY,
-                title VARCHAR(255) NOT NULL,
-                content TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-        
-        conn.commit()
-        cur.close()
-        conn.close()
-        
-        return jsonify({'message': 'Database tables created successfully'})
+        applied = ensure_schema(force=True)
+        return jsonify({
+            'message': 'Database tables created successfully',
+            'schema_version': SCHEMA_VERSION,
+            'applied_migrations': applied
+        })
     except Exception as e:
         print(f"Setup database error: {str(e)}")
         return jsonify({'error': f'Database setup error: {str(e)}'}), 500
 
-# --- Global configuration for registration numbers
-registration_config = {
-    'start_number': 601,
-    'end_number': 700,
-    'current_date': None  # Track current active date
-}
+# --- Pengaturan nomor registrasi
+# Rentang nomor dan tanggal aktif disimpan di tabel app_settings agar semua worker
+# memakai nilai yang sama; dibaca sekali per request (disimpan di g).
+REGISTRATION_DEFAULTS = {'start_number': 601, 'end_number': 700}
+
+def get_registration_config():
+    """{'start_number', 'end_number', 'current_date'}; tanggal aktif = hari ini jika belum diganti."""
+    if has_app_context() and 'registration_config' in g:
+        return g.registration_config
+    require_schema()
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT key, value FROM app_settings WHERE key IN ('start_number', 'end_number', 'current_date')"
+        )
+        stored = dict(cur.fetchall())
+    finally:
+        cur.close()
+        conn.close()
+    config = {
+        'start_number': int(stored.get('start_number') or REGISTRATION_DEFAULTS['start_number']),
+        'end_number': int(stored.get('end_number') or REGISTRATION_DEFAULTS['end_number']),
+        'current_date': stored.get('current_date') or date.today().isoformat()
+    }
+    if has_app_context():
+        g.registration_config = config
+    return config
+
+def save_registration_config(**values):
+    """Menyimpan sebagian pengaturan (start_number, end_number, current_date)."""
+    require_schema()
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        psycopg2.extras.execute_values(cur, """
+            INSERT INTO app_settings (key, value) VALUES %s
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = NOW()
+        """, [(key, str(value)) for key, value in values.items()])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+    if has_app_context():
+        g.pop('registration_config', None)
+
+# --- Reservasi nomor registrasi
+# Reservasi disimpan di database agar konsisten antar worker/host gunicorn.
+BOOKING_TTL = int(os.getenv('BOOKING_TTL', '1800'))  # 30 menit
+REG_NUMBER_LOCK_ID = 7210302  # Kunci advisory per tanggal saat mengalokasikan nomor
+
+# Nomor terkecil yang belum dipakai maupun direservasi; setiap kandidat dicek lewat
+# indeks (reg_date, reg_number) dan berhenti di celah pertama
+FREE_REG_NUMBER_SQL = """
+    SELECT n FROM generate_series(%s, %s) AS n
+    WHERE NOT EXISTS (
+        SELECT 1 FROM pencatatan p WHERE p.reg_date = %s AND p.reg_number = n
+    ) AND NOT EXISTS (
+        SELECT 1 FROM reg_number_reservations r WHERE r.reg_date = %s AND r.reg_number = n
+    )
+    ORDER BY n
+    LIMIT 1
+"""
+MAX_REG_NUMBER_SQL = "SELECT COALESCE(MAX(reg_number), 0) FROM pencatatan WHERE reg_date = %s"
+
+class DatabaseBookingStore:
+    """Penyimpanan reservasi nomor registrasi di tabel reg_number_reservations."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+
+    def _connection(self):
+        require_schema()
+        return get_db_connection()
+
+    def book(self, session_id, reg_date, start_number, end_number):
+        """Mengembalikan (nomor, 'existing'|'new') atau (None, None) jika nomor habis."""
+        conn = self._connection()
+        cur = conn.cursor()
+        try:
+            # Serialisasi alokasi per tanggal; tanggal lain tetap bisa berjalan paralel
+            ordinal = datetime.strptime(reg_date, '%Y-%m-%d').date().toordinal()
+            cur.execute("SELECT pg_advisory_xact_lock(%s, %s)", (REG_NUMBER_LOCK_ID, ordinal))
+
+            # Hapus reservasi kedaluwarsa lewat indeks expires_at (tanpa scan penuh)
+            cur.execute("DELETE FROM reg_number_reservations WHERE expires_at < NOW()")
+
+            cur.execute(
+                "SELECT reg_number FROM reg_number_reservations WHERE session_id = %s AND reg_date = %s LIMIT 1",
+                (session_id, reg_date)
+            )
+            row = cur.fetchone()
+            if row:
+                conn.commit()
+                return row[0], 'existing'
 
-# --- Global dictionary untuk tracking booked numbers
-booked_numbers = {}  # {reg_number: {'session_id': ..., 'timestamp': ..., 'date': ...}}
+            cur.execute(FREE_REG_NUMBER_SQL, (start_number, end_number, reg_date, reg_date))
+            row = cur.fetchone()
+            if not row:
+                conn.commit()
+                return None, None
+
+            cur.execute("""
+                INSERT INTO reg_number_reservations (reg_date, reg_number, session_id, expires_at)
+                VALUES (%s, %s, %s, NOW() + %s * INTERVAL '1 second')
+            """, (reg_date, row[0], session_id, self.ttl))
+            conn.commit()
+            return row[0], 'new'
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
+    def _delete(self, where, values):
+        conn = self._connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(f"DELETE FROM reg_number_reservations WHERE {where} RETURNING reg_date", values)
+            rows = cur.fetchall()
+            conn.commit()
+            return [row[0].isoformat() for row in rows]
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
+    def release(self, session_id, reg_number):
+        """Melepas nomor milik sesi ini; mengembalikan tanggal reservasi atau None."""
+        dates = self._delete("session_id = %s AND reg_number = %s", (session_id, reg_number))
+        return dates[0] if dates else None
+
+    def confirm(self, session_id, reg_number):
+        """Nomor sudah tersimpan di pencatatan; reservasinya cukup dihapus."""
+        return self.release(session_id, reg_number)
+
+    def mark_used(self, reg_date, reg_number):
+        """Nomor bebas dicari langsung dari pencatatan, tidak ada yang perlu diperbarui."""
+
+    def forget_free_numbers(self):
+        """Lihat mark_used."""
+
+    def release_session(self, session_id):
+        return len(self._delete("session_id = %s", (session_id,)))
+
+    def clear_date(self, reg_date):
+        return len(self._delete("reg_date = %s", (reg_date,)))
+
+    def clear_all(self):
+        return len(self._delete("TRUE", ()))
+
+    def count_for_date(self, reg_date):
+        conn = self._connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                "SELECT COUNT(*) FROM reg_number_reservations WHERE reg_date = %s AND expires_at >= NOW()",
+                (reg_date,)
+            )
+            return cur.fetchone()[0]
+        finally:
+            cur.close()
+            conn.close()
+
+class MemoryBookingStore:
+    """Reservasi di memori proses untuk deployment satu proses (BOOKING_STORE=memory).
+
+    Diindeks per tanggal dan per sesi, dengan min-heap waktu kedaluwarsa yang
+    dibersihkan oleh thread reaper, sehingga tidak ada iterasi seluruh reservasi.
+    Nomor bebas disimpan per tanggal dalam min-heap yang diisi sekali dari pencatatan;
+    nomor kembali ke heap saat dilepas atau kedaluwarsa, bukan saat dikonfirmasi.
+    """
+
+    def __init__(self, ttl, reap_interval=60):
+        self.ttl = ttl
+        self.reap_interval = reap_interval
+        self._bookings = {}         # {(tanggal, nomor): (session_id, expires_at)}
+        self._by_date = {}          # {tanggal: set(nomor)}
+        self._by_session = {}       # {session_id: {tanggal: nomor}}
+        self._expiry_heap = []      # [(expires_at, tanggal, nomor)]
+        self._free = {}             # {tanggal: ((awal, akhir), heap nomor, set nomor)}
+        self._cond = threading.Condition()
+        # Dipegang selama query pengisian heap; mark_used menunggu agar nomor yang baru
+        # disimpan tidak terlewat oleh query yang sedang berjalan
+        self._seed_lock = threading.Lock()
+        self._reaper = None
+
+    def start(self):
+        """Menjalankan thread reaper; dipanggil dari startup(), bukan saat import."""
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_loop, name='booking-reaper', daemon=True)
+            self._reaper.start()
+
+    def _load_used_numbers(self, reg_date, start_number, end_number):
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                "SELECT reg_number FROM pencatatan WHERE reg_date = %s AND reg_number BETWEEN %s AND %s",
+                (reg_date, start_number, end_number)
+            )
+            return set(row[0] for row in cur.fetchall())
+        finally:
+            cur.close()
+            conn.close()
+
+    def _free_numbers(self, reg_date, start_number, end_number):
+        """Heap nomor bebas untuk tanggal ini; diisi sekali per tanggal dan rentang nomor."""
+        number_range = (start_number, end_number)
+        with self._cond:
+            free = self._free.get(reg_date)
+            if free is not None and free[0] == number_range:
+                return free
+        with self._seed_lock:
+            with self._cond:
+                free = self._free.get(reg_date)
+                if free is not None and free[0] == number_range:
+                    return free
+            # Query di luar _cond agar reservasi tanggal lain tidak tertahan
+            used = self._load_used_numbers(reg_date, start_number, end_number)
+            with self._cond:
+                booked = self._by_date.get(reg_date, set())
+                numbers = [n for n in range(start_number, end_number + 1) if n not in used and n not in booked]
+                # range sudah terurut, jadi list ini sudah berupa min-heap
+                free = (number_range, numbers, set(numbers))
+                self._free[reg_date] = free
+                return free
+
+    def _return_free(self, reg_date, reg_number):
+        """Mengembalikan nomor ke heap bebas (lock harus sudah dipegang)."""
+        free = self._free.get(reg_date)
+        if free is None:
+            return
+        (start_number, end_number), heap, members = free
+        if start_number <= reg_number <= end_number and reg_number not in members:
+            members.add(reg_number)
+            heapq.heappush(heap, reg_number)
+
+    def _remove(self, reg_date, reg_number, reusable=True):
+        """Menghapus satu reservasi dari semua indeks (lock harus sudah dipegang)."""
+        booking = self._bookings.pop((reg_date, reg_number), None)
+        if booking is None:
+            return None
+        session_id = booking[0]
+        numbers = self._by_date.get(reg_date)
+        if numbers is not None:
+            numbers.discard(reg_number)
+            if not numbers:
+                del self._by_date[reg_date]
+        held = self._by_session.get(session_id)
+        if held is not None and held.get(reg_date) == reg_number:
+            del held[reg_date]
+            if not held:
+                del self._by_session[session_id]
+        if reusable:
+            self._return_free(reg_date, reg_number)
+        return booking
+
+    def _reap_expired(self, now):
+        """Membuang reservasi kedaluwarsa dari puncak heap (lock harus sudah dipegang)."""
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, reg_date, reg_number = heapq.heappop(self._expiry_heap)
+            booking = self._bookings.get((reg_date, reg_number))
+            # Entri heap bisa basi jika nomor sudah dilepas atau dipesan ulang
+            if booking is not None and booking[1] == expires_at:
+                self._remove(reg_date, reg_number)
+                removed += 1
+        return removed
+
+    def _reap_loop(self):
+        with self._cond:
+            while True:
+                self._reap_expired(time.time())
+                timeout = self.reap_interval
+                if self._expiry_heap:
+                    timeout = min(timeout, max(0, self._expiry_heap[0][0] - time.time()))
+                self._cond.wait(timeout)
+
+    def book(self, session_id, reg_date, start_number, end_number):
+        """Mengembalikan (nomor, 'existing'|'new') atau (None, None) jika nomor habis."""
+        with self._cond:
+            self._reap_expired(time.time())
+            existing = self._by_session.get(session_id, {}).get(reg_date)
+            if existing is not None:
+                return existing, 'existing'
+
+        number_range, heap, members = self._free_numbers(reg_date, start_number, end_number)
+        with self._cond:
+            # Sesi yang sama mungkin sudah memesan selama heap diisi
+            existing = self._by_session.get(session_id, {}).get(reg_date)
+            if existing is not None:
+                return existing, 'existing'
+            while heap:
+                candidate = heapq.heappop(heap)
+                # Entri yang sudah dipakai (mark_used) dibuang secara lazy
+                if candidate not in members:
+                    continue
+                members.discard(candidate)
+                expires_at = time.time() + self.ttl
+                self._bookings[(reg_date, candidate)] = (session_id, expires_at)
+                self._by_date.setdefault(reg_date, set()).add(candidate)
+                self._by_session.setdefault(session_id, {})[reg_date] = candidate
+                heapq.heappush(self._expiry_heap, (expires_at, reg_date, candidate))
+                self._cond.notify()
+                return candidate, 'new'
+            return None, None
+
+    def release(self, session_id, reg_number):
+        """Melepas nomor milik sesi ini (nomor bisa dipesan lagi); mengembalikan tanggal atau None."""
+        return self._release(session_id, reg_number, reusable=True)
+
+    def confirm(self, session_id, reg_number):
+        """Nomor sudah tersimpan di pencatatan: reservasi dihapus tanpa mengembalikan nomornya."""
+        return self._release(session_id, reg_number, reusable=False)
+
+    def _release(self, session_id, reg_number, reusable):
+        with self._cond:
+            for reg_date, number in list(self._by_session.get(session_id, {}).items()):
+                if number == reg_number:
+                    self._remove(reg_date, number, reusable)
+                    return reg_date
+            return None
+
+    def mark_used(self, reg_date, reg_number):
+        """Dipanggil setelah pencatatan disimpan (termasuk nomor yang diketik manual)."""
+        with self._seed_lock, self._cond:
+            free = self._free.get(reg_date)
+            if free is not None:
+                free[2].discard(reg_number)
+
+    def forget_free_numbers(self):
+        """Nomor pencatatan diubah/dihapus: heap diisi ulang dari database saat dibutuhkan."""
+        with self._seed_lock, self._cond:
+            self._free.clear()
+
+    def release_session(self, session_id):
+        with self._cond:
+            held = list(self._by_session.get(session_id, {}).items())
+            for reg_date, number in held:
+                self._remove(reg_date, number)
+            return len(held)
+
+    def clear_date(self, reg_date):
+        with self._cond:
+            numbers = list(self._by_date.get(reg_date, ()))
+            for number in numbers:
+                self._remove(reg_date, number)
+            # Reset harian: isi ulang dari pencatatan pada pemesanan berikutnya
+            self._free.pop(reg_date, None)
+            return len(numbers)
+
+    def clear_all(self):
+        with self._cond:
+            count = len(self._bookings)
+            self._bookings.clear()
+            self._by_date.clear()
+            self._by_session.clear()
+            self._expiry_heap = []
+            self._free.clear()
+            return count
+
+    def count_for_date(self, reg_date):
+        with self._cond:
+            self._reap_expired(time.time())
+            return len(self._by_date.get(reg_date, ()))
+
+# 'database' (default) aman untuk banyak worker; 'memory' hanya untuk satu proses
+BOOKING_STORE = os.getenv('BOOKING_STORE', 'database').lower()
+if BOOKING_STORE == 'memory':
+    booking_store = MemoryBookingStore(BOOKING_TTL)
+else:
+    booking_store = DatabaseBookingStore(BOOKING_TTL)
 
 @app.route('/api/settings', methods=['GET'])
 @login_required
@@ -799,12 +2620,11 @@ def get_settings():
         conn = get_db_connection()
         cur = conn.cursor()
         
-        # Get current active date from registration_config or use today
-        current_date = registration_config.get('current_date') or date.today().isoformat()
-        registration_config['current_date'] = current_date
+        registration_config = get_registration_config()
+        current_date = registration_config['current_date']
         
         # Get current max number from database for the current date
-        cur.execute("SELECT COALESCE(MAX(reg_number), 0) FROM pencatatan WHERE reg_date = %s", (current_date,))
+        cur.execute(MAX_REG_NUMBER_SQL, (current_date,))
         max_db_number_for_date = cur.fetchone()[0]
         
         # If no data for this date, start from start_number
@@ -814,7 +2634,7 @@ def get_settings():
             next_number = max_db_number_for_date + 1
         
         # Count booked numbers for current date
-        booked_count = len([n for n in booked_numbers.values() if n.get('date') == current_date])
+        booked_count = booking_store.count_for_date(current_date)
         
         # Calculate remaining numbers for current date
         remaining = registration_config['end_number'] - max(max_db_number_for_date, registration_config['start_number'] - 1)
@@ -849,64 +2669,19 @@ def book_reg_number():
             session['session_id'] = session_id
 
         # Get current active date
-        current_date = registration_config.get('current_date') or date.today().isoformat()
-        registration_config['current_date'] = current_date
-
-        # Clean expired bookings (older than 30 minutes)
-        current_time = time.time()
-        expired_numbers = []
-        for reg_num, booking in booked_numbers.items():
-            if current_time - booking['timestamp'] > 1800:  # 30 minutes
-                expired_numbers.append(reg_num)
-        for reg_num in expired_numbers:
-            del booked_numbers[reg_num]
-
-        # Check if this session already has a booked number for current date
-        for reg_num, booking in booked_numbers.items():
-            if booking['session_id'] == session_id and booking.get('date') == current_date:
-                return jsonify({'reg_number': reg_num, 'status': 'existing'})
-
-        # Get all used numbers for current date and booked numbers for current date
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Get used numbers for specific date
-        cur.execute(
-            "SELECT reg_number FROM pencatatan WHERE reg_date = %s AND reg_number BETWEEN %s AND %s",
-            (current_date, registration_config['start_number'], registration_config['end_number'])
-        )
-        used_numbers_for_date = set(row[0] for row in cur.fetchall())
-        
-        # Get booked numbers for current date
-        booked_set_for_date = set(
-            num for num, booking in booked_numbers.items()
-            if booking.get('date') == current_date and 
-               registration_config['start_number'] <= num <= registration_config['end_number']
-        )
-        
-        all_taken_for_date = used_numbers_for_date | booked_set_for_date
+        registration_config = get_registration_config()
+        current_date = registration_config['current_date']
 
-        print(f"Date: {current_date}")
-        print(f"Used numbers for date: {used_numbers_for_date}")
-        print(f"Booked numbers for date: {booked_set_for_date}")
-        print(f"All taken for date: {all_taken_for_date}")
-
-        # Find the smallest available number for current date
-        for candidate in range(registration_config['start_number'], registration_config['end_number'] + 1):
-            if candidate not in all_taken_for_date:
-                booked_numbers[candidate] = {
-                    'session_id': session_id,
-                    'timestamp': current_time,
-                    'date': current_date
-                }
-                cur.close()
-                conn.close()
-                print(f"Booked number {candidate} for date {current_date}")
-                return jsonify({'reg_number': candidate, 'status': 'new'})
+        reg_number, status = booking_store.book(
+            session_id, current_date,
+            registration_config['start_number'], registration_config['end_number']
+        )
+        if reg_number is None:
+            return jsonify({'error': f'Nomor registrasi sudah habis untuk tanggal {current_date}. Silakan hubungi administrator.'}), 400
 
-        cur.close()
-        conn.close()
-        return jsonify({'error': f'Nomor registrasi sudah habis untuk tanggal {current_date}. Silakan hubungi administrator.'}), 400
+        if status == 'new':
+            print(f"Booked number {reg_number} for date {current_date}")
+        return jsonify({'reg_number': reg_number, 'status': status})
 
     except Exception as e:
         print(f"Book reg number error: {str(e)}")
@@ -930,12 +2705,11 @@ def switch_system_date():
             return jsonify({'error': 'Format tanggal tidak valid (gunakan YYYY-MM-DD)'}), 400
         
         # Update current date in registration config
-        old_date = registration_config.get('current_date')
-        registration_config['current_date'] = new_date
+        old_date = get_registration_config()['current_date']
+        save_registration_config(current_date=new_date)
         
         # Clear all booked numbers when switching dates
-        global booked_numbers
-        booked_numbers = {}
+        booking_store.clear_all()
         
         print(f"Switched system date from {old_date} to {new_date}")
         
@@ -954,16 +2728,10 @@ def switch_system_date():
 @login_required
 def get_date_statistics():
     try:
+        require_schema()
         conn = get_db_connection()
         cur = conn.cursor()
         
-        # Check if table exists
-        cur.execute("SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = 'pencatatan');")
-        table_exists = cur.fetchone()[0]
-        
-        if not table_exists:
-            return jsonify([])
-        
         # Get statistics grouped by date
         cur.execute("""
             SELECT 
@@ -1002,24 +2770,17 @@ def get_date_statistics():
 def reset_daily_numbers():
     try:
         # Get current active date
-        current_date = registration_config.get('current_date') or date.today().isoformat()
+        current_date = get_registration_config()['current_date']
         
         # Clear all booked numbers for current date
-        global booked_numbers
-        numbers_to_remove = []
-        for reg_num, booking in booked_numbers.items():
-            if booking.get('date') == current_date:
-                numbers_to_remove.append(reg_num)
-        
-        for reg_num in numbers_to_remove:
-            del booked_numbers[reg_num]
+        cleared = booking_store.clear_date(current_date)
         
         print(f"Reset daily numbers for date: {current_date}")
         
         return jsonify({
             'message': f'Nomor registrasi untuk tanggal {current_date} berhasil direset',
             'reset_date': current_date,
-            'cleared_bookings': len(numbers_to_remove)
+            'cleared_bookings': cleared
         })
         
     except Exception as e:
@@ -1033,10 +2794,9 @@ def release_reg_number():
         session_id = session.get('session_id')
         reg_number = request.json.get('reg_number')
         
-        if reg_number and reg_number in booked_numbers:
-            if booked_numbers[reg_number]['session_id'] == session_id:
-                released_date = booked_numbers[reg_number].get('date')
-                del booked_numbers[reg_number]
+        if reg_number and session_id:
+            released_date = booking_store.release(session_id, reg_number)
+            if released_date:
                 print(f"Released number {reg_number} for date {released_date}")
                 return jsonify({'message': 'Number released successfully'})
         
@@ -1053,11 +2813,10 @@ def confirm_reg_number():
         session_id = session.get('session_id')
         reg_number = request.json.get('reg_number')
         
-        if reg_number and reg_number in booked_numbers:
-            if booked_numbers[reg_number]['session_id'] == session_id:
-                # Remove from booking when confirmed (data saved)
-                confirmed_date = booked_numbers[reg_number].get('date')
-                del booked_numbers[reg_number]
+        if reg_number and session_id:
+            # Remove from booking when confirmed (data saved)
+            confirmed_date = booking_store.confirm(session_id, reg_number)
+            if confirmed_date:
                 print(f"Confirmed number {reg_number} for date {confirmed_date}")
                 return jsonify({'message': 'Number confirmed and released'})
         
@@ -1067,6 +2826,15 @@ def confirm_reg_number():
         print(f"Confirm reg number error: {str(e)}")
         return jsonify({'error': f'Confirm error: {str(e)}'}), 500
 
+BULK_ARCHIVE_UPDATE_SQL = """
+    UPDATE pencatatan AS p SET archive_path = v.archive_path
+    FROM (VALUES %s) AS v(reg_date, reg_number, service_code, archive_path)
+    WHERE p.reg_date = v.reg_date::date
+      AND p.reg_number = v.reg_number::integer
+      AND p.service_code = v.service_code
+    RETURNING v.archive_path
+"""
+
 @app.route('/api/arsip/bulk-upload', methods=['POST'])
 @login_required
 def bulk_upload_arsip():
@@ -1075,53 +2843,96 @@ def bulk_upload_arsip():
         if not files:
             return jsonify({'error': 'Tidak ada file yang diunggah'}), 400
 
-        success_count = 0
-        failed_files = []
+        # Tahap 1: simpan semua file, kumpulkan baris untuk satu UPDATE
+        results = []
+        saved = []  # [(reg_date, reg_number, service_code, archive_path, result)]
         for file in files:
             filename = file.filename
+            result = {'filename': filename, 'status': 'ok', 'archive_path': None, 'matched': False}
+            results.append(result)
             # Validasi nama file: yyyymmdd_{koderegistrasi}_{kodelayanan}.pdf
-            import re
             match = re.match(r'^(\d{8})_(\d+)_([A-Z]+)\.pdf$', filename, re.IGNORECASE)
             if not match:
-                failed_files.append(filename)
+                result['status'] = 'invalid_name'
+                result['message'] = 'Format nama file harus YYYYMMDD_NOMOR_KODE.pdf'
                 continue
             
             reg_date_str = match.group(1)
             reg_number = int(match.group(2))
             service_code = match.group(3).upper()
-            
-            # Convert YYYYMMDD to YYYY-MM-DD for database compatibility
-            reg_date_formatted = f"{reg_date_str[:4]}-{reg_date_str[4:6]}-{reg_date_str[6:8]}"
-            
-            # Create hierarchical archive path
-            archive_path = create_archive_path(reg_date_formatted, filename)
-            full_save_path = os.path.join(app.config['UPLOAD_FOLDER'], archive_path)
-            
-            # Save file
-            file.save(full_save_path)
-            
-            # Update archive_path di pencatatan
+
+            # Validasi per file agar satu nama yang tidak bisa di-cast tidak menggagalkan UPDATE seluruh batch
+            try:
+                reg_date_formatted = datetime.strptime(reg_date_str, '%Y%m%d').strftime('%Y-%m-%d')
+            except ValueError:
+                result['status'] = 'invalid'
+                result['message'] = f'Tanggal {reg_date_str} tidak valid'
+                continue
+            if not 0 < reg_number <= PG_INT_MAX:
+                result['status'] = 'invalid'
+                result['message'] = f'Nomor registrasi {reg_number} di luar batas'
+                continue
+            if len(service_code) > SERVICE_CODE_MAX_LENGTH:
+                result['status'] = 'invalid'
+                result['message'] = f'Kode layanan maksimal {SERVICE_CODE_MAX_LENGTH} karakter'
+                continue
+
+            try:
+                # Create hierarchical archive path
+                archive_path = create_archive_path(reg_date_formatted, filename)
+                full_save_path = os.path.join(app.config['UPLOAD_FOLDER'], archive_path)
+                file.save(full_save_path)
+            except Exception as save_err:
+                result['status'] = 'error'
+                result['message'] = f'Gagal menyimpan file: {str(save_err)}'
+                print(f"Save error for {filename}: {save_err}")
+                continue
+
+            result['archive_path'] = archive_path
+            saved.append((reg_date_formatted, reg_number, service_code, archive_path, result))
+
+        # Tahap 2: satu transaksi, satu UPDATE ... FROM (VALUES ...) untuk semua file
+        if saved:
+            conn = cur = None
             try:
                 conn = get_db_connection()
                 cur = conn.cursor()
-                cur.execute(
-                    "UPDATE pencatatan SET archive_path=%s WHERE reg_number=%s AND service_code=%s AND TO_CHAR(reg_date, 'YYYYMMDD')=%s",
-                    (archive_path, reg_number, service_code, reg_date_str)
-                )
+                updated = psycopg2.extras.execute_values(cur, BULK_ARCHIVE_UPDATE_SQL, [row[:4] for row in saved],
+                                                         page_size=len(saved), fetch=True)
                 conn.commit()
-                cur.close()
-                conn.close()
-                success_count += 1
+                matched_paths = set(row[0] for row in updated)
+                for _, _, _, archive_path, result in saved:
+                    result['matched'] = archive_path in matched_paths
+                    if not result['matched']:
+                        result['message'] = 'File tersimpan, tetapi data pencatatan yang cocok tidak ditemukan'
             except Exception as db_err:
-                failed_files.append(f"{filename} (DB error: {str(db_err)})")
-                print(f"DB update error for {filename}: {db_err}")
-
+                if conn is not None:
+                    conn.rollback()
+                print(f"DB update error for bulk upload: {db_err}")
+                for *_, result in saved:
+                    result['status'] = 'error'
+                    result['message'] = f'DB error: {str(db_err)}'
+                saved = []
+            finally:
+                if cur is not None:
+                    cur.close()
+                if conn is not None:
+                    conn.close()
+            # Dijadwalkan setelah UPDATE pencatatan agar link archive_path di katalog langsung terisi
+            schedule_arsip_processing([(archive_path, None) for _, _, _, archive_path, _ in saved])
+
+        success_count = sum(1 for r in results if r['status'] == 'ok')
+        failed_files = [
+            f"{r['filename']} ({r['message']})" if r['status'] in ('error', 'invalid') else r['filename']
+            for r in results if r['status'] != 'ok'
+        ]
         if failed_files:
             return jsonify({
                 'error': f'Beberapa file gagal: {", ".join(failed_files)}', 
-                'success': f'{success_count} file berhasil diunggah.'
+                'success': f'{success_count} file berhasil diunggah.',
+                'results': results
             })
-        return jsonify({'success': f'{success_count} file berhasil diunggah.'})
+        return jsonify({'success': f'{success_count} file berhasil diunggah.', 'results': results})
     except Exception as e:
         print(f"Error pada bulk upload: {e}")
         return jsonify({'error': 'Terjadi kesalahan di server'}), 500
@@ -1143,8 +2954,7 @@ def update_settings():
         
         # Hapus pengecekan data di luar rentang baru
         # Fokus hanya update konfigurasi saja
-        registration_config['start_number'] = start_number
-        registration_config['end_number'] = end_number
+        save_registration_config(start_number=start_number, end_number=end_number)
         
         return jsonify({'message': 'Pengaturan berhasil disimpan'})
         
@@ -1157,8 +2967,7 @@ def update_settings():
 def reset_numbers():
     try:
         # Clear all booked numbers
-        global booked_numbers
-        booked_numbers = {}
+        booking_store.clear_all()
         
         print(f"Reset all booked numbers")
         
@@ -1210,9 +3019,9 @@ def f103_submit_route():
         # Get jumlah anggota
         jumlah_anggota = int(data.get('jumlah_anggota', 1))
         
-        # Import and call the F-1.03 handler
-        from f103 import generate_pdf_f103
-        pdf_bytes = generate_pdf_f103(data, signature, jumlah_anggota)
+        # Import and call the F-1.03 handler (cached by form content)
+        from f103 import render_pdf_f103_cached, render_unavailable_response
+        pdf_bytes = render_pdf_f103_cached(data, signature, jumlah_anggota)
         
         # Create response
         pdf_output = io.BytesIO(pdf_bytes)
@@ -1229,6 +3038,10 @@ def f103_submit_route():
         print(f"✅ F-1.03 PDF generated successfully: {filename}")
         return send_file(pdf_output, as_attachment=True, download_name=filename, mimetype='application/pdf')
         
+    except (RenderBusyError, RenderTimeoutError) as e:
+        # Pool render penuh / job terlalu lama: jangan tahan thread request
+        print(f"⚠️ F-1.03 render unavailable: {e}")
+        return render_unavailable_response(e)
     except Exception as e:
         print(f"❌ F-1.03 submission error: {e}")
         import traceback
@@ -1238,6 +3051,163 @@ def f103_submit_route():
             'type': type(e).__name__
         }), 500
 
+F103_BATCH_MAX_ITEMS = int(os.getenv('F103_BATCH_MAX_ITEMS', '100'))
+F103_BATCH_HEADER_ERRORS = 20  # jumlah error per item di header X-Batch-Errors (daftar lengkap di ZIP)
+F103_BATCH_ERROR_MESSAGE_LENGTH = 200
+
+def _f103_prefill_from_pencatatan(ids):
+    """Data form F-1.03 dari record pencatatan: {id: data}."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT id, nik, name, phone_number, email, no_kk
+            FROM pencatatan WHERE id = ANY(%s)
+        """, (list(ids),))
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
+    return {
+        row[0]: {
+            'nik_pemohon': row[1] or '',
+            'nama_lengkap_pemohon': row[2] or '',
+            'no_hp': row[3] or '',
+            'email': row[4] or '',
+            'no_kk': row[5] or ''
+        }
+        for row in rows
+    }
+
+@app.route('/api/f103/batch', methods=['POST'])
+@login_required
+def f103_batch_route():
+    """Buat banyak F-1.03 sekaligus: satu PDF gabungan (output=pdf) atau ZIP (output=zip).
+
+    Body JSON: {"forms": [{...data form...}], "pencatatan_ids": [1, 2], "defaults": {...}, "output": "pdf"}
+    defaults mengisi field yang tidak ada di form / record pencatatan (mis. alamat pindah).
+    Item yang gagal dilaporkan per item (header X-Batch-Errors / batch_report.json di ZIP).
+    """
+    if not F103_AVAILABLE:
+        return jsonify({'error': 'F-1.03 functionality not available. Missing f103.py module or dependencies.'}), 500
+
+    payload = request.get_json(silent=True) or {}
+    output = (payload.get('output') or 'pdf').lower()
+    if output not in ('pdf', 'zip'):
+        return jsonify({'error': "output harus 'pdf' atau 'zip'"}), 400
+    forms = payload.get('forms') or []
+    pencatatan_ids = payload.get('pencatatan_ids') or []
+    defaults = payload.get('defaults') or {}
+    if not isinstance(forms, list) or not isinstance(pencatatan_ids, list) or not isinstance(defaults, dict):
+        return jsonify({'error': 'forms dan pencatatan_ids harus berupa list'}), 400
+    if not forms and not pencatatan_ids:
+        return jsonify({'error': 'Tidak ada form untuk dibuat'}), 400
+    if len(forms) + len(pencatatan_ids) > F103_BATCH_MAX_ITEMS:
+        return jsonify({'error': f'Maksimal {F103_BATCH_MAX_ITEMS} form per batch'}), 400
+
+    from f103 import render_pdf_f103_cached, render_pool, batch_render_cache, merge_pdf_files, f103_filename
+
+    # Susun item sesuai urutan permintaan: forms dulu, lalu pencatatan_ids
+    items = []
+    for form in forms:
+        items.append({'source': 'form', 'data': {**defaults, **form} if isinstance(form, dict) else None})
+    if pencatatan_ids:
+        try:
+            prefill = _f103_prefill_from_pencatatan(int(i) for i in pencatatan_ids)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'pencatatan_ids harus berupa angka'}), 400
+        for pid in pencatatan_ids:
+            data = prefill.get(int(pid))
+            items.append({'source': 'pencatatan', 'id': int(pid),
+                          'data': {**defaults, **data} if data else None})
+
+    # PDF per item langsung ditulis ke folder sementara, hasil gabungan/ZIP ke file sementara
+    # yang dialirkan ke klien; memori tidak menampung seluruh batch sekaligus
+    work_dir = tempfile.TemporaryDirectory(prefix='f103_batch_')
+
+    def render_item(index, item):
+        data = item['data']
+        if data is None:
+            raise ValueError('Pencatatan tidak ditemukan' if item['source'] == 'pencatatan' else 'Form harus berupa object')
+        data = dict(data)
+        signature = data.pop('signature', None)
+        jumlah_anggota = int(data.get('jumlah_anggota', 1) or 1)
+        # Batch menunggu slot kosong di pool render alih-alih langsung ditolak
+        pdf_bytes = render_pdf_f103_cached(data, signature, jumlah_anggota, wait=render_pool.timeout,
+                                           cache=batch_render_cache)
+        path = os.path.join(work_dir.name, f"{index:05d}.pdf")
+        with open(path, 'wb') as f:
+            f.write(pdf_bytes)
+        return path
+
+    try:
+        start = time.time()
+        results = []
+        with ThreadPoolExecutor(max_workers=max(1, render_pool.max_workers)) as executor:
+            futures = [executor.submit(render_item, index, item) for index, item in enumerate(items)]
+            for index, (item, future) in enumerate(zip(items, futures)):
+                result = {'index': index, 'source': item['source']}
+                if 'id' in item:
+                    result['pencatatan_id'] = item['id']
+                try:
+                    result['path'] = future.result()
+                    result['filename'] = f"{index + 1:03d}_{f103_filename(item['data'])}"
+                except Exception as e:
+                    result['error'] = str(e)
+                results.append(result)
+
+        succeeded = [r for r in results if 'path' in r]
+        errors = [{k: v for k, v in r.items() if k != 'path'} for r in results if 'error' in r]
+        print(f"📄 F-1.03 batch: {len(succeeded)} ok, {len(errors)} gagal dalam {time.time() - start:.1f}s")
+        if not succeeded:
+            return jsonify({'error': 'Semua form gagal dibuat', 'errors': errors}), 422
+
+        tanggal = datetime.now().strftime('%Y%m%d_%H%M%S')
+        headers = {
+            'X-Batch-Total': str(len(results)),
+            'X-Batch-Succeeded': str(len(succeeded)),
+            'X-Batch-Failed': str(len(errors))
+        }
+        # Dihapus otomatis saat ditutup, yaitu setelah respons selesai dikirim
+        output_file = tempfile.TemporaryFile()
+        try:
+            if output == 'zip':
+                # PDF sudah terkompresi, cukup disimpan apa adanya
+                with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_STORED) as zf:
+                    for r in succeeded:
+                        zf.write(r['path'], r['filename'])
+                    zf.writestr('batch_report.json', json.dumps({
+                        'total': len(results),
+                        'succeeded': [{'index': r['index'], 'filename': r['filename']} for r in succeeded],
+                        'errors': errors
+                    }, indent=2))
+                download_name, mimetype = f"F-1.03_batch_{tanggal}.zip", 'application/zip'
+            else:
+                try:
+                    merge_pdf_files([r['path'] for r in succeeded], output_file)
+                except RuntimeError as e:
+                    output_file.close()
+                    return jsonify({'error': str(e)}), 501
+                download_name, mimetype = f"F-1.03_batch_{tanggal}.pdf", 'application/pdf'
+                if errors:
+                    # Potong daftarnya, bukan string JSON-nya, agar header tetap JSON yang valid
+                    headers['X-Batch-Errors'] = json.dumps({
+                        'errors': [{**e, 'error': e['error'][:F103_BATCH_ERROR_MESSAGE_LENGTH]}
+                                   for e in errors[:F103_BATCH_HEADER_ERRORS]],
+                        'total': len(errors),
+                        'truncated': len(errors) > F103_BATCH_HEADER_ERRORS
+                    })
+            output_file.seek(0)
+            response = send_file(output_file, as_attachment=True, download_name=download_name, mimetype=mimetype)
+        except Exception:
+            output_file.close()
+            raise
+        response.headers.update(headers)
+        return response
+    finally:
+        # File per item sudah disalin ke output_file (atau batch gagal), folder bisa dihapus
+        work_dir.cleanup()
+
 # Health check endpoint untuk testing F-1.03 (TANPA login_required)
 @app.route('/api/f103/test', methods=['GET'])
 def f103_test():
@@ -1251,9 +3221,18 @@ def f103_test():
         except ImportError:
             pass
         
+        cache_stats = None
+        pool_stats = None
+        if F103_AVAILABLE:
+            from f103 import render_cache, batch_render_cache, render_pool
+            cache_stats = {**render_cache.stats(), 'batch': batch_render_cache.stats()}
+            pool_stats = render_pool.stats()
+
         return jsonify({
             'f103_available': F103_AVAILABLE,
             'fpdf_available': fpdf_available,
+            'cache': cache_stats,
+            'render_pool': pool_stats,
             'message': 'F-1.03 module is ready' if F103_AVAILABLE else 'F-1.03 module not available',
             'status': 'ok' if F103_AVAILABLE else 'error',
             'timestamp': datetime.now().isoformat(),
@@ -1281,6 +3260,32 @@ def debug_session():
         'timestamp': datetime.now().isoformat()
     })
 
+# --- Startup ---
+# Efek samping (migrasi skema + warm-up pool DB, thread reaper) tidak dijalankan saat import:
+# worker render F-1.03 (spawn) mengimpor ulang modul utama sebagai __mp_main__ dan tidak
+# boleh ikut membuka koneksi DB. startup() dipanggil dari __main__ atau request pertama (WSGI).
+_startup_done = False
+_startup_lock = threading.Lock()
+
+def startup():
+    global _startup_done
+    with _startup_lock:
+        if _startup_done:
+            return
+        _startup_done = True
+    # Jika database belum siap, migrasi akan dicoba lagi oleh require_schema() pada request berikutnya
+    try:
+        ensure_schema()
+    except Exception as e:
+        print(f"⚠️ Schema check at startup failed: {e}")
+    if hasattr(booking_store, 'start'):
+        booking_store.start()
+
+@app.before_request
+def _startup_once():
+    if not _startup_done:
+        startup()
+
 # Register F-1.03 blueprint only if available
 if f103_bp is not None:
     app.register_blueprint(f103_bp, url_prefix='/api/f103')
@@ -1289,5 +3294,6 @@ else:
     print("⚠️ F-1.03 blueprint not registered (dependencies missing)")
 
 if __name__ == '__main__':
+    startup()
     # Allow access from any IP address
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
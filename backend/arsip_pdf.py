@@ -0,0 +1,354 @@
+"""Utilitas PDF untuk arsip: menggabungkan hasil scan campuran (JPG/PNG/PDF) menjadi satu PDF."""
+import io
+import json
+import mimetypes
+import os
+import re
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from backup import file_sha256, iter_archive_files
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.generic import NameObject, NumberObject
+except ImportError:
+    PdfReader = PdfWriter = None
+
+# Ukuran A4 dalam inci; gambar diperkecil agar muat di A4 pada DPI target
+A4_INCHES = (8.27, 11.69)
+
+
+def convert_settings():
+    return {
+        'dpi': int(os.getenv('ARSIP_CONVERT_DPI', '150')),
+        'quality': int(os.getenv('ARSIP_CONVERT_JPEG_QUALITY', '75')),
+        'workers': int(os.getenv('ARSIP_CONVERT_WORKERS', str(min(4, os.cpu_count() or 1))))
+    }
+
+
+def check_dependencies():
+    """Pesan error jika library konversi belum terpasang, None jika siap."""
+    if Image is None or PdfWriter is None:
+        return 'Konversi file campuran memerlukan Pillow dan pypdf (pip install Pillow pypdf)'
+    return None
+
+
+def file_extension(filename):
+    return filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+
+
+def image_to_pdf_page(path, dpi=150, quality=75):
+    """Satu gambar -> PDF satu halaman (JPEG), diperkecil ke DPI target dan maksimal A4."""
+    with Image.open(path) as img:
+        short_px = int(A4_INCHES[0] * dpi)
+        # JPEG bisa di-decode langsung pada skala 1/2, 1/4, 1/8: hemat memori dan CPU
+        img.draft(None, (short_px, short_px))
+        if img.getexif().get(0x0112, 1) != 1:
+            # Foto ponsel: putar sesuai tag orientasi EXIF
+            img = ImageOps.exif_transpose(img)
+        portrait = img.height >= img.width
+        page_in = A4_INCHES if portrait else (A4_INCHES[1], A4_INCHES[0])
+        max_size = (int(page_in[0] * dpi), int(page_in[1] * dpi))
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+        elif img.mode == '1':
+            img = img.convert('L')
+        elif img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        # Perkecil dulu, baru ratakan transparansi ke putih pada ukuran kecil
+        img.thumbnail(max_size, Image.LANCZOS)
+        if img.mode == 'RGBA':
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+
+        buffer = io.BytesIO()
+        img.save(buffer, format='PDF', resolution=dpi, quality=quality)
+        return buffer.getvalue()
+
+
+def merge_to_pdf(paths, output_path, dpi=150, quality=75, workers=2):
+    """Gabungkan file JPG/PNG/PDF (urut sesuai paths) menjadi satu PDF di output_path.
+
+    Gambar diproses paralel, tetapi hanya sedikit yang sedang di-decode pada satu waktu
+    (jendela workers * 2); halaman yang sudah jadi disimpan dalam bentuk terkompresi.
+    Mengembalikan jumlah halaman.
+    """
+    writer = PdfWriter()
+    pending = deque()  # (nama_file, future) urut sesuai input
+
+    def add_next_image():
+        name, future = pending.popleft()
+        try:
+            page_pdf = future.result()
+        except (OSError, ValueError):
+            raise ValueError(f'Gambar tidak dapat dibaca: {name}')
+        writer.add_page(PdfReader(io.BytesIO(page_pdf)).pages[0])
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        try:
+            for path in paths:
+                name = os.path.basename(path)
+                if file_extension(path) == 'pdf':
+                    # Halaman gambar sebelumnya harus masuk dulu agar urutan tetap
+                    while pending:
+                        add_next_image()
+                    try:
+                        writer.append(PdfReader(path))
+                    except Exception as e:
+                        raise ValueError(f'PDF tidak dapat dibaca: {name} ({e})')
+                else:
+                    pending.append((name, executor.submit(image_to_pdf_page, path, dpi, quality)))
+                    if len(pending) >= max(1, workers) * 2:
+                        add_next_image()
+            while pending:
+                add_next_image()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    page_count = len(writer.pages)
+    tmp_path = output_path + '.part'
+    with open(tmp_path, 'wb') as f:
+        writer.write(f)
+    os.replace(tmp_path, output_path)
+    return page_count
+
+
+# --- Optimasi PDF arsip (downsample & kompres ulang gambar hasil scan) ---
+OPTIMIZE_MANIFEST_NAME = '.arsip_optimize.json'
+DAY_FOLDER_RE = re.compile(r'^\d{8}$')
+
+
+def optimize_settings():
+    return {
+        'dpi': int(os.getenv('ARSIP_OPTIMIZE_DPI', '150')),
+        'quality': int(os.getenv('ARSIP_OPTIMIZE_JPEG_QUALITY', '70')),
+        'min_saving': float(os.getenv('ARSIP_OPTIMIZE_MIN_SAVING', '0.05'))
+    }
+
+
+def optimize_enabled():
+    """Tahap optimasi setelah upload hanya jalan jika ARSIP_OPTIMIZE=1."""
+    return os.getenv('ARSIP_OPTIMIZE', '0') == '1' and check_dependencies() is None
+
+
+def _decode_image_xobject(xobj):
+    """PIL image dari XObject gambar 8-bit RGB/Gray tanpa mask; None jika jenisnya dilewati."""
+    if xobj.get('/SMask') is not None or xobj.get('/Mask') is not None or xobj.get('/ImageMask'):
+        return None
+    if xobj.get('/BitsPerComponent') != 8:
+        return None
+    color_space = xobj.get('/ColorSpace')
+    if hasattr(color_space, 'get_object'):
+        color_space = color_space.get_object()
+    if isinstance(color_space, list):
+        # [/ICCBased stream]: dipetakan ke RGB/Gray sesuai jumlah komponen
+        if len(color_space) < 2 or color_space[0] != '/ICCBased':
+            return None
+        components = color_space[1].get_object().get('/N')
+        color_space = {1: '/DeviceGray', 3: '/DeviceRGB'}.get(components)
+    if color_space not in ('/DeviceRGB', '/DeviceGray'):
+        return None
+
+    filters = xobj.get('/Filter')
+    if filters == '/DCTDecode':
+        img = Image.open(io.BytesIO(xobj._data))
+    elif filters == '/FlateDecode':
+        mode = 'RGB' if color_space == '/DeviceRGB' else 'L'
+        img = Image.frombytes(mode, (xobj['/Width'], xobj['/Height']), xobj.get_data())
+    else:
+        return None
+    return img
+
+
+def optimize_pdf(path, dpi=150, quality=70, min_saving=0.05):
+    """Downsample gambar di atas DPI target, kompres ulang JPEG, buang objek duplikat/yatim.
+
+    File hanya diganti (atomik, inode baru) jika hasilnya lebih kecil minimal min_saving
+    dan file asli tidak berubah selama diproses. Mengembalikan laporan ukuran.
+    """
+    before = os.stat(path)
+    report = {'bytes_before': before.st_size, 'bytes_after': before.st_size, 'images': 0, 'recompressed': 0,
+              'optimized': False}
+    reader = PdfReader(path)
+    writer = PdfWriter(clone_from=reader)
+    seen = set()
+    for page in writer.pages:
+        # Perkiraan konservatif: gambar dianggap selebar halaman, jadi tidak pernah turun di bawah DPI target
+        page_w_in = float(page.mediabox.width) / 72
+        page_h_in = float(page.mediabox.height) / 72
+        xobjects = (page.get('/Resources') or {}).get('/XObject') or {}
+        for ref in xobjects.values():
+            if getattr(ref, 'idnum', None) in seen:
+                continue
+            seen.add(getattr(ref, 'idnum', None))
+            xobj = ref.get_object()
+            if xobj.get('/Subtype') != '/Image':
+                continue
+            report['images'] += 1
+            try:
+                img = _decode_image_xobject(xobj)
+            except (OSError, ValueError):
+                img = None
+            if img is None:
+                continue
+            effective_dpi = max(img.width / page_w_in, img.height / page_h_in)
+            scale = dpi / effective_dpi
+            if scale < 0.95:
+                size = (max(1, int(img.width * scale)), max(1, int(img.height * scale)))
+                img.draft(None, size)
+                img = img.resize(size, Image.BICUBIC)
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            buffer = io.BytesIO()
+            img.save(buffer, format='JPEG', quality=quality, optimize=True)
+            data = buffer.getvalue()
+            if len(data) >= len(xobj._data):
+                continue
+            xobj._data = data
+            xobj[NameObject('/Filter')] = NameObject('/DCTDecode')
+            xobj[NameObject('/Width')] = NumberObject(img.width)
+            xobj[NameObject('/Height')] = NumberObject(img.height)
+            xobj[NameObject('/ColorSpace')] = NameObject('/DeviceRGB' if img.mode == 'RGB' else '/DeviceGray')
+            xobj[NameObject('/BitsPerComponent')] = NumberObject(8)
+            for key in ('/DecodeParms', '/Decode'):
+                if key in xobj:
+                    del xobj[key]
+            report['recompressed'] += 1
+        page.compress_content_streams()
+    writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+
+    # Nama unik: upload dan batch bisa memproses file yang sama bersamaan
+    tmp_path = f'{path}.{uuid.uuid4().hex[:8]}.part'
+    try:
+        with open(tmp_path, 'wb') as f:
+            writer.write(f)
+        after_size = os.path.getsize(tmp_path)
+        current = os.stat(path)
+        unchanged = (current.st_size, current.st_mtime_ns, current.st_ino) == \
+            (before.st_size, before.st_mtime_ns, before.st_ino)
+        if unchanged and after_size <= before.st_size * (1 - min_saving):
+            os.chmod(tmp_path, before.st_mode & 0o777)
+            os.replace(tmp_path, path)
+            report['bytes_after'] = after_size
+            report['optimized'] = True
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return report
+
+
+def optimize_pdf_safely(path, **settings):
+    """optimize_pdf untuk tahap setelah upload: error dicatat, file asli tetap dipakai."""
+    try:
+        started = time.time()
+        report = optimize_pdf(path, **settings)
+        if report['optimized']:
+            print(f"🗜️ Optimasi {os.path.basename(path)}: {report['bytes_before']} -> {report['bytes_after']} bytes "
+                  f"({time.time() - started:.1f}s)")
+        return report
+    except Exception as e:
+        print(f"⚠️ Optimasi PDF gagal untuk {path}: {e}")
+        return None
+
+
+def _load_optimize_manifest(root):
+    path = os.path.join(root, OPTIMIZE_MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_optimize_manifest(root, manifest):
+    path = os.path.join(root, OPTIMIZE_MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(path + '.tmp', path)
+
+
+def optimize_arsip_tree(root, settings=None, day=None, progress=None):
+    """Optimasi semua PDF di pohon yyyy/yyyymm/yyyymmdd; laporan byte yang dihemat per folder hari.
+
+    File yang sudah diproses (ukuran & mtime sama dengan catatan manifest) dilewati,
+    jadi batch berikutnya hanya memproses file baru atau yang berubah.
+    """
+    settings = settings or optimize_settings()
+    manifest = _load_optimize_manifest(root)
+    days = {}
+    totals = {'files': 0, 'optimized': 0, 'skipped': 0, 'failed': 0, 'bytes_before': 0, 'bytes_after': 0}
+    for rel_path, full_path in iter_archive_files(root):
+        if not rel_path.lower().endswith('.pdf'):
+            continue
+        parts = rel_path.split('/')
+        day_folder = parts[-2] if len(parts) >= 2 and DAY_FOLDER_RE.match(parts[-2]) else '-'
+        if day and day_folder != day:
+            continue
+        stat = os.stat(full_path)
+        entry = days.setdefault(day_folder, {'files': 0, 'optimized': 0, 'bytes_before': 0, 'bytes_after': 0,
+                                             'bytes_saved': 0})
+        entry['files'] += 1
+        totals['files'] += 1
+        if progress:
+            progress(stat.st_size)
+        if manifest.get(rel_path) == [stat.st_size, stat.st_mtime_ns]:
+            totals['skipped'] += 1
+            continue
+        try:
+            report = optimize_pdf(full_path, **settings)
+        except Exception as e:
+            print(f"⚠️ Optimasi PDF gagal untuk {rel_path}: {e}")
+            totals['failed'] += 1
+            continue
+        stat = os.stat(full_path)
+        manifest[rel_path] = [stat.st_size, stat.st_mtime_ns]
+        entry['bytes_before'] += report['bytes_before']
+        entry['bytes_after'] += report['bytes_after']
+        entry['bytes_saved'] += report['bytes_before'] - report['bytes_after']
+        totals['bytes_before'] += report['bytes_before']
+        totals['bytes_after'] += report['bytes_after']
+        if report['optimized']:
+            entry['optimized'] += 1
+            totals['optimized'] += 1
+        if totals['files'] % 10 == 0:
+            # Manifest disimpan berkala supaya job yang terputus tidak mengulang dari awal
+            _save_optimize_manifest(root, manifest)
+    _save_optimize_manifest(root, manifest)
+    totals['bytes_saved'] = totals['bytes_before'] - totals['bytes_after']
+    return {'days': days, 'totals': totals, 'settings': settings}
+
+
+def count_pages(path):
+    """Jumlah halaman PDF (1 untuk gambar); None jika tidak bisa dibaca."""
+    ext = file_extension(path)
+    if ext in ('jpg', 'jpeg', 'png'):
+        return 1
+    if ext != 'pdf' or PdfReader is None:
+        return None
+    try:
+        return len(PdfReader(path).pages)
+    except Exception as e:
+        print(f"⚠️ Gagal membaca jumlah halaman {os.path.basename(path)}: {e}")
+        return None
+
+
+def describe_archive_file(path, sha256=None):
+    """Metadata satu file arsip untuk katalog; sha256 yang sudah diketahui tidak dihitung ulang."""
+    stat = os.stat(path)
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': sha256 or file_sha256(path),
+        'pages': count_pages(path),
+        'mime_type': mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    }
@@ -0,0 +1,460 @@
+"""Mesin backup arsip inkremental, dump database, dan antrean job backup.
+
+Setiap snapshot disimpan di BACKUP_FOLDER/arsip_backup_<tanggal> dengan struktur
+yyyy/yyyymm/yyyymmdd yang sama seperti folder arsip. File yang tidak berubah
+di-hard-link dari snapshot sebelumnya sehingga hanya file baru/berubah yang disalin.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+MANIFEST_NAME = 'arsip_manifest.json'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    """Menghitung sha256 file per potongan agar memori tetap kecil."""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def load_manifest(backup_dir):
+    """Manifest: {path_relatif: {size, mtime, sha256, stored}} dari backup terakhir."""
+    path = os.path.join(backup_dir, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Manifest backup rusak, backup penuh akan dibuat: {e}")
+        return {}
+
+
+def save_manifest(backup_dir, manifest):
+    path = os.path.join(backup_dir, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def iter_archive_files(src):
+    """Menelusuri pohon arsip, melewati file sementara upload."""
+    for root, dirs, files in os.walk(src):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for name in sorted(files):
+            if name.startswith('.') or name.endswith('.part'):
+                continue
+            full_path = os.path.join(root, name)
+            yield os.path.relpath(full_path, src).replace('\\', '/'), full_path
+
+
+def _link_or_copy(source, target):
+    """Hard-link file yang sama; salin jika link tidak didukung (beda filesystem)."""
+    try:
+        os.link(source, target)
+        return False
+    except OSError:
+        shutil.copy2(source, target)
+        return True
+
+
+def backup_arsip_incremental(src, backup_dir, snapshot_date=None, progress=None):
+    """Membuat snapshot arsip dan hanya menyalin file yang baru atau berubah.
+
+    Mengembalikan ringkasan: jumlah file, file disalin/di-link, byte disalin/dilewati.
+    """
+    snapshot_date = snapshot_date or date.today().isoformat()
+    os.makedirs(backup_dir, exist_ok=True)
+    dst = os.path.join(backup_dir, f"arsip_backup_{snapshot_date}")
+    tmp_dst = dst + '.tmp'
+    if os.path.exists(tmp_dst):
+        shutil.rmtree(tmp_dst)
+    os.makedirs(tmp_dst)
+
+    manifest = load_manifest(backup_dir)
+    # Indeks konten: file dengan hash sama (meski beda nama) cukup di-link
+    by_hash = {}
+    for entry in manifest.values():
+        stored = os.path.join(backup_dir, entry['stored'])
+        if entry.get('sha256') and os.path.isfile(stored):
+            by_hash.setdefault(entry['sha256'], stored)
+
+    new_manifest = {}
+    report = {
+        'snapshot': dst,
+        'files': 0,
+        'copied': 0,
+        'linked': 0,
+        'bytes_copied': 0,
+        'bytes_skipped': 0,
+        'removed': 0
+    }
+    for rel_path, full_path in iter_archive_files(src):
+        st = os.stat(full_path)
+        target = os.path.join(tmp_dst, rel_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        previous = manifest.get(rel_path)
+        previous_stored = os.path.join(backup_dir, previous['stored']) if previous else None
+        if (previous and previous['size'] == st.st_size and previous['mtime'] == st.st_mtime
+                and os.path.isfile(previous_stored)):
+            # Ukuran & mtime sama: anggap tidak berubah tanpa membaca isinya
+            sha256 = previous['sha256']
+            source = previous_stored
+        else:
+            sha256 = file_sha256(full_path)
+            source = by_hash.get(sha256)
+
+        if source:
+            copied = _link_or_copy(source, target)
+        else:
+            shutil.copy2(full_path, target)
+            copied = True
+
+        if copied:
+            report['copied'] += 1
+            report['bytes_copied'] += st.st_size
+        else:
+            report['linked'] += 1
+            report['bytes_skipped'] += st.st_size
+        report['files'] += 1
+
+        stored_rel = os.path.relpath(os.path.join(dst, rel_path), backup_dir).replace('\\', '/')
+        new_manifest[rel_path] = {
+            'size': st.st_size,
+            'mtime': st.st_mtime,
+            'sha256': sha256,
+            'stored': stored_rel
+        }
+        by_hash.setdefault(sha256, target)
+        if progress:
+            progress(st.st_size)
+
+    report['removed'] = len(set(manifest) - set(new_manifest))
+
+    # Tukar snapshot lama hari yang sama dengan yang baru setelah semua link dibuat
+    if os.path.exists(dst):
+        old_dst = dst + '.old'
+        if os.path.exists(old_dst):
+            shutil.rmtree(old_dst)
+        os.rename(dst, old_dst)
+        os.rename(tmp_dst, dst)
+        shutil.rmtree(old_dst)
+    else:
+        os.rename(tmp_dst, dst)
+    save_manifest(backup_dir, new_manifest)
+    return report
+
+
+def dir_size(path):
+    """Total ukuran file di bawah path (atau ukuran file jika path berupa file)."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+# <db>_backup_YYYYMMDD_HHMMSS[.dump], serta format lama <db>_backup_YYYY-MM-DD.sql (pg_dump teks)
+DUMP_NAME_RE = re.compile(
+    r'^(?P<db>.+)_backup_(?:(?P<stamp>\d{8}_\d{6})(\.dump)?|(?P<day>\d{4}-\d{2}-\d{2})\.sql)$'
+)
+
+
+def dump_timestamp(match):
+    """Waktu dump dari nama file; dump format lama dianggap dibuat pukul 00:00."""
+    if match.group('stamp'):
+        return datetime.strptime(match.group('stamp'), '%Y%m%d_%H%M%S')
+    return datetime.strptime(match.group('day'), '%Y-%m-%d')
+
+
+def _dump_settings():
+    cpu = os.cpu_count() or 1
+    return {
+        'format': os.getenv('BACKUP_DB_FORMAT', 'directory').lower(),
+        'jobs': max(1, int(os.getenv('BACKUP_DB_JOBS', str(min(4, cpu))))),
+        'compression': max(0, min(9, int(os.getenv('BACKUP_DB_COMPRESSION', '6')))),
+        'keep_daily': int(os.getenv('BACKUP_KEEP_DAILY', '7')),
+        'keep_monthly': int(os.getenv('BACKUP_KEEP_MONTHLY', '6'))
+    }
+
+
+def _remove_path(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def verify_dump(path, env):
+    """Memastikan dump bisa dibaca pg_restore (--list) dan berisi entri TOC."""
+    result = subprocess.run(
+        ['pg_restore', '--list', path],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    if result.returncode != 0:
+        raise Exception(f"Verifikasi dump gagal: {result.stderr.strip()}")
+    entries = [line for line in result.stdout.splitlines() if line and not line.startswith(';')]
+    if not entries:
+        raise Exception("Verifikasi dump gagal: daftar isi dump kosong")
+    return len(entries)
+
+
+def rotate_dumps(backup_dir, db_name, keep_daily, keep_monthly):
+    """Menyimpan dump terbaru per hari (keep_daily hari) dan per bulan (keep_monthly bulan)."""
+    dumps = []
+    for name in os.listdir(backup_dir):
+        match = DUMP_NAME_RE.match(name)
+        if match and match.group('db') == db_name:
+            dumps.append((dump_timestamp(match), name))
+    dumps.sort(reverse=True)
+
+    keep = set()
+    days, months = [], []
+    for stamp, name in dumps:
+        day, month = stamp.date(), (stamp.year, stamp.month)
+        if day not in days and len(days) < keep_daily:
+            days.append(day)
+            keep.add(name)
+        if month not in months and len(months) < keep_monthly:
+            months.append(month)
+            keep.add(name)
+
+    removed = []
+    for _, name in dumps:
+        if name not in keep:
+            _remove_path(os.path.join(backup_dir, name))
+            removed.append(name)
+    return removed
+
+
+def dump_database(backup_dir, progress=None):
+    """Menjalankan pg_dump (paralel untuk format directory), verifikasi, lalu rotasi."""
+    os.makedirs(backup_dir, exist_ok=True)
+    settings = _dump_settings()
+    db_name = os.getenv('PG_DB', 'sicakap_db')
+    user = os.getenv('PG_USER', 'postgres')
+    host = os.getenv('PG_HOST', 'localhost')
+    port = os.getenv('PG_PORT', '5432')
+    env = {**os.environ, 'PGPASSWORD': os.getenv('PG_PASS', 'postgres')}
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    cmd = ['pg_dump', '-h', host, '-p', port, '-U', user, '-b', '-Z', str(settings['compression'])]
+    if settings['format'] == 'directory':
+        # Format directory: satu file per tabel, bisa di-dump paralel dengan -j
+        backup_file = os.path.join(backup_dir, f"{db_name}_backup_{stamp}")
+        cmd += ['-F', 'd', '-j', str(settings['jobs'])]
+    else:
+        backup_file = os.path.join(backup_dir, f"{db_name}_backup_{stamp}.dump")
+        cmd += ['-F', 'c']
+    cmd += ['-f', backup_file, db_name]
+
+    proc = subprocess.Popen(cmd, env=env)
+    reported = 0
+    while True:
+        try:
+            returncode = proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            returncode = None
+        # Progres = pertambahan ukuran file dump selama pg_dump berjalan
+        if os.path.exists(backup_file):
+            size = dir_size(backup_file)
+            if size > reported:
+                if progress:
+                    progress(size - reported)
+                reported = size
+        if returncode is not None:
+            break
+    if returncode != 0:
+        _remove_path(backup_file)
+        raise subprocess.CalledProcessError(returncode, 'pg_dump')
+
+    try:
+        entries = verify_dump(backup_file, env)
+    except Exception:
+        _remove_path(backup_file)
+        raise
+    removed = rotate_dumps(backup_dir, db_name, settings['keep_daily'], settings['keep_monthly'])
+    return {
+        'file': backup_file,
+        'bytes': reported,
+        'format': settings['format'],
+        'jobs': settings['jobs'] if settings['format'] == 'directory' else 1,
+        'compression': settings['compression'],
+        'toc_entries': entries,
+        'rotated': removed
+    }
+
+
+PROGRESS_SAVE_INTERVAL = 2.0  # detik; progres disimpan ke store paling sering sekali per interval
+
+
+class BackupJob:
+    """Status satu job backup yang dapat dibaca lewat API."""
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.state = 'queued'
+        self.bytes_processed = 0
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.output = None
+        self.report = None
+        self.error = None
+        self.on_progress = None  # dipasang runner: menyimpan progres ke store
+        self._last_saved = 0.0
+        self._lock = threading.Lock()
+
+    def add_progress(self, nbytes):
+        with self._lock:
+            self.bytes_processed += nbytes
+            now = time.time()
+            save = self.on_progress is not None and now - self._last_saved >= PROGRESS_SAVE_INTERVAL
+            if save:
+                self._last_saved = now
+        if save:
+            self.on_progress(self)
+
+    def to_dict(self):
+        with self._lock:
+            return job_dict(self.id, self.kind, self.state, self.bytes_processed, self.created_at,
+                            self.started_at, self.finished_at, self.output, self.report, self.error)
+
+
+def job_dict(job_id, kind, state, bytes_processed, created_at, started_at, finished_at, output, report, error):
+    """Bentuk JSON status job, sama untuk job di memori maupun baris database."""
+    end = finished_at or datetime.now()
+    return {
+        'id': job_id,
+        'kind': kind,
+        'state': state,
+        'bytes_processed': bytes_processed,
+        'created_at': created_at.isoformat(),
+        'started_at': started_at.isoformat() if started_at else None,
+        'finished_at': finished_at.isoformat() if finished_at else None,
+        'elapsed_seconds': round((end - started_at).total_seconds(), 2) if started_at else 0,
+        'output': output,
+        'report': report,
+        'error': error
+    }
+
+
+class MemoryJobStore:
+    """Status job di memori proses; hanya akurat untuk deployment satu proses.
+
+    Hanya satu job aktif (queued/running) per jenis; job selesai disimpan
+    sampai max_history agar statusnya masih bisa dicek.
+    """
+
+    def __init__(self, max_history=50):
+        self._jobs = {}
+        self._active = {}  # {kind: job_id}
+        self._lock = threading.Lock()
+        self.max_history = max_history
+
+    def try_start(self, job):
+        """(True, None) jika job menjadi job aktif jenisnya, atau (False, dict job yang sedang aktif)."""
+        with self._lock:
+            active_id = self._active.get(job.kind)
+            if active_id:
+                return False, self._jobs[active_id].to_dict()
+            self._jobs[job.id] = job
+            self._active[job.kind] = job.id
+            self._trim_history()
+        return True, None
+
+    def save(self, job):
+        pass  # objek job sendiri yang dibaca get()/list()
+
+    def finish(self, job):
+        with self._lock:
+            if self._active.get(job.kind) == job.id:
+                del self._active[job.kind]
+
+    def _trim_history(self):
+        finished = [j for j in self._jobs.values() if j.state in ('succeeded', 'failed')]
+        for job in sorted(finished, key=lambda j: j.created_at)[:max(0, len(self._jobs) - self.max_history)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def list(self):
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+        return [job.to_dict() for job in jobs]
+
+
+class BackupJobRunner:
+    """Menjalankan job backup di thread latar dengan batas konkurensi.
+
+    Status job dan batas satu job aktif per jenis diurus store (MemoryJobStore atau
+    penyimpanan database milik app) sehingga bisa dibagi antar worker.
+    """
+
+    def __init__(self, max_workers=2, store=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='backup-job')
+        self.store = store or MemoryJobStore()
+
+    def submit(self, kind, func):
+        """Menjadwalkan func(job) -> dict hasil. Mengembalikan (dict job, True) atau (dict job aktif, False)."""
+        job = BackupJob(kind)
+        started, active = self.store.try_start(job)
+        if not started:
+            return active, False
+        try:
+            self._executor.submit(self._run, job, func)
+        except Exception as e:
+            job.state = 'failed'
+            job.error = str(e)
+            job.finished_at = datetime.now()
+            self.store.finish(job)
+            raise
+        return job.to_dict(), True
+
+    def _run(self, job, func):
+        job.state = 'running'
+        job.started_at = datetime.now()
+        job.on_progress = self.store.save
+        self.store.save(job)
+        try:
+            result = func(job) or {}
+            job.output = result.get('output')
+            job.report = result.get('report')
+            job.state = 'succeeded'
+        except Exception as e:
+            print(f"❌ Backup job {job.kind} {job.id} gagal: {e}")
+            job.error = str(e)
+            job.state = 'failed'
+        finally:
+            job.finished_at = datetime.now()
+            job.on_progress = None
+            self.store.finish(job)
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def list(self):
+        return self.store.list()
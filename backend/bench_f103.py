@@ -0,0 +1,100 @@
+"""Benchmark render F-1.03: render penuh vs overlay template, per jumlah anggota keluarga.
+
+Mengukur generate_pdf_f103 langsung (tanpa pool proses dan cache hasil), jadi angka yang
+keluar adalah biaya CPU per form di satu core. Isian dibuat unik per iterasi.
+
+    python bench_f103.py [--iterations 200] [--members 1 5 10] [--signature]
+"""
+import argparse
+import base64
+import contextlib
+import io
+import statistics
+import time
+
+import f103
+
+
+def sample_signature():
+    from PIL import Image
+    img = Image.new('RGBA', (300, 150), (0, 0, 0, 0))
+    for x in range(20, 280):
+        img.putpixel((x, 75 + (x % 40) - 20), (0, 0, 0, 255))
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def sample_form(index, jumlah_anggota):
+    data = {
+        'nik_pemohon': f'3205{index:012d}',
+        'nama_lengkap_pemohon': f'Pemohon Benchmark {index}',
+        'no_kk': f'3206{index:012d}',
+        'no_hp': '081234567890',
+        'jenis_permohonan': 'SKPWNI',
+        'klasifikasi_kepindahan': 'ANTAR_KABUPATEN',
+        'alasan_pindah': 'PEKERJAAN',
+        'jumlah_anggota': jumlah_anggota,
+    }
+    for i in range(1, jumlah_anggota + 1):
+        data[f'anggota_nik_{i}'] = f'3207{index:09d}{i:03d}'
+        data[f'anggota_nama_{i}'] = f'Anggota {i} Form {index}'
+        data[f'anggota_shdk_{i}'] = 'ANAK'
+    return data
+
+
+def run(jumlah_anggota, iterations, template_enabled, signature):
+    """Waktu per form (detik) untuk setiap iterasi."""
+    f103.F103_TEMPLATE_ENABLED = template_enabled
+    with contextlib.redirect_stdout(io.StringIO()):
+        # generate_pdf_f103 mencetak log per form; tidak perlu tampil di hasil benchmark
+        return _timed(jumlah_anggota, iterations, signature)
+
+
+def _timed(jumlah_anggota, iterations, signature):
+    # Pemanasan: template, font, dan import sudah siap sebelum diukur
+    for i in range(3):
+        f103.generate_pdf_f103(sample_form(i, jumlah_anggota), signature, jumlah_anggota)
+    timings = []
+    for i in range(iterations):
+        data = sample_form(1000 + i, jumlah_anggota)
+        start = time.perf_counter()
+        f103.generate_pdf_f103(data, signature, jumlah_anggota)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def describe(timings):
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    mean = statistics.mean(timings)
+    return f"rata-rata {mean * 1000:6.1f} ms, p95 {p95 * 1000:6.1f} ms, {1 / mean:6.0f} form/s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark render F-1.03 (penuh vs overlay template)')
+    parser.add_argument('--iterations', type=int, default=200, help='Jumlah form per skenario (default: 200)')
+    parser.add_argument('--members', type=int, nargs='+', default=[1, 5, 10],
+                        help='Jumlah anggota keluarga yang diuji (default: 1 5 10)')
+    parser.add_argument('--signature', action='store_true', help='Sertakan tanda tangan di setiap form')
+    args = parser.parse_args()
+
+    if f103.f103_bp is None:
+        raise SystemExit('❌ Dependensi F-1.03 tidak lengkap (pip install -r requirements_f103.txt)')
+    template_available = f103.F103_TEMPLATE_ENABLED
+    if not template_available:
+        print('⚠️ Overlay template tidak aktif (F103_TEMPLATE=0 atau fpdf2 tidak didukung), hanya render penuh')
+
+    # Tanda tangan sama di semua form: decode/resize hanya dihitung sekali (sesuai cache di produksi)
+    signature = sample_signature() if args.signature else None
+    for jumlah_anggota in args.members:
+        full = run(jumlah_anggota, args.iterations, False, signature)
+        print(f"{jumlah_anggota:2d} anggota  penuh   : {describe(full)}")
+        if template_available:
+            overlay = run(jumlah_anggota, args.iterations, True, signature)
+            speedup = statistics.mean(full) / statistics.mean(overlay)
+            print(f"{jumlah_anggota:2d} anggota  overlay : {describe(overlay)}  ({speedup:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
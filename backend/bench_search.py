@@ -0,0 +1,129 @@
+"""Benchmark pencarian daftar pencatatan pada tabel besar (default 1 juta baris).
+
+Query diambil dari fungsi yang sama dengan endpoint /api/pencatatan
+(build_pencatatan_filters, build_pencatatan_page_query, count_pencatatan), lalu
+dibandingkan dengan pencarian lama yang membungkus setiap kolom dengan ILIKE '%term%'.
+Script ini MENGISI ULANG tabel pencatatan, jadi hanya jalan terhadap database yang
+disebut eksplisit:
+
+    SICAKAP_BENCH_DB=sicakap_bench PG_USER=... PG_PASS=... python bench_search.py [--rows 1000000]
+    python bench_search.py --no-seed   # pakai data yang sudah ada
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+# Isi pencatatan sintetis: ~200 nomor per hari, NIK/KK 16 digit acak, nama unik
+SEED_PENCATATAN_SQL = """
+    INSERT INTO pencatatan (reg_number, reg_date, service_code, nik, name, no_kk, status, archive_path)
+    SELECT 601 + (i % 200),
+           CURRENT_DATE - (i / 200),
+           (ARRAY['P', 'D', 'B'])[1 + i % 3],
+           lpad((3205000000000000 + i * 7919 % 999999999)::text, 16, '0'),
+           'Warga ' || md5(i::text),
+           lpad((3205100000000000 + i * 104729 % 999999999)::text, 16, '0'),
+           (ARRAY['DIPROSES', 'SELESAI'])[1 + i % 2],
+           to_char(CURRENT_DATE - (i / 200), 'YYYY/YYYYMM/YYYYMMDD') || '/' || i || '.pdf'
+    FROM generate_series(1, %s) AS i
+"""
+
+# Pencarian sebelum build_search_filter, sebagai pembanding
+LEGACY_SEARCH_SQL = "(nik ILIKE %s OR name ILIKE %s OR CAST(reg_number AS TEXT) ILIKE %s)"
+
+SCENARIOS = [
+    ('NIK lengkap', {'search': '3205000000007919'}),
+    ('bagian awal NIK', {'search': '3205000012'}),
+    ('bagian tengah NIK', {'search': '0079190'}),
+    ('nomor registrasi', {'search': '601'}),
+    ('nama', {'search': 'c4ca4238a0'}),
+    ('status', {'status': 'DIPROSES'}),
+    ('rentang tanggal', {'start_date': '2024-01-01', 'end_date': '2024-01-31'}),
+]
+
+
+def seed_pencatatan(cur, rows):
+    cur.execute("TRUNCATE pencatatan RESTART IDENTITY CASCADE")
+    cur.execute(SEED_PENCATATAN_SQL, (rows,))
+    cur.execute("ANALYZE pencatatan")
+
+
+def plan_indexes(cur, sql, values):
+    """Nama indeks (atau 'Seq Scan') yang dipakai planner untuk query."""
+    cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", tuple(values))
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    found, stack = [], [plan[0]['Plan']]
+    while stack:
+        node = stack.pop()
+        if node.get('Index Name'):
+            found.append(node['Index Name'])
+        elif node.get('Node Type') == 'Seq Scan':
+            found.append('Seq Scan')
+        stack.extend(node.get('Plans', []))
+    return sorted(set(found))
+
+
+def timed(repeat, fn):
+    """Median waktu (ms) dari beberapa kali eksekusi setelah satu kali pemanasan."""
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pencarian pencatatan pada tabel besar')
+    parser.add_argument('--rows', type=int, default=1000000, help='Jumlah baris uji (default: 1000000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Pengulangan per query (default: 5)')
+    parser.add_argument('--per-page', type=int, default=20, help='Ukuran halaman (default: 20)')
+    parser.add_argument('--no-seed', action='store_true', help='Jangan isi ulang tabel pencatatan')
+    args = parser.parse_args()
+
+    bench_db = os.getenv('SICAKAP_BENCH_DB')
+    if not bench_db:
+        raise SystemExit('❌ SICAKAP_BENCH_DB belum diisi (database ini akan diisi ulang)')
+    os.environ['PG_DB'] = bench_db
+    import app as sicakap
+
+    sicakap.ensure_schema(force=True)
+    conn = sicakap._connect_db()
+    cur = conn.cursor()
+    try:
+        if not args.no_seed:
+            start = time.time()
+            seed_pencatatan(cur, args.rows)
+            conn.commit()
+            print(f"✅ {args.rows} baris pencatatan diisi dalam {time.time() - start:.0f}s")
+        cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if not cur.fetchone():
+            print("⚠️ pg_trgm tidak terpasang: pencarian substring tanpa indeks trigram")
+
+        print(f"{'skenario':<20} {'halaman':>9} {'total':>9} {'lama':>9}  indeks")
+        for label, params in SCENARIOS:
+            where, values = sicakap.build_pencatatan_filters(params)
+            sql, page_values = sicakap.build_pencatatan_page_query(where, values, per_page=args.per_page)
+            page_ms = timed(args.repeat, lambda: (cur.execute(sql, tuple(page_values)), cur.fetchall()))
+            count_ms = timed(args.repeat, lambda: sicakap.count_pencatatan(cur, where, values))
+            legacy = '-'
+            if 'search' in params:
+                pattern = f"%{params['search']}%"
+                legacy_sql, legacy_values = sicakap.build_pencatatan_page_query(
+                    LEGACY_SEARCH_SQL, [pattern] * 3, per_page=args.per_page)
+                legacy_ms = timed(args.repeat, lambda: (cur.execute(legacy_sql, tuple(legacy_values)), cur.fetchall()))
+                legacy = f"{legacy_ms:7.1f}ms"
+            indexes = ', '.join(plan_indexes(cur, sql, page_values))
+            print(f"{label:<20} {page_ms:7.1f}ms {count_ms:7.1f}ms {legacy:>9}  {indexes}")
+    finally:
+        conn.rollback()
+        cur.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
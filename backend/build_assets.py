@@ -0,0 +1,218 @@
+"""Build aset frontend: nama file ber-hash isi, varian gzip/brotli, dan index.html baru.
+
+Hasil ditulis ke frontend/dist/ dan disajikan app.py jika STATIC_ASSETS=dist:
+  - setiap JS/CSS disalin sebagai <nama>.<hash>.<ext>; import ES module di JS dan
+    url()/@import di CSS ikut ditulis ulang ke nama ber-hash
+  - <file>.gz dan <file>.br (brotli opsional: pip install Brotli) untuk file teks
+  - index.html menunjuk ke nama ber-hash, manifest.json memetakan nama asli -> nama ber-hash
+
+Jalankan ulang setiap kali frontend berubah:
+    python build_assets.py [--frontend ../frontend]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import uuid
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DIST_NAME = 'dist'
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 10
+ASSET_EXTENSIONS = ('.js', '.css')
+COMPRESS_EXTENSIONS = ('.js', '.css', '.html', '.json', '.svg')
+COMPRESS_MIN_SIZE = 1024
+
+# Library CDN yang juga tersedia sebagai salinan lokal; di build dialihkan ke salinan lokal
+# agar ikut dikompresi dan di-cache lama tanpa bergantung koneksi ke CDN
+LOCAL_COPIES = {
+    'https://cdn.jsdelivr.net/npm/sweetalert2@11': 'js/sweetalert2@11.js',
+}
+
+JS_IMPORT_RE = re.compile(r'''(\bfrom\s*|\bimport\s*\(\s*|\bimport\s+)(['"])(\.{1,2}/[^'"]+)\2''')
+CSS_URL_RE = re.compile(r'''(url\(\s*)(['"]?)([^'")]+)\2(\s*\))''')
+CSS_IMPORT_RE = re.compile(r'''(@import\s+)(['"])([^'"]+)\2''')
+HTML_REF_RE = re.compile(r'''(\b(?:src|href)=)(["'])([^"']+)\2''')
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(rel_path, digest):
+    """css/style.css -> css/style.<hash>.css"""
+    base, ext = os.path.splitext(rel_path)
+    return f"{base}.{digest}{ext}"
+
+
+def is_local_ref(ref):
+    return not (ref.startswith(('data:', '#', '/')) or '://' in ref or ref.startswith('//'))
+
+
+def collect_assets(frontend_dir):
+    """Semua JS/CSS di frontend (kecuali dist) sebagai path relatif ber-slash '/'."""
+    assets = []
+    for dirpath, dirnames, filenames in os.walk(frontend_dir):
+        dirnames[:] = sorted(d for d in dirnames if d != DIST_NAME and not d.startswith('.'))
+        for name in sorted(filenames):
+            if name.endswith(ASSET_EXTENSIONS):
+                rel_path = os.path.relpath(os.path.join(dirpath, name), frontend_dir)
+                assets.append(rel_path.replace(os.sep, '/'))
+    return assets
+
+
+def resolve_ref(from_path, ref):
+    """Path relatif ref (tanpa query/fragment) terhadap file from_path, atau None jika keluar root."""
+    clean = re.split(r'[?#]', ref, 1)[0]
+    joined = os.path.normpath(os.path.join(os.path.dirname(from_path), clean)).replace(os.sep, '/')
+    return None if joined.startswith('../') or joined == '..' else joined
+
+
+def relative_ref(from_path, target):
+    """Referensi dari from_path ke target, mempertahankan gaya './' untuk import ES module."""
+    ref = os.path.relpath(target, os.path.dirname(from_path) or '.').replace(os.sep, '/')
+    return ref if ref.startswith('../') else './' + ref
+
+
+class AssetBuilder:
+    def __init__(self, frontend_dir):
+        self.frontend_dir = frontend_dir
+        self.assets = set(collect_assets(frontend_dir))
+        self.manifest = {}  # {path asli: path ber-hash}
+        self.outputs = {}  # {path ber-hash: bytes}
+        self._building = set()
+
+    def build(self, rel_path):
+        """Hash satu aset setelah semua dependensinya di-hash (dependensi lebih dulu)."""
+        if rel_path in self.manifest:
+            return self.manifest[rel_path]
+        if rel_path in self._building:
+            raise ValueError(f"Import melingkar terdeteksi di {rel_path}")
+        self._building.add(rel_path)
+        with open(os.path.join(self.frontend_dir, rel_path), 'rb') as f:
+            text = f.read().decode('utf-8')
+
+        def rewrite(match, keep_dot_slash):
+            prefix, quote_char, ref = match.group(1), match.group(2), match.group(3)
+            suffix = match.group(4) if match.re.groups >= 4 else ''
+            target = resolve_ref(rel_path, ref) if is_local_ref(ref) else None
+            if target not in self.assets:
+                return match.group(0)
+            new_ref = relative_ref(rel_path, self.build(target))
+            if not keep_dot_slash and new_ref.startswith('./'):
+                new_ref = new_ref[2:]
+            return f"{prefix}{quote_char}{new_ref}{quote_char}{suffix}"
+
+        if rel_path.endswith('.js'):
+            text = JS_IMPORT_RE.sub(lambda m: rewrite(m, True), text)
+        else:
+            text = CSS_IMPORT_RE.sub(lambda m: rewrite(m, False), text)
+            text = CSS_URL_RE.sub(lambda m: rewrite(m, False), text)
+
+        data = text.encode('utf-8')
+        output_path = hashed_name(rel_path, content_hash(data))
+        self._building.discard(rel_path)
+        self.manifest[rel_path] = output_path
+        self.outputs[output_path] = data
+        return output_path
+
+    def build_index(self):
+        """index.html dengan src/href lokal (dan LOCAL_COPIES) diganti ke nama ber-hash."""
+        with open(os.path.join(self.frontend_dir, 'index.html'), 'rb') as f:
+            html = f.read().decode('utf-8')
+
+        def rewrite(match):
+            prefix, quote_char, ref = match.groups()
+            target = LOCAL_COPIES.get(ref)
+            if target is None and is_local_ref(ref):
+                target = resolve_ref('index.html', ref)
+            if target not in self.assets:
+                return match.group(0)
+            return f"{prefix}{quote_char}{self.build(target)}{quote_char}"
+
+        self.outputs['index.html'] = HTML_REF_RE.sub(rewrite, html).encode('utf-8')
+
+
+def compress_variants(data):
+    """{'.gz': bytes, '.br': bytes} hanya untuk varian yang benar-benar lebih kecil."""
+    variants = {}
+    if len(data) < COMPRESS_MIN_SIZE:
+        return variants
+    # mtime=0 agar hasil build identik untuk isi yang sama
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        variants['.gz'] = gz
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            variants['.br'] = br
+    return variants
+
+
+def write_dist(frontend_dir, outputs, manifest):
+    """Tulis ke folder sementara lalu tukar dengan dist lama agar tidak ada build setengah jadi."""
+    dist_dir = os.path.join(frontend_dir, DIST_NAME)
+    tmp_dir = os.path.join(frontend_dir, f".{DIST_NAME}-{uuid.uuid4().hex[:8]}")
+    totals = {'files': 0, 'bytes': 0, 'gzip_bytes': 0, 'brotli_bytes': 0}
+    for rel_path, data in sorted(outputs.items()):
+        target = os.path.join(tmp_dir, *rel_path.split('/'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(data)
+        totals['files'] += 1
+        totals['bytes'] += len(data)
+        if rel_path.endswith(COMPRESS_EXTENSIONS):
+            variants = compress_variants(data)
+            for suffix, payload in variants.items():
+                with open(target + suffix, 'wb') as f:
+                    f.write(payload)
+            totals['gzip_bytes'] += len(variants.get('.gz', data))
+            totals['brotli_bytes'] += len(variants.get('.br', data)) if brotli is not None else 0
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    old_dir = None
+    if os.path.isdir(dist_dir):
+        old_dir = tmp_dir + '-old'
+        os.rename(dist_dir, old_dir)
+    os.rename(tmp_dir, dist_dir)
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
+    return dist_dir, totals
+
+
+def build_assets(frontend_dir):
+    builder = AssetBuilder(frontend_dir)
+    builder.build_index()
+    for rel_path in sorted(builder.assets):
+        builder.build(rel_path)
+    dist_dir, totals = write_dist(frontend_dir, builder.outputs, builder.manifest)
+    return dist_dir, builder.manifest, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build aset frontend ber-hash dan terkompresi')
+    parser.add_argument('--frontend', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend'),
+                        help='Folder frontend (default: ../frontend)')
+    args = parser.parse_args()
+
+    frontend_dir = os.path.abspath(args.frontend)
+    dist_dir, manifest, totals = build_assets(frontend_dir)
+    for source, hashed in sorted(manifest.items()):
+        print(f"  {source} -> {hashed}")
+    print(f"✅ {totals['files']} file ditulis ke {dist_dir} "
+          f"({totals['bytes'] / 1024:.0f} KB, gzip {totals['gzip_bytes'] / 1024:.0f} KB"
+          + (f", brotli {totals['brotli_bytes'] / 1024:.0f} KB)" if brotli is not None else ")"))
+    if brotli is None:
+        print("⚠️ Modul brotli tidak tersedia, varian .br dilewati (pip install Brotli)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,6 @@
 # Import dependencies dengan error handling yang lebih baik
+import os
+
 try:
     from flask import request, send_file, Blueprint, jsonify
     FLASK_AVAILABLE = True
@@ -19,6 +21,12 @@ except ImportError as e:
     print("💡 Install with: pip install fpdf2")
     FPDF_AVAILABLE = False
 
+try:
+    # Dipakai untuk mendaftarkan font template F-1.03 (overlay butuh fpdf2 >= 2.8.3)
+    from fpdf.enums import PDFResourceType
+except ImportError:
+    PDFResourceType = None
+
 try:
     import io
     from PIL import Image
@@ -29,6 +37,286 @@ except ImportError as e:
     print(f"❌ Basic dependencies not available: {e}")
     BASIC_DEPS_AVAILABLE = False
 
+try:
+    # Menggabungkan beberapa PDF (batch F-1.03)
+    from pypdf import PdfWriter, PdfReader
+except ImportError:
+    PdfWriter = PdfReader = None
+
+try:
+    # Rasterisasi PDF di dalam proses (tanpa subprocess poppler per permintaan)
+    import pymupdf
+except ImportError:
+    try:
+        import fitz as pymupdf
+    except ImportError:
+        pymupdf = None
+
+import hashlib
+import io
+import json
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime
+
+import f103_worker
+
+
+class RenderCache:
+    """Cache LRU hasil render (PDF/PNG) dibatasi total byte dan TTL."""
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._items = OrderedDict()  # {key: (waktu_simpan, bytes)}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or time.time() - item[0] > self.ttl:
+                if item is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+            self._items[key] = (time.time(), value)
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                self._drop(next(iter(self._items)))
+
+    def _drop(self, key):
+        _, value = self._items.pop(key)
+        self._size -= len(value)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._items),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+render_cache = RenderCache(
+    max_bytes=int(os.getenv('F103_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+    ttl=float(os.getenv('F103_CACHE_TTL', '600'))
+)
+# Cache terpisah untuk /api/f103/batch agar satu batch besar tidak mengusir entri interaktif
+batch_render_cache = RenderCache(
+    max_bytes=int(os.getenv('F103_BATCH_CACHE_MAX_BYTES', str(16 * 1024 * 1024))),
+    ttl=float(os.getenv('F103_CACHE_TTL', '600'))
+)
+
+
+class RenderBusyError(Exception):
+    """Antrian render F-1.03 penuh; klien diminta mencoba lagi."""
+
+
+class RenderTimeoutError(Exception):
+    """Render F-1.03 melebihi batas waktu per job."""
+
+
+class RenderPool:
+    """Process pool terbatas untuk render F-1.03 agar thread request Flask tidak tertahan CPU.
+
+    Slot = worker + antrian; jika semua slot terpakai job langsung ditolak (RenderBusyError).
+    Job yang melewati timeout tidak bisa dibatalkan, jadi pool didaur ulang: worker dihentikan
+    paksa agar slotnya kembali dan job lain tidak ikut tertahan.
+    max_workers=0 berarti render dijalankan langsung di thread pemanggil.
+    """
+
+    def __init__(self, max_workers, max_queue, timeout):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, max_workers + max_queue))
+        self._held = set()  # future yang masih memegang slot
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.recycled = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: worker tidak mewarisi thread/koneksi DB dari proses Flask; job dan
+                # initializer ada di f103_worker yang tidak punya efek samping saat import
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=f103_worker.warm_up
+                )
+            return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _recycle(self, executor):
+        """Hentikan paksa semua worker executor (ada job macet); run berikutnya membuat pool baru.
+
+        Future yang masih berjalan di executor ini selesai dengan BrokenProcessPool sehingga
+        slotnya dilepas lewat _release.
+        """
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+            self.recycled += 1
+        # shutdown() mengosongkan _processes, jadi ambil daftarnya lebih dulu
+        processes = list((getattr(executor, '_processes', None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def _release(self, future):
+        # Dipanggil dari done callback dan langsung saat timeout; slot hanya dilepas sekali
+        with self._lock:
+            if future not in self._held:
+                return
+            self._held.discard(future)
+            self.active -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def run(self, func, *args, wait=None):
+        """Jalankan func(*args) di worker dan tunggu hasilnya maksimal self.timeout detik.
+
+        wait: berapa detik boleh menunggu slot kosong (dipakai batch); default langsung ditolak.
+        """
+        if self.max_workers <= 0:
+            return func(*args)
+        try:
+            return self._run_once(func, args, wait)
+        except (BrokenProcessPool, CancelledError):
+            # Pool didaur ulang karena job lain timeout (atau worker mati): ulangi sekali di pool baru
+            return self._run_once(func, args, wait)
+
+    def _run_once(self, func, args, wait):
+        acquired = self._slots.acquire(timeout=wait) if wait else self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self.rejected += 1
+            raise RenderBusyError('Server sedang sibuk membuat formulir, silakan coba lagi')
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(func, *args)
+        except (BrokenProcessPool, RuntimeError):
+            self._slots.release()
+            self._reset(executor)
+            raise
+        with self._lock:
+            self.active += 1
+            self._held.add(future)
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FuturesTimeoutError:
+            # Job yang sudah berjalan tidak bisa dibatalkan; tanpa daur ulang worker macet
+            # menahan slot selamanya dan semua render berikutnya ditolak
+            with self._lock:
+                self.timeouts += 1
+            self._recycle(executor)
+            self._release(future)
+            raise RenderTimeoutError(f'Pembuatan formulir melebihi {self.timeout:g} detik')
+        except BrokenProcessPool:
+            self._reset(executor)
+            raise
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'timeout': self.timeout,
+                'active': self.active,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'recycled': self.recycled
+            }
+
+
+render_pool = RenderPool(
+    max_workers=int(os.getenv('F103_RENDER_WORKERS', str(min(4, os.cpu_count() or 1)))),
+    max_queue=int(os.getenv('F103_RENDER_QUEUE', '8')),
+    timeout=float(os.getenv('F103_RENDER_TIMEOUT', '30'))
+)
+RENDER_RETRY_AFTER = 2
+
+
+def f103_filename(data, extension='pdf'):
+    """Nama file F-1.03_<tanggal>_<nik>_<nama>.<ext> dari data form."""
+    data = normalize_form_data(data)
+    tanggal = datetime.now().strftime('%Y%m%d')
+    nik = str(data.get("nik_pemohon") or "NIK").replace(" ", "")
+    nama = str(data.get("nama_lengkap_pemohon") or "NAMA").replace(" ", "-")
+    nik = ''.join(c for c in nik if c.isalnum())
+    nama = ''.join(c for c in nama if c.isalnum() or c in ["_", "-"])
+    return f"F-1.03_{tanggal}_{nik}_{nama}.{extension}"
+
+
+def merge_pdf_files(sources, output):
+    """Gabungkan PDF dari path/file object ke file object output (tanpa menampung hasil di memori)."""
+    if PdfWriter is None:
+        raise RuntimeError('pypdf belum terpasang; gunakan output zip atau pip install pypdf')
+    writer = PdfWriter()
+    for source in sources:
+        writer.append(PdfReader(source))
+    writer.write(output)
+
+
+def normalize_form_data(data):
+    """Menyamakan bentuk data form (list satu elemen -> string) dari semua endpoint."""
+    processed = {}
+    for key, value in (data or {}).items():
+        if isinstance(value, list) and len(value) == 1:
+            processed[key] = value[0]
+        else:
+            processed[key] = value
+    return processed
+
+
+def form_cache_key(kind, data, signature, jumlah_anggota, **options):
+    """Kunci cache dari isi form; tanggal ikut karena tanggal cetak tercantum di formulir."""
+    payload = json.dumps({
+        'kind': kind,
+        'data': normalize_form_data(data),
+        'signature': signature or '',
+        'jumlah_anggota': jumlah_anggota,
+        'tanggal': date.today().isoformat(),
+        'options': options
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
 # Only create blueprint if all dependencies are available
 if FLASK_AVAILABLE and FPDF_AVAILABLE and BASIC_DEPS_AVAILABLE:
     f103_bp = Blueprint('f103', __name__)
@@ -41,6 +329,9 @@ if FLASK_AVAILABLE and FPDF_AVAILABLE and BASIC_DEPS_AVAILABLE:
             'status': 'success',
             'message': 'F-1.03 module is available',
             'fpdf_available': FPDF_AVAILABLE,
+            'cache': render_cache.stats(),
+            'batch_cache': batch_render_cache.stats(),
+            'render_pool': render_pool.stats(),
             'timestamp': datetime.now().isoformat()
         })
 
@@ -72,8 +363,8 @@ if FLASK_AVAILABLE and FPDF_AVAILABLE and BASIC_DEPS_AVAILABLE:
             
             jumlah_anggota = int(processed_data.get('jumlah_anggota', 1))
             
-            # Generate PDF
-            pdf_bytes = generate_pdf_f103(processed_data, signature, jumlah_anggota)
+            # Generate PDF (atau ambil dari cache jika form yang sama sudah pernah dibuat)
+            pdf_bytes = render_pdf_f103_cached(processed_data, signature, jumlah_anggota)
             
             pdf_output = io.BytesIO(pdf_bytes)
             pdf_output.seek(0)
@@ -89,38 +380,92 @@ if FLASK_AVAILABLE and FPDF_AVAILABLE and BASIC_DEPS_AVAILABLE:
             print(f"✅ PDF generated successfully: {filename}")
             return send_file(pdf_output, as_attachment=True, download_name=filename, mimetype='application/pdf')
             
+        except (RenderBusyError, RenderTimeoutError) as e:
+            print(f"⚠️ F-1.03 render unavailable: {e}")
+            return render_unavailable_response(e)
         except Exception as e:
             print(f"❌ Error in F-1.03 submit: {e}")
             import traceback
             traceback.print_exc()
             return jsonify({'error': f'Failed to generate PDF: {str(e)}'}), 500
 
+    # Format gambar /submit_img: PNG untuk cetak, JPEG/WebP sebagai pratinjau yang lebih ringan
+    IMAGE_FORMATS = {
+        'png': ('PNG', 'image/png', 'png'),
+        'jpeg': ('JPEG', 'image/jpeg', 'jpg'),
+        'jpg': ('JPEG', 'image/jpeg', 'jpg'),
+        'webp': ('WEBP', 'image/webp', 'webp')
+    }
+    F103_IMAGE_DPI = int(os.getenv('F103_IMAGE_DPI', '200'))
+    F103_IMAGE_MAX_DPI = int(os.getenv('F103_IMAGE_MAX_DPI', '300'))
+    F103_PREVIEW_DPI = int(os.getenv('F103_PREVIEW_DPI', '100'))
+    F103_PREVIEW_QUALITY = int(os.getenv('F103_PREVIEW_QUALITY', '80'))
+
+    def rasterize_first_page(pdf_bytes, dpi):
+        """Render halaman pertama PDF ke gambar RGB."""
+        if pymupdf is not None:
+            with pymupdf.open(stream=bytes(pdf_bytes), filetype='pdf') as doc:
+                pix = doc[0].get_pixmap(dpi=dpi, alpha=False)
+                return Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+        images = convert_from_bytes(pdf_bytes, dpi=dpi, first_page=1, last_page=1)
+        if not images:
+            raise ValueError('PDF tidak memiliki halaman')
+        return images[0]
+
+    def render_image_f103_cached(data, signature=None, jumlah_anggota=1, dpi=None, fmt='png', quality=None):
+        """Gambar halaman pertama F-1.03 (PNG/JPEG/WebP) dengan cache berdasarkan isi form."""
+        dpi = dpi or F103_IMAGE_DPI
+        pil_format = IMAGE_FORMATS[fmt][0]
+        quality = quality or F103_PREVIEW_QUALITY
+        key = form_cache_key('image', data, signature, jumlah_anggota, dpi=dpi, format=pil_format,
+                             quality=quality if pil_format != 'PNG' else None)
+        image_bytes = render_cache.get(key)
+        if image_bytes is None:
+            # PDF yang sama biasanya sudah dibuat oleh /submit sebelumnya
+            pdf_bytes = render_pdf_f103_cached(data, signature, jumlah_anggota)
+            image_bytes = render_pool.run(f103_worker.encode_image, pdf_bytes, dpi, pil_format, quality)
+            render_cache.put(key, image_bytes)
+        return image_bytes
+
     @f103_bp.route('/submit_img', methods=['POST'])
     def submit_img():
-        """Endpoint untuk menghasilkan dan mengunduh file PNG."""
+        """Endpoint untuk menghasilkan dan mengunduh gambar formulir (PNG, atau JPEG/WebP untuk pratinjau)."""
         data = request.form.to_dict(flat=False)
         signature = request.form.get('signature')
         jumlah_anggota = int(request.form.get('jumlah_anggota', 1))
 
-        # Panggil fungsi helper yang sama untuk membuat PDF
-        pdf_bytes = generate_pdf_f103(data, signature, jumlah_anggota)
-        
-        # Konversi PDF bytes ke gambar (PNG)
-        images = convert_from_bytes(pdf_bytes, fmt='png', dpi=200)
-        img_io = io.BytesIO()
-        if images:
-            images[0].save(img_io, format='PNG')
-        img_io.seek(0)
-
-        # Format nama file PNG
+        fmt = (request.args.get('format') or request.form.get('image_format') or 'png').lower()
+        if fmt not in IMAGE_FORMATS:
+            return jsonify({'error': f'Format gambar tidak didukung: {fmt}'}), 400
+        try:
+            default_dpi = F103_IMAGE_DPI if fmt == 'png' else F103_PREVIEW_DPI
+            dpi = int(request.args.get('dpi') or request.form.get('image_dpi') or default_dpi)
+            quality = int(request.args.get('quality') or F103_PREVIEW_QUALITY)
+        except ValueError:
+            return jsonify({'error': 'dpi dan quality harus berupa angka'}), 400
+        dpi = max(72, min(dpi, F103_IMAGE_MAX_DPI))
+        quality = max(30, min(quality, 95))
+        # Field pengaturan gambar bukan bagian dari isi form
+        data.pop('image_format', None)
+        data.pop('image_dpi', None)
+
+        try:
+            image_bytes = render_image_f103_cached(data, signature, jumlah_anggota, dpi, fmt, quality)
+        except (RenderBusyError, RenderTimeoutError) as e:
+            print(f"⚠️ F-1.03 render unavailable: {e}")
+            return render_unavailable_response(e)
+        _, mimetype, extension = IMAGE_FORMATS[fmt]
+        img_io = io.BytesIO(image_bytes)
+
+        # Format nama file gambar
         tanggal_ymd = datetime.now().strftime('%Y%m%d')
         nik = (data.get("nik_pemohon", ["NIK"])[0] or "NIK").replace(" ", "")
         nama = (data.get("nama_lengkap_pemohon", ["NAMA"])[0] or "NAMA").replace(" ", "-")
         nik = ''.join(c for c in nik if c.isalnum())
         nama = ''.join(c for c in nama if c.isalnum() or c in ["_", "-"])
-        filename = f"F-1.03_{tanggal_ymd}_{nik}_{nama}.png"
+        filename = f"F-1.03_{tanggal_ymd}_{nik}_{nama}.{extension}"
 
-        return send_file(img_io, as_attachment=True, download_name=filename, mimetype='image/png')
+        return send_file(img_io, as_attachment=True, download_name=filename, mimetype=mimetype)
 
     def handle_f103_submission(data, signature_data=None):
         """Handle F-1.03 form submission for PDF generation"""
@@ -156,471 +501,208 @@ if FLASK_AVAILABLE and FPDF_AVAILABLE and BASIC_DEPS_AVAILABLE:
             # First generate PDF
             pdf_bytes = generate_pdf_f103(data, signature_data, jumlah_anggota)
             
-            # Convert PDF to image using PIL and pdf2image
-            try:
-                from pdf2image import convert_from_bytes
-                from PIL import Image
-                import io
-                
-                # Convert PDF to images
-                images = convert_from_bytes(pdf_bytes, dpi=200, first_page=1, last_page=1)
-                
-                if images:
-                    # Get the first page as image
-                    img = images[0]
-                    
-                    # Convert to PNG bytes
-                    img_buffer = io.BytesIO()
-                    img.save(img_buffer, format='PNG', quality=95, optimize=True)
-                    img_bytes = img_buffer.getvalue()
-                    
-                    # Generate filename
-                    nama_pemohon = data.get('nama_lengkap_pemohon', ['Unknown'])[0] if isinstance(data.get('nama_lengkap_pemohon'), list) else data.get('nama_lengkap_pemohon', 'Unknown')
-                    filename = f"F-1.03_{nama_pemohon.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                    
-                    return img_bytes, filename
-                else:
-                    raise Exception("Failed to convert PDF to image")
-                    
-            except ImportError:
-                print("⚠️ pdf2image not available, returning PDF instead")
-                # Fallback: return PDF with .png extension (browser will handle)
-                nama_pemohon = data.get('nama_lengkap_pemohon', ['Unknown'])[0] if isinstance(data.get('nama_lengkap_pemohon'), list) else data.get('nama_lengkap_pemohon', 'Unknown')
-                filename = f"F-1.03_{nama_pemohon.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-                return pdf_bytes, filename
-                
+            # Hanya halaman pertama yang dirender ke gambar
+            img = rasterize_first_page(pdf_bytes, F103_IMAGE_DPI)
+            img_buffer = io.BytesIO()
+            img.save(img_buffer, format='PNG', optimize=True)
+            img_bytes = img_buffer.getvalue()
+
+            # Generate filename
+            nama_pemohon = data.get('nama_lengkap_pemohon', ['Unknown'])[0] if isinstance(data.get('nama_lengkap_pemohon'), list) else data.get('nama_lengkap_pemohon', 'Unknown')
+            filename = f"F-1.03_{nama_pemohon.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+
+            return img_bytes, filename
+
         except Exception as e:
             print(f"❌ F-1.03 image generation error: {e}")
             import traceback
             traceback.print_exc()
             raise e
 
+    # Kotak tanda tangan 30x15 mm; gambar diperkecil sekali ke resolusi ini
+    SIGNATURE_BOX_MM = (30, 15)
+    SIGNATURE_DPI = int(os.getenv('F103_SIGNATURE_DPI', '200'))
+    _signature_cache = OrderedDict()  # {sha256(data_url): png_bytes}
+    _signature_cache_lock = threading.Lock()
+    SIGNATURE_CACHE_SIZE = 256
+
+    def prepare_signature_image(signature):
+        """Decode tanda tangan base64 di memori, normalisasi ke kotak 30x15 mm, hasilnya di-cache."""
+        key = hashlib.sha256(signature.encode('utf-8')).hexdigest()
+        with _signature_cache_lock:
+            cached = _signature_cache.get(key)
+            if cached is not None:
+                _signature_cache.move_to_end(key)
+                return cached
+
+        header, encoded = signature.split(",", 1)
+        img = Image.open(io.BytesIO(base64.b64decode(encoded)))
+        img.load()
+        # Latar transparan dari canvas diratakan ke putih agar hasil konsisten di PDF
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        max_size = tuple(int(mm / 25.4 * SIGNATURE_DPI) for mm in SIGNATURE_BOX_MM)
+        img.thumbnail(max_size, Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG', optimize=True)
+        png_bytes = buffer.getvalue()
+        with _signature_cache_lock:
+            _signature_cache[key] = png_bytes
+            while len(_signature_cache) > SIGNATURE_CACHE_SIZE:
+                _signature_cache.popitem(last=False)
+        return png_bytes
+
+    def render_pdf_f103_cached(data, signature=None, jumlah_anggota=1, wait=None, cache=None):
+        """generate_pdf_f103 dengan cache berdasarkan isi form (default render_cache)."""
+        cache = render_cache if cache is None else cache
+        key = form_cache_key('pdf', data, signature, jumlah_anggota)
+        pdf_bytes = cache.get(key)
+        if pdf_bytes is None:
+            pdf_bytes = render_pool.run(f103_worker.render_pdf, data, signature, jumlah_anggota, wait=wait)
+            cache.put(key, pdf_bytes)
+        return pdf_bytes
+
+    def render_unavailable_response(e):
+        """Respons untuk RenderBusyError (503 + Retry-After) dan RenderTimeoutError (504)."""
+        if isinstance(e, RenderTimeoutError):
+            return jsonify({'error': str(e)}), 504
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(RENDER_RETRY_AFTER)}
+
+    # Template F-1.03: bagian statis (label, kotak, header tabel) dirender sekali per tata letak,
+    # setiap permintaan hanya menggambar isian di atas content stream yang sudah jadi.
+    F103_TEMPLATE_ENABLED = os.getenv('F103_TEMPLATE', '1') != '0' and PDFResourceType is not None
+    TEMPLATE_CACHE_SIZE = 32
+    _template_cache = OrderedDict()  # {(jumlah_anggota, lainnya, tanggal): F103Template|None}
+    _template_lock = threading.Lock()
+
+    class F103Template:
+        """Content stream halaman statis beserta teks setiap cell/multi_cell sesuai urutan gambar."""
+
+        def __init__(self, content, cells, blocks):
+            self.content = content
+            self.cells = cells    # [teks]
+            self.blocks = blocks  # [(teks, x_setelah, y_setelah)]
+
+    class F103PDF(FPDF):
+        """FPDF dengan lapisan: 'static' merekam label, 'overlay' hanya menggambar isian form."""
+
+        def __init__(self, layer=None, template=None):
+            super().__init__(format='A4')
+            self.layer = layer
+            self.template = template
+            self.cells = []
+            self.blocks = []
+            self.cell_index = 0
+            self.block_index = 0
+            self.set_margins(left=5, top=3, right=5)
+            self.set_auto_page_break(auto=True, margin=3)
+
+        def cell(self, w=None, h=None, text='', border=0, *args, **kwargs):
+            if self.layer == 'static':
+                self.cells.append(text)
+            elif self.layer == 'overlay':
+                static_text = self.template.cells[self.cell_index]
+                self.cell_index += 1
+                # Garis dan warna latar sudah ada di template
+                border = 0
+                if len(args) >= 3:
+                    args = args[:2] + (False,) + args[3:]
+                kwargs.pop('fill', None)
+                if text == static_text:
+                    # Tidak ada yang digambar, cukup geser kursor seperti cell() biasa
+                    self._advance(w, h, args[0] if args else kwargs.get('ln', 0))
+                    return None
+            return super().cell(w, h, text, border, *args, **kwargs)
+
+        def _advance(self, w, h, ln):
+            if not w:
+                w = self.w - self.r_margin - self.x
+            self.lasth = h
+            if ln == 1:
+                self.x = self.l_margin
+                self.y += h
+            elif ln == 2:
+                self.y += h
+            else:
+                self.x += w
+
+        def multi_cell(self, w, h=None, text='', border=0, *args, **kwargs):
+            if self.layer == 'overlay':
+                static_text, x, y = self.template.blocks[self.block_index]
+                self.block_index += 1
+                if text == static_text:
+                    self.set_xy(x, y)
+                    return None
+                border = 0
+            result = super().multi_cell(w, h, text, border, *args, **kwargs)
+            if self.layer == 'static':
+                self.blocks.append((text, self.get_x(), self.get_y()))
+            return result
+
+    def get_f103_template(jumlah_anggota, lainnya):
+        """Template statis untuk tata letak tertentu; None jika form tidak muat satu halaman."""
+        key = (jumlah_anggota, lainnya, date.today().isoformat())
+        with _template_lock:
+            if key in _template_cache:
+                _template_cache.move_to_end(key)
+                return _template_cache[key]
+
+        # Baris "Lainnya" menambah tinggi bagian 8, jadi ikut menentukan tata letak
+        pdf = F103PDF(layer='static')
+        pdf.add_page()
+        _draw_f103(pdf, {'alasan_pindah': 'LAINNYA'} if lainnya else {}, None, jumlah_anggota)
+        template = None
+        if pdf.page == 1:
+            template = F103Template(bytes(pdf.pages[1].contents), pdf.cells, pdf.blocks)
+
+        with _template_lock:
+            _template_cache[key] = template
+            while len(_template_cache) > TEMPLATE_CACHE_SIZE:
+                _template_cache.popitem(last=False)
+        return template
+
+    def render_f103_overlay(template, data, signature, jumlah_anggota):
+        """Render form memakai template: content stream statis disalin, lalu isian digambar di atasnya."""
+        pdf = F103PDF(layer='overlay', template=template)
+        pdf.add_page()
+        # q/Q supaya warna isi header tabel di template tidak terbawa ke teks isian
+        pdf._out(b'q\n' + template.content + b'\nQ')
+        _draw_f103(pdf, data, signature, jumlah_anggota)
+        if pdf.page != 1 or pdf.cell_index != len(template.cells) or pdf.block_index != len(template.blocks):
+            raise RuntimeError('F-1.03 overlay tidak sesuai dengan template')
+        # Font yang dipakai template harus terdaftar di resource halaman walau isian tidak memakainya
+        for font in pdf.fonts.values():
+            pdf._resource_catalog.add(PDFResourceType.FONT, font.i, pdf.page)
+        return pdf.output()
+
     def generate_pdf_f103(data, signature=None, jumlah_anggota=1):
         """Generate PDF untuk formulir F-1.03 dengan data lengkap"""
         try:
             print(f"📄 Generating PDF with {jumlah_anggota} family members...")
-            
-            # Initialize PDF
-            pdf = FPDF(format='A4')
-            pdf.set_margins(left=5, top=3, right=5)
-            pdf.set_auto_page_break(auto=True, margin=3)
-            pdf.add_page()
-            
-            # Title
-            pdf.set_font("Arial", style="B", size=10)
-            pdf.cell(180, 7, "FORMULIR PENDAFTARAN PERPINDAHAN PENDUDUK", 1, 0, 'C')
-            pdf.cell(20, 7, "F-1.03", 1, 1, 'C')
-            pdf.set_font("Arial", size=8)
-            pdf.ln(1)
-            
-            # Helper function untuk get form data dengan fallback
-            def get_form_data(key, default=''):
-                value = data.get(key, default)
+
+            if F103_TEMPLATE_ENABLED:
+                value = data.get('alasan_pindah', '')
                 if isinstance(value, list):
-                    return value[0] if value else default
-                return str(value) if value else default
-            
-            # Baris 1 - No. KK (kotak 16 digit)
-            pdf.cell(40, 5, "1.   No. KK", 1)
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            no_kk = get_form_data("no_kk").replace(" ", "")
-            box_w = 5
-            box_h = 5
-            for i in range(16):
-                digit = no_kk[i] if i < len(no_kk) else ""
-                pdf.cell(box_w, box_h, digit, 1, 0, 'C')
-            pdf.cell(5, 3, "", 0, 0)  # Spacer
-            pdf.cell(12, 5, "No. HP", 1)
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            pdf.cell(53, 5, get_form_data("no_hp"), 1, 1)
-
-            # Baris 2 - Nama Lengkap Pemohon
-            pdf.cell(40, 5, "2.   Nama Lengkap Pemohon", 1)
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            pdf.cell(80, 5, get_form_data("nama_lengkap_pemohon"), 1)
-            pdf.cell(5, 3, "", 0, 0)  # Spacer
-            pdf.cell(12, 5, "Email", 1)
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            pdf.cell(53, 5, get_form_data("email"), 1, 1)
-
-            # Baris 3 - NIK (kotak 16 digit)
-            pdf.cell(40, 5, "3.   NIK", 1)
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            nik = get_form_data("nik_pemohon").replace(" ", "")
-            for i in range(16):
-                digit = nik[i] if i < len(nik) else ""
-                pdf.cell(box_w, box_h, digit, 1, 0, 'C')
-            pdf.ln(5)
-
-            # 4. Jenis Permohonan
-            y_before = pdf.get_y()
-            x_before = pdf.get_x()
-            pdf.cell(40, 20, "4.   Jenis Permohonan", 1, 0, 'L')
-            pdf.cell(5, 15, ":", 0, 0, 'C')
-            pdf.set_font("Arial", style="B", size=8)
-            pdf.cell(60, 5, "SURAT KETERANGAN KEPENDUDUK", 0, 1, 'L')
-            pdf.set_font("Arial", style="", size=8)
-            jenis_pilihan = [
-                "Surat Keterangan Pindah",
-                "Surat Keterangan Pindah Luar Negeri (SKPLN)",
-                "Surat Keterangan Tempat Tinggal (SKTT) Bagi OA Tinggal Terbatas"
-            ]
-            jawaban_radio = get_form_data("jenis_permohonan")
-            pdf.set_xy(x_before + 45, y_before + 5)
-            for p in jenis_pilihan:
-                pdf.cell(5, 5, "X" if p == jawaban_radio else "", 1, 0, 'C')
-                pdf.cell(90, 5, p, 0, 1, 'L')
-                pdf.set_x(x_before + 45)
-            pdf.cell(0, 1, "", 0, 1)
-
-            # 5. Alamat Asal
-            pdf.cell(40, 5, "5.   Alamat Asal", 1)
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            pdf.cell(120, 5, get_form_data('alamat_asal'), 1, 0)
-            pdf.cell(1, 3, "", 0, 0)
-            pdf.cell(7, 5, "RT:", 0, 0)
-            pdf.cell(10, 5, get_form_data('asal_rt'), 1, 0, 'C')
-            pdf.cell(7, 5, "RW:", 0, 0)
-            pdf.cell(10, 5, get_form_data('asal_rw'), 1, 1, 'C')
-            pdf.cell(45, 5, "", 0, 0)
-            pdf.cell(20, 5, "a. Desa/Kel.", 0, 0)
-            pdf.cell(50, 5, get_form_data('asal_desa_nama').upper(), 1, 0)
-            pdf.cell(15, 5, "", 0, 0)
-            pdf.cell(20, 5, "b. Kec.", 0, 0)
-            pdf.cell(50, 5, get_form_data('asal_kec_nama').upper(), 1, 1)
-            pdf.cell(45, 5, "", 0, 0)
-            pdf.cell(20, 5, "c. Kab./Kota", 0, 0)
-            pdf.cell(50, 5, get_form_data('asal_kab_nama').upper(), 1, 0)
-            pdf.cell(15, 5, "", 0, 0)
-            pdf.cell(20, 5, "d. Provinsi", 0, 0)
-            pdf.cell(50, 5, get_form_data('asal_prov_nama').upper(), 1, 1)
-            pdf.cell(45, 5, "", 0, 0)
-            pdf.cell(20, 5, "     Kode Pos:", 0, 0)
-            kodepos = get_form_data('asal_kodepos')
-            for i in range(5):
-                digit = kodepos[i] if i < len(kodepos) else ""
-                pdf.cell(5, 5, digit, 1, 0, 'C')
-            pdf.ln(5)
-
-            # 6. Klasifikasi Kepindahan
-            y_before = pdf.get_y()
-            x_before = pdf.get_x()
-            pdf.cell(40, 25, "6.   Klasifikasi Kepindahan", 1, 0, 'L')
-            pdf.cell(5, 25, ":", 0, 0, 'C')
-            pilihan = [
-                "Dalam satu desa/kelurahan atau yang disebut dengan nama lain",
-                "Antar desa/kelurahan /yang disebut dg nama lain dalam 1 kec.",
-                "Antar kecamatan/yang disebut dg nama lain dalam satu kab/kota",
-                "Antar kabupaten/kota dalam satu provinsi",
-                "Antar provinsi"
-            ]
-            mapping_klasifikasi = {
-                "dalam_satu_desa": pilihan[0],
-                "antar_desa": pilihan[1],
-                "antar_kecamatan": pilihan[2],
-                "antar_kabupaten": pilihan[3],
-                "antar_provinsi": pilihan[4]
-            }
-            value_radio = get_form_data("klasifikasi_kepindahan")
-            jawaban = mapping_klasifikasi.get(value_radio, "")
-            pdf.set_xy(x_before + 45, y_before)
-            for p in pilihan:
-                pdf.cell(5, 5, "X" if jawaban == p else "", 1, 0, 'C')
-                pdf.cell(135, 5, p, 0, 1, 'L')
-                pdf.set_x(x_before + 45)
-            pdf.cell(0, 1, "", 0, 1)
-
-            # 7. Alamat Pindah - PERBAIKI BAGIAN INI
-            pdf.cell(40, 5, "7.   Alamat Pindah", 1)
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            pdf.cell(120, 5, get_form_data('alamat_pindah'), 1, 0)
-            pdf.cell(1, 3, "", 0, 0)
-            pdf.cell(7, 5, "RT:", 0, 0)
-            pdf.cell(10, 5, get_form_data('pindah_rt'), 1, 0, 'C')
-            pdf.cell(7, 5, "RW:", 0, 0)
-            pdf.cell(10, 5, get_form_data('pindah_rw'), 1, 1, 'C')
-            pdf.cell(45, 5, "", 0, 0)
-            pdf.cell(20, 5, "a. Desa/Kel.", 0, 0)
-            pdf.cell(50, 5, get_form_data('pindah_desa_nama').upper(), 1, 0)
-            pdf.cell(15, 5, "", 0, 0)
-            pdf.cell(20, 5, "b. Kec.", 0, 0)
-            pdf.cell(50, 5, get_form_data('pindah_kec_nama').upper(), 1, 1)
-            pdf.cell(45, 5, "", 0, 0)
-            pdf.cell(20, 5, "c. Kab./Kota", 0, 0)
-            pdf.cell(50, 5, get_form_data('pindah_kab_nama').upper(), 1, 0)
-            pdf.cell(15, 5, "", 0, 0)
-            pdf.cell(20, 5, "d. Provinsi", 0, 0)
-            pdf.cell(50, 5, get_form_data('pindah_prov_nama').upper(), 1, 1)
-            pdf.cell(45, 5, "", 0, 0)
-            pdf.cell(20, 5, "Kode Pos", 0, 0)
-            pindah_kodepos = get_form_data('pindah_kodepos')
-            for i in range(5):
-                digit = pindah_kodepos[i] if i < len(pindah_kodepos) else ""
-                pdf.cell(5, 5, digit, 1, 0, 'C')
-            pdf.ln(6)
-
-            # 8. Alasan Pindah - PERBAIKI CHECKBOX
-            y_before = pdf.get_y()
-            x_before = pdf.get_x()
-            pdf.cell(40, 10, "8.   Alasan Pindah", 1, 0, 'L')
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            alasan_pilihan = [
-                "PEKERJAAN", "PENDIDIKAN", "KEAMANAN", "KESEHATAN",
-                "PERUMAHAN", "KELUARGA", "LAINNYA"
-            ]
-            alasan_selected = get_form_data("alasan_pindah").upper()
-            alasan_lainnya = get_form_data("alasan_lainnya") if alasan_selected == "LAINNYA" else ""
-            
-            x_alasan = x_before + 45
-            y_alasan = y_before
-            # Kolom 1-4
-            pdf.set_xy(x_alasan, y_alasan)
-            for i in range(2):
-                checked = "X" if alasan_pilihan[i] == alasan_selected else ""
-                pdf.cell(5, 5, checked, 1, 0, 'C')
-                pdf.cell(15, 5, alasan_pilihan[i].title(), 0, 1, 'L')
-                pdf.set_x(x_alasan)
-            x2 = x_alasan + 40
-            pdf.set_xy(x2, y_alasan)
-            for i in range(2, 4):
-                checked = "X" if alasan_pilihan[i] == alasan_selected else ""
-                pdf.cell(5, 5, checked, 1, 0, 'C')
-                pdf.cell(15, 5, alasan_pilihan[i].title(), 0, 1, 'L')
-                pdf.set_x(x2)
-            x3 = x2 + 40
-            pdf.set_xy(x3, y_alasan)
-            for i in range(4, 6):
-                checked = "X" if alasan_pilihan[i] == alasan_selected else ""
-                pdf.cell(5, 5, checked, 1, 0, 'C')
-                pdf.cell(15, 5, alasan_pilihan[i].title(), 0, 1, 'L')
-                pdf.set_x(x3)
-            x4 = x3 + 40
-            pdf.set_xy(x4, y_alasan)
-            checked = "X" if alasan_selected == "LAINNYA" else ""
-            pdf.cell(5, 5, checked, 1, 0, 'C')
-            pdf.cell(15, 5, "Lainnya", 0, 1, 'L')
-            pdf.set_x(x4)
-            if alasan_selected == "LAINNYA":
-                pdf.cell(30, 5, alasan_lainnya.upper() if alasan_lainnya else " ", 'B', 1, 'C')
-            pdf.ln(6)
-
-            # 9. Jenis Kepindahan - PERBAIKI CHECKBOX
-            y_before = pdf.get_y()
-            x_before = pdf.get_x()
-            pdf.cell(40, 10, "9.   Jenis Kepindahan", 1, 0, 'L')
-            pdf.cell(5, 10, ":", 0, 0, 'C')
-            jenis_kepindahan_pilihan = [
-                "KEPALA_KELUARGA", "KEPALA_DAN_SELURUH_ANGGOTA",
-                "KEPALA_DAN_SEBAGIAN_ANGGOTA", "ANGGOTA_KELUARGA"
-            ]
-            jenis_labels = [
-                "Kepala Keluarga", "Kepala & Seluruh Anggota Keluarga",
-                "Kepala dan Sebagian Anggota Keluarga", "Anggota Keluarga"
-            ]
-            jawaban_jk = get_form_data("jenis_kepindahan")
-            x_jk = x_before + 45
-            y_jk = y_before
-            pdf.set_xy(x_jk, y_jk)
-            for i in range(2):
-                checked = "X" if jenis_kepindahan_pilihan[i] == jawaban_jk else ""
-                pdf.cell(5, 5, checked, 1, 0, 'C')
-                pdf.cell(40, 5, jenis_labels[i], 0, 1, 'L')
-                pdf.set_x(x_jk)
-            x2_jk = x_jk + 80
-            pdf.set_xy(x2_jk, y_jk)
-            for i in range(2, 4):
-                checked = "X" if jenis_kepindahan_pilihan[i] == jawaban_jk else ""
-                pdf.cell(5, 5, checked, 1, 0, 'C')
-                pdf.cell(60, 5, jenis_labels[i], 0, 1, 'L')
-                pdf.set_x(x2_jk)
-            pdf.ln(1)
-
-            # 10. Status KK Tidak Pindah - PERBAIKI CHECKBOX
-            pilihan_tidak_pindah = ["NUMPANG_KK", "MEMBUAT_KK_BARU", "KK_TETAP"]
-            pilihan_labels = ["Numpang KK", "Membuat KK Baru", "KK Tetap"]
-            jawaban_tidak_pindah = get_form_data("status_kk_tidak_pindah")
-            y_before = pdf.get_y()
-            x_before = pdf.get_x()
-            pdf.multi_cell(40, 5, "10. Anggota Tidak Pindah", 1, 'L')
-            pdf.set_xy(x_before + 40, y_before)
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            x1 = x_before + 45
-            pdf.set_xy(x1, y_before)
-            for i in range(2):
-                checked = "X" if pilihan_tidak_pindah[i] == jawaban_tidak_pindah else ""
-                pdf.cell(5, 5, checked, 1, 0, 'C')
-                pdf.cell(35, 5, pilihan_labels[i], 0, 1, 'L')
-                pdf.set_x(x1)
-            x2 = x1 + 80
-            pdf.set_xy(x2, y_before)
-            checked = "X" if pilihan_tidak_pindah[2] == jawaban_tidak_pindah else ""
-            pdf.cell(5, 5, checked, 1, 0, 'C')
-            pdf.cell(35, 5, pilihan_labels[2], 0, 1, 'L')
-            pdf.ln(6)
-
-            # 11. Status KK Pindah - PERBAIKI CHECKBOX
-            pilihan_yang_pindah = ["NUMPANG_KK", "MEMBUAT_KK_BARU", "KK_TETAP"]
-            jawaban_yang_pindah = get_form_data("status_kk_pindah")
-            y_before = pdf.get_y()
-            x_before = pdf.get_x()
-            pdf.multi_cell(40, 5, "11. Anggota yang Pindah", 1, 'L')
-            pdf.set_xy(x_before + 40, y_before)
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            x1 = x_before + 45
-            pdf.set_xy(x1, y_before)
-            for i in range(2):
-                checked = "X" if pilihan_yang_pindah[i] == jawaban_yang_pindah else ""
-                pdf.cell(5, 5, checked, 1, 0, 'C')
-                pdf.cell(35, 5, pilihan_labels[i], 0, 1, 'L')
-                pdf.set_x(x1)
-            x2 = x1 + 80
-            pdf.set_xy(x2, y_before)
-            checked = "X" if pilihan_yang_pindah[2] == jawaban_yang_pindah else ""
-            pdf.cell(5, 5, checked, 1, 0, 'C')
-            pdf.cell(35, 5, pilihan_labels[2], 0, 1, 'L')
-            pdf.ln(5)
-
-            # 12. Daftar Anggota Keluarga yang Pindah
-            pdf.cell(190, 5, "12. Daftar Anggota Keluarga yang Pindah", 0, 1)
-            pdf.set_font("Arial", size=8)
-            pdf.set_fill_color(200, 200, 200)
-            pdf.cell(10, 5, "NO", 1, 0, 'C', True)
-            pdf.cell(80, 5, "NIK", 1, 0, 'C', True)
-            pdf.cell(75, 5, "NAMA LENGKAP", 1, 0, 'C', True)
-            pdf.cell(35, 5, "Hub Keluarga (SHDK)", 1, 1, 'C', True)
-            pdf.cell(10, 0, "", 0, 0)
-            for _ in range(16):
-                pdf.cell(5, 5, "", 1, 0)
-            pdf.cell(75, 0, "", 0, 0)
-            pdf.cell(35, 0, "", 0, 1)
-            for i in range(1, jumlah_anggota + 1):
-                pdf.cell(10, 5, str(i), 1, 0, 'C')
-                nik_anggota = get_form_data(f"anggota_nik_{i}").replace(" ", "")
-                for j in range(16):
-                    digit = nik_anggota[j] if j < len(nik_anggota) else ""
-                    pdf.cell(5, 5, digit, 1, 0, 'C')
-                pdf.cell(75, 5, get_form_data(f"anggota_nama_{i}"), 1, 0)
-                pdf.cell(35, 5, get_form_data(f"anggota_shdk_{i}"), 1, 1)
-            pdf.set_font("Arial", size=8)
-            pdf.ln(1)
-
-            # 13-16. Bagian Orang Asing
-            pdf.set_font("Arial", style="B", size=6)
-            pdf.cell(190, 4, "Diisi oleh Penduduk OA (Orang Asing) pemegang ITAS yg mengajukan SKTT dan OA Pemegang ITAP yg Mengajukan Sur Ket Kependudukan Lainnya", 0, 1)
-            pdf.set_font("Arial", size=8)
-            pdf.cell(40, 5, "13. Nama Sponsor", 1)
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            pdf.cell(155, 5, get_form_data("nama_sponsor"), 1, 1)
-            pdf.cell(40, 5, "14. Tipe Sponsor", 1)
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            x_tipe = pdf.get_x()
-            tipe_pilihan = ["Organisasi", "Pemerintah", "Perusahaan", "Perorangan", "Tanpa Sponsor"]
-            tipe_jawaban = get_form_data("tipe_sponsor")
-            pdf.set_x(x_tipe)
-            for tipe in tipe_pilihan:
-                checked = "X" if tipe == tipe_jawaban else ""
-                pdf.cell(5, 5, checked, 1, 0, 'C')
-                pdf.cell(25, 5, tipe, 0, 0, 'L')
-            pdf.ln(5)
-            pdf.cell(40, 5, "15. Alamat Sponsor", 1)
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            pdf.cell(155, 5, get_form_data("alamat_sponsor"), 1, 1)
-            pdf.set_xy(pdf.get_x(), pdf.get_y())
-            pdf.multi_cell(40, 4, "16. Nomor dan Tanggal\n     KITAS & KITAP", 1, 'L')
-            pdf.set_xy(pdf.get_x() + 0, pdf.get_y() - 8)
-            pdf.cell(5, 6, ":", 0, 0, 'C')
-            nomor_kitas = get_form_data('nomor_kitas_kitap')
-            for i in range(12):
-                digit = nomor_kitas[i] if i < len(nomor_kitas) else ""
-                pdf.cell(5, 5, digit, 1, 0, 'C')
-            pdf.cell(5, 5, "", 0, 0)
-            tgl_kitas = get_form_data('tanggal_kitas_kitap')
-            for i in range(12):
-                digit = tgl_kitas[i] if i < len(tgl_kitas) else ""
-                pdf.cell(5, 5, digit, 1, 0, 'C')
-            pdf.ln(6)
-            pdf.cell(45, 3, "", 0, 0)
-            pdf.cell(59, 3, "Nomor", 0, 0, 'C')
-            pdf.cell(10, 3, "", 0, 0)
-            pdf.cell(54, 3, "Tanggal Masa Berlaku", 0, 1, 'C')
-
-            # 17-20. Bagian SKPLN
-            pdf.set_font("Arial", style="B", size=6)
-            pdf.cell(190, 4, "Diisi oleh Penduduk yang Mengajukan Surat Keterangan Pindah Luar Negeri (SKPLN)", 0, 1)
-            pdf.set_font("Arial", size=8)
-            pdf.cell(40, 5, "17. Negara Tujuan", 1)
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            pdf.cell(115, 5, get_form_data("negara_tujuan"), 1, 0)
-            pdf.cell(5, 5, "", 0, 0)
-            pdf.cell(20, 5, "Kode Negara:", 0, 0, 'R')
-            kode_negara = get_form_data("kode_negara")
-            for i in range(3):
-                digit = kode_negara[i] if i < len(kode_negara) else ""
-                pdf.cell(5, 5, digit, 1, 0, 'C')
-            pdf.ln(5)
-            pdf.cell(40, 5, "18. Alamat Tujuan", 1)
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            pdf.cell(155, 5, get_form_data("alamat_negara_tujuan"), 1, 1)
-            pdf.cell(40, 5, "19. Penanggung Jawab", 1)
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            pdf.cell(155, 5, get_form_data("penanggung_jawab"), 1, 1)
-            pdf.cell(40, 5, "20. Rencana Pindah", 1)
-            pdf.cell(5, 5, ":", 0, 0, 'C')
-            pdf.cell(7, 5, "Tgl.", 0, 0, 'C')
-            pdf.cell(10, 5, get_form_data('rencana_pindah_tgl'), 1, 0, 'C')
-            pdf.cell(5, 5, "", 0, 0, 'C')
-            pdf.cell(7, 5, "Bln.", 0, 0, 'C')
-            pdf.cell(10, 5, get_form_data('rencana_pindah_bln'), 1, 0, 'C')
-            pdf.cell(5, 5, "", 0, 0, 'C')
-            pdf.cell(7, 5, "Thn.", 0, 0, 'C')
-            thn = get_form_data('rencana_pindah_thn')
-            for i in range(4):
-                digit = thn[i] if i < len(thn) else ""
-                pdf.cell(5, 5, digit, 1, 0, 'C')
-            pdf.ln(4)
-
-            # Tanda Tangan
-            pdf.set_font("Arial", size=7)
-            y_ttd = pdf.get_y()
-            x_left = 10
-            x_right = 120
-            tanggal_str = datetime.now().strftime('%d-%m-%Y')
-            pdf.set_xy(x_right, y_ttd)
-            pdf.cell(70, 5, f"Garut, {tanggal_str}", 0, 1, 'C')
-            pdf.set_xy(x_left, y_ttd + 6)
-            pdf.cell(70, 2, "Mengetahui,", 0, 0, 'C')
-            pdf.set_xy(x_right, y_ttd + 6)
-            pdf.cell(70, 0, "Pemohon", 0, 1, 'C')
-            pdf.set_xy(x_left, y_ttd + 7)
-            pdf.multi_cell(70, 3, "Kepala Dinas Kependudukan dan\nPencatatan Sipil Kab. Garut", 0, 'C')
-            
-            signature_filename = "signature.png"
-            if signature:
+                    value = value[0] if value else ''
+                lainnya = str(value or '').upper() == 'LAINNYA'
                 try:
-                    header, encoded = signature.split(",", 1)
-                    img_bytes = base64.b64decode(encoded)
-                    # Menyimpan gambar ke file sementara karena fpdf versi ini tidak mendukung objek BytesIO
-                    with open(signature_filename, "wb") as f:
-                        f.write(img_bytes)
-                    pdf.image(signature_filename, x=x_right + 20, y=y_ttd + 7, w=30, h=15)
-                except (ValueError, TypeError):
-                    # Handle error jika format signature salah
-                    pass
-
-            pdf.set_xy(x_left, y_ttd + 20)
-            pdf.set_font("Arial", size=7)
-            pdf.cell(70, 4, "....................................................", 0, 0, 'C')
-            pdf.set_xy(x_right, y_ttd + 20)
-            # Gunakan custom_signer_name jika ada, fallback ke nama_lengkap_pemohon
-            custom_signer = get_form_data("custom_signer_name")
-            nama_pemohon = get_form_data("nama_lengkap_pemohon")
-            signer_name = custom_signer.strip() if custom_signer.strip() else nama_pemohon
-            pdf.cell(70, 4, signer_name.upper(), 0, 1, 'C')
-
-            # Menghapus file tanda tangan sementara jika ada
-            if os.path.exists(signature_filename):
-                os.remove(signature_filename)
-            
+                    template = get_f103_template(jumlah_anggota, lainnya)
+                    if template is not None:
+                        return render_f103_overlay(template, data, signature, jumlah_anggota)
+                except (AttributeError, IndexError, KeyError, RuntimeError) as e:
+                    # Internal fpdf berubah atau tata letak berbeda: kembali ke render penuh
+                    print(f"⚠️ F-1.03 template tidak bisa dipakai, render penuh: {e}")
+
+            pdf = F103PDF()
+            pdf.add_page()
+            _draw_f103(pdf, data, signature, jumlah_anggota)
+
             # Mengembalikan output PDF sebagai bytes
             return pdf.output(dest='S')
         
@@ -630,6 +712,414 @@ if FLASK_AVAILABLE and FPDF_AVAILABLE and BASIC_DEPS_AVAILABLE:
             traceback.print_exc()
             raise e
 
+    def _draw_f103(pdf, data, signature=None, jumlah_anggota=1):
+        """Tata letak formulir F-1.03 (dipakai untuk render penuh, template, dan overlay)."""
+        # Title
+        pdf.set_font("Arial", style="B", size=10)
+        pdf.cell(180, 7, "FORMULIR PENDAFTARAN PERPINDAHAN PENDUDUK", 1, 0, 'C')
+        pdf.cell(20, 7, "F-1.03", 1, 1, 'C')
+        pdf.set_font("Arial", size=8)
+        pdf.ln(1)
+        
+        # Helper function untuk get form data dengan fallback
+        def get_form_data(key, default=''):
+            value = data.get(key, default)
+            if isinstance(value, list):
+                return value[0] if value else default
+            return str(value) if value else default
+        
+        # Baris 1 - No. KK (kotak 16 digit)
+        pdf.cell(40, 5, "1.   No. KK", 1)
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        no_kk = get_form_data("no_kk").replace(" ", "")
+        box_w = 5
+        box_h = 5
+        for i in range(16):
+            digit = no_kk[i] if i < len(no_kk) else ""
+            pdf.cell(box_w, box_h, digit, 1, 0, 'C')
+        pdf.cell(5, 3, "", 0, 0)  # Spacer
+        pdf.cell(12, 5, "No. HP", 1)
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        pdf.cell(53, 5, get_form_data("no_hp"), 1, 1)
+
+        # Baris 2 - Nama Lengkap Pemohon
+        pdf.cell(40, 5, "2.   Nama Lengkap Pemohon", 1)
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        pdf.cell(80, 5, get_form_data("nama_lengkap_pemohon"), 1)
+        pdf.cell(5, 3, "", 0, 0)  # Spacer
+        pdf.cell(12, 5, "Email", 1)
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        pdf.cell(53, 5, get_form_data("email"), 1, 1)
+
+        # Baris 3 - NIK (kotak 16 digit)
+        pdf.cell(40, 5, "3.   NIK", 1)
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        nik = get_form_data("nik_pemohon").replace(" ", "")
+        for i in range(16):
+            digit = nik[i] if i < len(nik) else ""
+            pdf.cell(box_w, box_h, digit, 1, 0, 'C')
+        pdf.ln(5)
+
+        # 4. Jenis Permohonan
+        y_before = pdf.get_y()
+        x_before = pdf.get_x()
+        pdf.cell(40, 20, "4.   Jenis Permohonan", 1, 0, 'L')
+        pdf.cell(5, 15, ":", 0, 0, 'C')
+        pdf.set_font("Arial", style="B", size=8)
+        pdf.cell(60, 5, "SURAT KETERANGAN KEPENDUDUK", 0, 1, 'L')
+        pdf.set_font("Arial", style="", size=8)
+        jenis_pilihan = [
+            "Surat Keterangan Pindah",
+            "Surat Keterangan Pindah Luar Negeri (SKPLN)",
+            "Surat Keterangan Tempat Tinggal (SKTT) Bagi OA Tinggal Terbatas"
+        ]
+        jawaban_radio = get_form_data("jenis_permohonan")
+        pdf.set_xy(x_before + 45, y_before + 5)
+        for p in jenis_pilihan:
+            pdf.cell(5, 5, "X" if p == jawaban_radio else "", 1, 0, 'C')
+            pdf.cell(90, 5, p, 0, 1, 'L')
+            pdf.set_x(x_before + 45)
+        pdf.cell(0, 1, "", 0, 1)
+
+        # 5. Alamat Asal
+        pdf.cell(40, 5, "5.   Alamat Asal", 1)
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        pdf.cell(120, 5, get_form_data('alamat_asal'), 1, 0)
+        pdf.cell(1, 3, "", 0, 0)
+        pdf.cell(7, 5, "RT:", 0, 0)
+        pdf.cell(10, 5, get_form_data('asal_rt'), 1, 0, 'C')
+        pdf.cell(7, 5, "RW:", 0, 0)
+        pdf.cell(10, 5, get_form_data('asal_rw'), 1, 1, 'C')
+        pdf.cell(45, 5, "", 0, 0)
+        pdf.cell(20, 5, "a. Desa/Kel.", 0, 0)
+        pdf.cell(50, 5, get_form_data('asal_desa_nama').upper(), 1, 0)
+        pdf.cell(15, 5, "", 0, 0)
+        pdf.cell(20, 5, "b. Kec.", 0, 0)
+        pdf.cell(50, 5, get_form_data('asal_kec_nama').upper(), 1, 1)
+        pdf.cell(45, 5, "", 0, 0)
+        pdf.cell(20, 5, "c. Kab./Kota", 0, 0)
+        pdf.cell(50, 5, get_form_data('asal_kab_nama').upper(), 1, 0)
+        pdf.cell(15, 5, "", 0, 0)
+        pdf.cell(20, 5, "d. Provinsi", 0, 0)
+        pdf.cell(50, 5, get_form_data('asal_prov_nama').upper(), 1, 1)
+        pdf.cell(45, 5, "", 0, 0)
+        pdf.cell(20, 5, "     Kode Pos:", 0, 0)
+        kodepos = get_form_data('asal_kodepos')
+        for i in range(5):
+            digit = kodepos[i] if i < len(kodepos) else ""
+            pdf.cell(5, 5, digit, 1, 0, 'C')
+        pdf.ln(5)
+
+        # 6. Klasifikasi Kepindahan
+        y_before = pdf.get_y()
+        x_before = pdf.get_x()
+        pdf.cell(40, 25, "6.   Klasifikasi Kepindahan", 1, 0, 'L')
+        pdf.cell(5, 25, ":", 0, 0, 'C')
+        pilihan = [
+            "Dalam satu desa/kelurahan atau yang disebut dengan nama lain",
+            "Antar desa/kelurahan /yang disebut dg nama lain dalam 1 kec.",
+            "Antar kecamatan/yang disebut dg nama lain dalam satu kab/kota",
+            "Antar kabupaten/kota dalam satu provinsi",
+            "Antar provinsi"
+        ]
+        mapping_klasifikasi = {
+            "dalam_satu_desa": pilihan[0],
+            "antar_desa": pilihan[1],
+            "antar_kecamatan": pilihan[2],
+            "antar_kabupaten": pilihan[3],
+            "antar_provinsi": pilihan[4]
+        }
+        value_radio = get_form_data("klasifikasi_kepindahan")
+        jawaban = mapping_klasifikasi.get(value_radio, "")
+        pdf.set_xy(x_before + 45, y_before)
+        for p in pilihan:
+            pdf.cell(5, 5, "X" if jawaban == p else "", 1, 0, 'C')
+            pdf.cell(135, 5, p, 0, 1, 'L')
+            pdf.set_x(x_before + 45)
+        pdf.cell(0, 1, "", 0, 1)
+
+        # 7. Alamat Pindah - PERBAIKI BAGIAN INI
+        pdf.cell(40, 5, "7.   Alamat Pindah", 1)
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        pdf.cell(120, 5, get_form_data('alamat_pindah'), 1, 0)
+        pdf.cell(1, 3, "", 0, 0)
+        pdf.cell(7, 5, "RT:", 0, 0)
+        pdf.cell(10, 5, get_form_data('pindah_rt'), 1, 0, 'C')
+        pdf.cell(7, 5, "RW:", 0, 0)
+        pdf.cell(10, 5, get_form_data('pindah_rw'), 1, 1, 'C')
+        pdf.cell(45, 5, "", 0, 0)
+        pdf.cell(20, 5, "a. Desa/Kel.", 0, 0)
+        pdf.cell(50, 5, get_form_data('pindah_desa_nama').upper(), 1, 0)
+        pdf.cell(15, 5, "", 0, 0)
+        pdf.cell(20, 5, "b. Kec.", 0, 0)
+        pdf.cell(50, 5, get_form_data('pindah_kec_nama').upper(), 1, 1)
+        pdf.cell(45, 5, "", 0, 0)
+        pdf.cell(20, 5, "c. Kab./Kota", 0, 0)
+        pdf.cell(50, 5, get_form_data('pindah_kab_nama').upper(), 1, 0)
+        pdf.cell(15, 5, "", 0, 0)
+        pdf.cell(20, 5, "d. Provinsi", 0, 0)
+        pdf.cell(50, 5, get_form_data('pindah_prov_nama').upper(), 1, 1)
+        pdf.cell(45, 5, "", 0, 0)
+        pdf.cell(20, 5, "Kode Pos", 0, 0)
+        pindah_kodepos = get_form_data('pindah_kodepos')
+        for i in range(5):
+            digit = pindah_kodepos[i] if i < len(pindah_kodepos) else ""
+            pdf.cell(5, 5, digit, 1, 0, 'C')
+        pdf.ln(6)
+
+        # 8. Alasan Pindah - PERBAIKI CHECKBOX
+        y_before = pdf.get_y()
+        x_before = pdf.get_x()
+        pdf.cell(40, 10, "8.   Alasan Pindah", 1, 0, 'L')
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        alasan_pilihan = [
+            "PEKERJAAN", "PENDIDIKAN", "KEAMANAN", "KESEHATAN",
+            "PERUMAHAN", "KELUARGA", "LAINNYA"
+        ]
+        alasan_selected = get_form_data("alasan_pindah").upper()
+        alasan_lainnya = get_form_data("alasan_lainnya") if alasan_selected == "LAINNYA" else ""
+        
+        x_alasan = x_before + 45
+        y_alasan = y_before
+        # Kolom 1-4
+        pdf.set_xy(x_alasan, y_alasan)
+        for i in range(2):
+            checked = "X" if alasan_pilihan[i] == alasan_selected else ""
+            pdf.cell(5, 5, checked, 1, 0, 'C')
+            pdf.cell(15, 5, alasan_pilihan[i].title(), 0, 1, 'L')
+            pdf.set_x(x_alasan)
+        x2 = x_alasan + 40
+        pdf.set_xy(x2, y_alasan)
+        for i in range(2, 4):
+            checked = "X" if alasan_pilihan[i] == alasan_selected else ""
+            pdf.cell(5, 5, checked, 1, 0, 'C')
+            pdf.cell(15, 5, alasan_pilihan[i].title(), 0, 1, 'L')
+            pdf.set_x(x2)
+        x3 = x2 + 40
+        pdf.set_xy(x3, y_alasan)
+        for i in range(4, 6):
+            checked = "X" if alasan_pilihan[i] == alasan_selected else ""
+            pdf.cell(5, 5, checked, 1, 0, 'C')
+            pdf.cell(15, 5, alasan_pilihan[i].title(), 0, 1, 'L')
+            pdf.set_x(x3)
+        x4 = x3 + 40
+        pdf.set_xy(x4, y_alasan)
+        checked = "X" if alasan_selected == "LAINNYA" else ""
+        pdf.cell(5, 5, checked, 1, 0, 'C')
+        pdf.cell(15, 5, "Lainnya", 0, 1, 'L')
+        pdf.set_x(x4)
+        if alasan_selected == "LAINNYA":
+            pdf.cell(30, 5, alasan_lainnya.upper() if alasan_lainnya else " ", 'B', 1, 'C')
+        pdf.ln(6)
+
+        # 9. Jenis Kepindahan - PERBAIKI CHECKBOX
+        y_before = pdf.get_y()
+        x_before = pdf.get_x()
+        pdf.cell(40, 10, "9.   Jenis Kepindahan", 1, 0, 'L')
+        pdf.cell(5, 10, ":", 0, 0, 'C')
+        jenis_kepindahan_pilihan = [
+            "KEPALA_KELUARGA", "KEPALA_DAN_SELURUH_ANGGOTA",
+            "KEPALA_DAN_SEBAGIAN_ANGGOTA", "ANGGOTA_KELUARGA"
+        ]
+        jenis_labels = [
+            "Kepala Keluarga", "Kepala & Seluruh Anggota Keluarga",
+            "Kepala dan Sebagian Anggota Keluarga", "Anggota Keluarga"
+        ]
+        jawaban_jk = get_form_data("jenis_kepindahan")
+        x_jk = x_before + 45
+        y_jk = y_before
+        pdf.set_xy(x_jk, y_jk)
+        for i in range(2):
+            checked = "X" if jenis_kepindahan_pilihan[i] == jawaban_jk else ""
+            pdf.cell(5, 5, checked, 1, 0, 'C')
+            pdf.cell(40, 5, jenis_labels[i], 0, 1, 'L')
+            pdf.set_x(x_jk)
+        x2_jk = x_jk + 80
+        pdf.set_xy(x2_jk, y_jk)
+        for i in range(2, 4):
+            checked = "X" if jenis_kepindahan_pilihan[i] == jawaban_jk else ""
+            pdf.cell(5, 5, checked, 1, 0, 'C')
+            pdf.cell(60, 5, jenis_labels[i], 0, 1, 'L')
+            pdf.set_x(x2_jk)
+        pdf.ln(1)
+
+        # 10. Status KK Tidak Pindah - PERBAIKI CHECKBOX
+        pilihan_tidak_pindah = ["NUMPANG_KK", "MEMBUAT_KK_BARU", "KK_TETAP"]
+        pilihan_labels = ["Numpang KK", "Membuat KK Baru", "KK Tetap"]
+        jawaban_tidak_pindah = get_form_data("status_kk_tidak_pindah")
+        y_before = pdf.get_y()
+        x_before = pdf.get_x()
+        pdf.multi_cell(40, 5, "10. Anggota Tidak Pindah", 1, 'L')
+        pdf.set_xy(x_before + 40, y_before)
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        x1 = x_before + 45
+        pdf.set_xy(x1, y_before)
+        for i in range(2):
+            checked = "X" if pilihan_tidak_pindah[i] == jawaban_tidak_pindah else ""
+            pdf.cell(5, 5, checked, 1, 0, 'C')
+            pdf.cell(35, 5, pilihan_labels[i], 0, 1, 'L')
+            pdf.set_x(x1)
+        x2 = x1 + 80
+        pdf.set_xy(x2, y_before)
+        checked = "X" if pilihan_tidak_pindah[2] == jawaban_tidak_pindah else ""
+        pdf.cell(5, 5, checked, 1, 0, 'C')
+        pdf.cell(35, 5, pilihan_labels[2], 0, 1, 'L')
+        pdf.ln(6)
+
+        # 11. Status KK Pindah - PERBAIKI CHECKBOX
+        pilihan_yang_pindah = ["NUMPANG_KK", "MEMBUAT_KK_BARU", "KK_TETAP"]
+        jawaban_yang_pindah = get_form_data("status_kk_pindah")
+        y_before = pdf.get_y()
+        x_before = pdf.get_x()
+        pdf.multi_cell(40, 5, "11. Anggota yang Pindah", 1, 'L')
+        pdf.set_xy(x_before + 40, y_before)
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        x1 = x_before + 45
+        pdf.set_xy(x1, y_before)
+        for i in range(2):
+            checked = "X" if pilihan_yang_pindah[i] == jawaban_yang_pindah else ""
+            pdf.cell(5, 5, checked, 1, 0, 'C')
+            pdf.cell(35, 5, pilihan_labels[i], 0, 1, 'L')
+            pdf.set_x(x1)
+        x2 = x1 + 80
+        pdf.set_xy(x2, y_before)
+        checked = "X" if pilihan_yang_pindah[2] == jawaban_yang_pindah else ""
+        pdf.cell(5, 5, checked, 1, 0, 'C')
+        pdf.cell(35, 5, pilihan_labels[2], 0, 1, 'L')
+        pdf.ln(5)
+
+        # 12. Daftar Anggota Keluarga yang Pindah
+        pdf.cell(190, 5, "12. Daftar Anggota Keluarga yang Pindah", 0, 1)
+        pdf.set_font("Arial", size=8)
+        pdf.set_fill_color(200, 200, 200)
+        pdf.cell(10, 5, "NO", 1, 0, 'C', True)
+        pdf.cell(80, 5, "NIK", 1, 0, 'C', True)
+        pdf.cell(75, 5, "NAMA LENGKAP", 1, 0, 'C', True)
+        pdf.cell(35, 5, "Hub Keluarga (SHDK)", 1, 1, 'C', True)
+        pdf.cell(10, 0, "", 0, 0)
+        for _ in range(16):
+            pdf.cell(5, 5, "", 1, 0)
+        pdf.cell(75, 0, "", 0, 0)
+        pdf.cell(35, 0, "", 0, 1)
+        for i in range(1, jumlah_anggota + 1):
+            pdf.cell(10, 5, str(i), 1, 0, 'C')
+            nik_anggota = get_form_data(f"anggota_nik_{i}").replace(" ", "")
+            for j in range(16):
+                digit = nik_anggota[j] if j < len(nik_anggota) else ""
+                pdf.cell(5, 5, digit, 1, 0, 'C')
+            pdf.cell(75, 5, get_form_data(f"anggota_nama_{i}"), 1, 0)
+            pdf.cell(35, 5, get_form_data(f"anggota_shdk_{i}"), 1, 1)
+        pdf.set_font("Arial", size=8)
+        pdf.ln(1)
+
+        # 13-16. Bagian Orang Asing
+        pdf.set_font("Arial", style="B", size=6)
+        pdf.cell(190, 4, "Diisi oleh Penduduk OA (Orang Asing) pemegang ITAS yg mengajukan SKTT dan OA Pemegang ITAP yg Mengajukan Sur Ket Kependudukan Lainnya", 0, 1)
+        pdf.set_font("Arial", size=8)
+        pdf.cell(40, 5, "13. Nama Sponsor", 1)
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        pdf.cell(155, 5, get_form_data("nama_sponsor"), 1, 1)
+        pdf.cell(40, 5, "14. Tipe Sponsor", 1)
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        x_tipe = pdf.get_x()
+        tipe_pilihan = ["Organisasi", "Pemerintah", "Perusahaan", "Perorangan", "Tanpa Sponsor"]
+        tipe_jawaban = get_form_data("tipe_sponsor")
+        pdf.set_x(x_tipe)
+        for tipe in tipe_pilihan:
+            checked = "X" if tipe == tipe_jawaban else ""
+            pdf.cell(5, 5, checked, 1, 0, 'C')
+            pdf.cell(25, 5, tipe, 0, 0, 'L')
+        pdf.ln(5)
+        pdf.cell(40, 5, "15. Alamat Sponsor", 1)
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        pdf.cell(155, 5, get_form_data("alamat_sponsor"), 1, 1)
+        pdf.set_xy(pdf.get_x(), pdf.get_y())
+        pdf.multi_cell(40, 4, "16. Nomor dan Tanggal\n     KITAS & KITAP", 1, 'L')
+        pdf.set_xy(pdf.get_x() + 0, pdf.get_y() - 8)
+        pdf.cell(5, 6, ":", 0, 0, 'C')
+        nomor_kitas = get_form_data('nomor_kitas_kitap')
+        for i in range(12):
+            digit = nomor_kitas[i] if i < len(nomor_kitas) else ""
+            pdf.cell(5, 5, digit, 1, 0, 'C')
+        pdf.cell(5, 5, "", 0, 0)
+        tgl_kitas = get_form_data('tanggal_kitas_kitap')
+        for i in range(12):
+            digit = tgl_kitas[i] if i < len(tgl_kitas) else ""
+            pdf.cell(5, 5, digit, 1, 0, 'C')
+        pdf.ln(6)
+        pdf.cell(45, 3, "", 0, 0)
+        pdf.cell(59, 3, "Nomor", 0, 0, 'C')
+        pdf.cell(10, 3, "", 0, 0)
+        pdf.cell(54, 3, "Tanggal Masa Berlaku", 0, 1, 'C')
+
+        # 17-20. Bagian SKPLN
+        pdf.set_font("Arial", style="B", size=6)
+        pdf.cell(190, 4, "Diisi oleh Penduduk yang Mengajukan Surat Keterangan Pindah Luar Negeri (SKPLN)", 0, 1)
+        pdf.set_font("Arial", size=8)
+        pdf.cell(40, 5, "17. Negara Tujuan", 1)
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        pdf.cell(115, 5, get_form_data("negara_tujuan"), 1, 0)
+        pdf.cell(5, 5, "", 0, 0)
+        pdf.cell(20, 5, "Kode Negara:", 0, 0, 'R')
+        kode_negara = get_form_data("kode_negara")
+        for i in range(3):
+            digit = kode_negara[i] if i < len(kode_negara) else ""
+            pdf.cell(5, 5, digit, 1, 0, 'C')
+        pdf.ln(5)
+        pdf.cell(40, 5, "18. Alamat Tujuan", 1)
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        pdf.cell(155, 5, get_form_data("alamat_negara_tujuan"), 1, 1)
+        pdf.cell(40, 5, "19. Penanggung Jawab", 1)
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        pdf.cell(155, 5, get_form_data("penanggung_jawab"), 1, 1)
+        pdf.cell(40, 5, "20. Rencana Pindah", 1)
+        pdf.cell(5, 5, ":", 0, 0, 'C')
+        pdf.cell(7, 5, "Tgl.", 0, 0, 'C')
+        pdf.cell(10, 5, get_form_data('rencana_pindah_tgl'), 1, 0, 'C')
+        pdf.cell(5, 5, "", 0, 0, 'C')
+        pdf.cell(7, 5, "Bln.", 0, 0, 'C')
+        pdf.cell(10, 5, get_form_data('rencana_pindah_bln'), 1, 0, 'C')
+        pdf.cell(5, 5, "", 0, 0, 'C')
+        pdf.cell(7, 5, "Thn.", 0, 0, 'C')
+        thn = get_form_data('rencana_pindah_thn')
+        for i in range(4):
+            digit = thn[i] if i < len(thn) else ""
+            pdf.cell(5, 5, digit, 1, 0, 'C')
+        pdf.ln(4)
+
+        # Tanda Tangan
+        pdf.set_font("Arial", size=7)
+        y_ttd = pdf.get_y()
+        x_left = 10
+        x_right = 120
+        tanggal_str = datetime.now().strftime('%d-%m-%Y')
+        pdf.set_xy(x_right, y_ttd)
+        pdf.cell(70, 5, f"Garut, {tanggal_str}", 0, 1, 'C')
+        pdf.set_xy(x_left, y_ttd + 6)
+        pdf.cell(70, 2, "Mengetahui,", 0, 0, 'C')
+        pdf.set_xy(x_right, y_ttd + 6)
+        pdf.cell(70, 0, "Pemohon", 0, 1, 'C')
+        pdf.set_xy(x_left, y_ttd + 7)
+        pdf.multi_cell(70, 3, "Kepala Dinas Kependudukan dan\nPencatatan Sipil Kab. Garut", 0, 'C')
+        
+        if signature:
+            try:
+                signature_png = prepare_signature_image(signature)
+                pdf.image(io.BytesIO(signature_png), x=x_right + 20, y=y_ttd + 7, w=30, h=15)
+            except (ValueError, TypeError, OSError):
+                # Handle error jika format signature salah
+                pass
+
+        pdf.set_xy(x_left, y_ttd + 20)
+        pdf.set_font("Arial", size=7)
+        pdf.cell(70, 4, "....................................................", 0, 0, 'C')
+        pdf.set_xy(x_right, y_ttd + 20)
+        # Gunakan custom_signer_name jika ada, fallback ke nama_lengkap_pemohon
+        custom_signer = get_form_data("custom_signer_name")
+        nama_pemohon = get_form_data("nama_lengkap_pemohon")
+        signer_name = custom_signer.strip() if custom_signer.strip() else nama_pemohon
+        pdf.cell(70, 4, signer_name.upper(), 0, 1, 'C')
+
 else:
     # Dependencies not available, create a dummy blueprint
     f103_bp = None
@@ -646,8 +1136,8 @@ def test_f103_module():
         print("⚠️ F-1.03 module test failed - dependencies missing")
         return False
 
-# Run test saat module diimport (hanya jika tidak dalam testing)
-if __name__ != "__main__":
+# Run test saat module diimport (hanya jika tidak dalam testing dan bukan di worker render)
+if __name__ != "__main__" and multiprocessing.current_process().name == "MainProcess":
     try:
         test_f103_module()
     except Exception as e:
@@ -0,0 +1,33 @@
+"""Entry point job render F-1.03 untuk worker ProcessPoolExecutor (spawn).
+
+Worker hanya mengimpor modul ini; f103 baru diimpor saat job pertama dijalankan.
+Jangan menambahkan import app, koneksi DB, thread, atau pool di level modul ini.
+"""
+import io
+
+
+def warm_up():
+    """Initializer worker: siapkan template satu anggota supaya job pertama tidak lambat."""
+    try:
+        from f103 import get_f103_template
+        get_f103_template(1, False)
+    except Exception as e:
+        print(f"⚠️ F-1.03 worker warm-up failed: {e}")
+
+
+def render_pdf(data, signature, jumlah_anggota):
+    """Job worker: generate_pdf_f103 dalam bentuk bytes (bisa di-pickle)."""
+    from f103 import generate_pdf_f103
+    return bytes(generate_pdf_f103(data, signature, jumlah_anggota))
+
+
+def encode_image(pdf_bytes, dpi, pil_format, quality):
+    """Job worker: rasterisasi halaman pertama lalu encode ke format gambar."""
+    from f103 import rasterize_first_page
+    img = rasterize_first_page(pdf_bytes, dpi)
+    buffer = io.BytesIO()
+    if pil_format == 'PNG':
+        img.save(buffer, format='PNG')
+    else:
+        img.save(buffer, format=pil_format, quality=quality)
+    return buffer.getvalue()
@@ -0,0 +1,13 @@
+"""Konfigurasi bersama tes backend: modul backend bisa diimpor langsung dan folder
+arsip/backup diarahkan ke folder sementara supaya tes tidak menulis ke ./arsip."""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+_TEST_ROOT = tempfile.mkdtemp(prefix='sicakap_test_')
+os.environ.setdefault('ARSIP_UPLOAD_FOLDER', os.path.join(_TEST_ROOT, 'arsip'))
+os.environ.setdefault('BACKUP_FOLDER', os.path.join(_TEST_ROOT, 'backup'))
@@ -0,0 +1,109 @@
+"""Tes backup arsip inkremental: hard-link file yang tidak berubah, salin yang berubah."""
+import os
+
+import pytest
+
+from backup import MANIFEST_NAME, backup_arsip_incremental
+
+
+def write(path, data, mtime=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def arsip(tmp_path):
+    src = tmp_path / 'arsip'
+    write(str(src / '2026/202610/20261016/a.pdf'), b'aaaa', mtime=1_700_000_000)
+    write(str(src / '2026/202610/20261016/b.pdf'), b'bbbb', mtime=1_700_000_000)
+    write(str(src / '2026/202610/20261017/c.pdf'), b'cccc', mtime=1_700_000_000)
+    # File sementara upload tidak ikut dibackup
+    write(str(src / '2026/202610/20261017/.x.part'), b'partial')
+    return str(src), str(tmp_path / 'backup')
+
+
+def snapshot(backup_dir, day):
+    return os.path.join(backup_dir, f'arsip_backup_{day}')
+
+
+def test_first_backup_copies_everything(arsip):
+    src, backup_dir = arsip
+    report = backup_arsip_incremental(src, backup_dir, snapshot_date='2026-10-17')
+    assert (report['files'], report['copied'], report['linked']) == (3, 3, 0)
+    assert report['bytes_copied'] == 12
+    snap = snapshot(backup_dir, '2026-10-17')
+    assert read(os.path.join(snap, '2026/202610/20261016/a.pdf')) == b'aaaa'
+    assert not os.path.exists(os.path.join(snap, '2026/202610/20261017/.x.part'))
+
+
+def test_unchanged_files_are_hard_linked_modified_files_copied(arsip):
+    src, backup_dir = arsip
+    backup_arsip_incremental(src, backup_dir, snapshot_date='2026-10-17')
+    write(os.path.join(src, '2026/202610/20261016/b.pdf'), b'BBBB-baru', mtime=1_700_000_500)
+    write(os.path.join(src, '2026/202610/20261018/d.pdf'), b'dddd', mtime=1_700_000_500)
+    os.remove(os.path.join(src, '2026/202610/20261017/c.pdf'))
+
+    report = backup_arsip_incremental(src, backup_dir, snapshot_date='2026-10-18')
+    old, new = snapshot(backup_dir, '2026-10-17'), snapshot(backup_dir, '2026-10-18')
+    rel_a, rel_b = '2026/202610/20261016/a.pdf', '2026/202610/20261016/b.pdf'
+
+    assert os.stat(os.path.join(old, rel_a)).st_ino == os.stat(os.path.join(new, rel_a)).st_ino
+    assert os.stat(os.path.join(old, rel_b)).st_ino != os.stat(os.path.join(new, rel_b)).st_ino
+    assert read(os.path.join(new, rel_b)) == b'BBBB-baru'
+    assert read(os.path.join(old, rel_b)) == b'bbbb'
+    assert (report['files'], report['linked'], report['copied'], report['removed']) == (3, 1, 2, 1)
+    assert report['bytes_skipped'] == 4
+
+
+def test_same_content_under_new_name_is_linked(arsip):
+    src, backup_dir = arsip
+    backup_arsip_incremental(src, backup_dir, snapshot_date='2026-10-17')
+    os.rename(os.path.join(src, '2026/202610/20261017/c.pdf'), os.path.join(src, '2026/202610/20261017/c2.pdf'))
+    report = backup_arsip_incremental(src, backup_dir, snapshot_date='2026-10-18')
+    assert report['copied'] == 0 and report['linked'] == 3
+    old = os.path.join(snapshot(backup_dir, '2026-10-17'), '2026/202610/20261017/c.pdf')
+    new = os.path.join(snapshot(backup_dir, '2026-10-18'), '2026/202610/20261017/c2.pdf')
+    assert os.stat(old).st_ino == os.stat(new).st_ino
+
+
+def test_rerun_same_day_swaps_snapshot(arsip):
+    src, backup_dir = arsip
+    backup_arsip_incremental(src, backup_dir, snapshot_date='2026-10-18')
+    write(os.path.join(src, '2026/202610/20261016/a.pdf'), b'AAAA-baru', mtime=1_700_000_900)
+
+    report = backup_arsip_incremental(src, backup_dir, snapshot_date='2026-10-18')
+    snap = snapshot(backup_dir, '2026-10-18')
+    assert (report['linked'], report['copied']) == (2, 1)
+    # File yang di-link dari snapshot lama tetap utuh setelah snapshot lama dihapus
+    assert read(os.path.join(snap, '2026/202610/20261016/a.pdf')) == b'AAAA-baru'
+    assert read(os.path.join(snap, '2026/202610/20261016/b.pdf')) == b'bbbb'
+    assert sorted(os.listdir(backup_dir)) == sorted([MANIFEST_NAME, 'arsip_backup_2026-10-18'])
+
+
+@pytest.mark.parametrize('manifest', [None, b'{rusak', b'{"2026/202610/20261016/a.pdf": {"stored": "hilang/a.pdf", '
+                                                        b'"size": 4, "mtime": 1700000000, "sha256": "x"}}'])
+def test_missing_or_broken_manifest_falls_back_to_full_copy(arsip, manifest):
+    src, backup_dir = arsip
+    backup_arsip_incremental(src, backup_dir, snapshot_date='2026-10-17')
+    manifest_path = os.path.join(backup_dir, MANIFEST_NAME)
+    if manifest is None:
+        os.remove(manifest_path)
+    else:
+        write(manifest_path, manifest)
+
+    report = backup_arsip_incremental(src, backup_dir, snapshot_date='2026-10-18')
+    new = snapshot(backup_dir, '2026-10-18')
+    assert (report['files'], report['copied'], report['linked']) == (3, 3, 0)
+    rel_a = '2026/202610/20261016/a.pdf'
+    assert os.stat(os.path.join(new, rel_a)).st_ino != os.stat(os.path.join(snapshot(backup_dir, '2026-10-17'), rel_a)).st_ino
+    assert read(os.path.join(new, rel_a)) == b'aaaa'
+    # Manifest baru ditulis sehingga backup berikutnya kembali inkremental
+    assert backup_arsip_incremental(src, backup_dir, snapshot_date='2026-10-19')['linked'] == 3
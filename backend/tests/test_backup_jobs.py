@@ -0,0 +1,221 @@
+"""Tes job backup: satu job aktif per jenis, pemangkasan riwayat, dan status gagal."""
+import threading
+import time
+
+import pytest
+
+import backup
+from backup import BackupJob, BackupJobRunner, MemoryJobStore
+
+
+def wait_finished(runner, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = runner.get(job_id)
+        if job['state'] in ('succeeded', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'job {job_id} belum selesai')
+
+
+def finished_job(kind, store):
+    job = BackupJob(kind)
+    assert store.try_start(job) == (True, None)
+    job.state = 'succeeded'
+    store.finish(job)
+    return job
+
+
+def test_memory_store_rejects_second_active_job_of_same_kind():
+    store = MemoryJobStore()
+    first, second, other = BackupJob('db'), BackupJob('db'), BackupJob('arsip')
+    assert store.try_start(first) == (True, None)
+    started, active = store.try_start(second)
+    assert not started and active['id'] == first.id
+    assert store.try_start(other) == (True, None)
+    first.state = 'succeeded'
+    store.finish(first)
+    assert store.try_start(second) == (True, None)
+
+
+def test_memory_store_finish_of_stale_job_keeps_current_active():
+    store = MemoryJobStore()
+    old, current = BackupJob('db'), BackupJob('db')
+    store.try_start(old)
+    store.finish(old)
+    store.try_start(current)
+    store.finish(old)  # dipanggil ulang: tidak boleh melepas job aktif yang lain
+    assert not store.try_start(BackupJob('db'))[0]
+
+
+def test_memory_store_trims_finished_history_but_keeps_active():
+    store = MemoryJobStore(max_history=2)
+    jobs = [finished_job('db', store) for _ in range(4)]
+    active = BackupJob('arsip')
+    store.try_start(active)
+    listed = [job['id'] for job in store.list()]
+    assert listed == [active.id, jobs[-1].id]
+    assert store.get(jobs[0].id) is None
+
+
+def test_runner_marks_exception_as_failed_and_frees_kind():
+    runner = BackupJobRunner(max_workers=1)
+
+    def boom(job):
+        job.add_progress(10)
+        raise RuntimeError('pg_dump gagal')
+
+    job, created = runner.submit('db', boom)
+    assert created and job['state'] in ('queued', 'running', 'failed')
+    result = wait_finished(runner, job['id'])
+    assert result['state'] == 'failed'
+    assert result['error'] == 'pg_dump gagal'
+    assert result['bytes_processed'] == 10 and result['finished_at']
+
+    job, created = runner.submit('db', lambda job: {'output': 'ok', 'report': {'n': 1}})
+    assert created
+    result = wait_finished(runner, job['id'])
+    assert (result['state'], result['output'], result['report']) == ('succeeded', 'ok', {'n': 1})
+
+
+def test_runner_returns_active_job_for_duplicate_kind():
+    runner = BackupJobRunner(max_workers=2)
+    release = threading.Event()
+    job, created = runner.submit('db', lambda job: release.wait(5) and {})
+    try:
+        duplicate, created_again = runner.submit('db', lambda job: {})
+        assert created and not created_again
+        assert duplicate['id'] == job['id']
+    finally:
+        release.set()
+    assert wait_finished(runner, job['id'])['state'] == 'succeeded'
+
+
+def test_runner_submit_failure_releases_kind():
+    runner = BackupJobRunner(max_workers=1)
+    runner._executor.shutdown()
+    with pytest.raises(RuntimeError):
+        runner.submit('db', lambda job: {})
+    runner._executor = backup.ThreadPoolExecutor(max_workers=1)
+    job, created = runner.submit('db', lambda job: {})
+    assert created and wait_finished(runner, job['id'])['state'] == 'succeeded'
+
+
+def test_progress_saved_at_most_once_per_interval(monkeypatch):
+    monkeypatch.setattr(backup, 'PROGRESS_SAVE_INTERVAL', 60)
+    saved = []
+    job = BackupJob('db')
+    job.on_progress = lambda j: saved.append(j.bytes_processed)
+    for _ in range(5):
+        job.add_progress(1)
+    assert saved == [1] and job.bytes_processed == 5
+
+
+# --- DatabaseJobStore dengan koneksi palsu ---
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._row = None
+
+    def execute(self, sql, values=()):
+        sql = ' '.join(sql.split())
+        self.conn.db.statements.append((sql, values))
+        self._row = None
+        if sql.startswith('SELECT pg_try_advisory_lock'):
+            key = tuple(values)
+            ok = self.conn.db.locks.get(key) in (None, self.conn)
+            if ok:
+                self.conn.db.locks[key] = self.conn
+            self._row = (ok,)
+        elif sql.startswith('SELECT pg_advisory_unlock'):
+            self.conn.db.locks.pop(tuple(values), None)
+        elif sql.startswith('SELECT'):
+            self._row = self.conn.db.active_row
+
+    def fetchone(self):
+        return self._row
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+        self.autocommit = False
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+        # Seperti PostgreSQL: advisory lock sesi lepas saat koneksi ditutup
+        for key, owner in list(self.db.locks.items()):
+            if owner is self:
+                del self.db.locks[key]
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.locks = {}
+        self.statements = []
+        self.active_row = None
+
+    def executed(self, prefix):
+        return [values for sql, values in self.statements if sql.startswith(prefix)]
+
+
+@pytest.fixture
+def db_store(monkeypatch):
+    pytest.importorskip('flask')
+    pytest.importorskip('psycopg2')
+    import app as sicakap
+
+    db = FakeDatabase()
+    monkeypatch.setattr(sicakap, 'require_schema', lambda: None)
+    monkeypatch.setattr(sicakap, '_connect_db', lambda: FakeConnection(db))
+    monkeypatch.setattr(sicakap, 'get_db_connection', lambda: FakeConnection(db))
+    return sicakap.DatabaseJobStore(max_history=3), db
+
+
+def test_database_store_one_active_job_per_kind(db_store):
+    store, db = db_store
+    first = BackupJob('db')
+    assert store.try_start(first) == (True, None)
+    started, active = store.try_start(BackupJob('db'))
+    # Lock dipegang, baris belum terbaca: tetap dilaporkan sebagai job aktif
+    assert not started and active['state'] == 'queued'
+    assert store.try_start(BackupJob('arsip'))[0]
+
+    first.state = 'succeeded'
+    store.finish(first)
+    assert store.try_start(BackupJob('db'))[0]
+
+
+def test_database_store_recovers_stale_rows_on_start(db_store):
+    store, db = db_store
+    job = BackupJob('db')
+    store.try_start(job)
+    stale = db.executed("UPDATE backup_jobs SET state = 'failed'")
+    assert len(stale) == 1 and stale[0][1] == 'db'
+    inserted = db.executed('INSERT INTO backup_jobs')
+    assert inserted[0][:3] == (job.id, 'db', 'queued')
+
+
+def test_database_store_finish_trims_history_and_unlocks(db_store):
+    store, db = db_store
+    job = BackupJob('db')
+    store.try_start(job)
+    conn = store._conns[job.id][0]
+    job.state = 'failed'
+    job.error = 'gagal'
+    store.finish(job)
+    assert db.executed('DELETE FROM backup_jobs') == [(3,)]
+    assert db.executed('SELECT pg_advisory_unlock')
+    assert conn.closed and not db.locks and job.id not in store._conns
+    # Dipanggil lagi (mis. dari dua jalur error) tidak menulis apa pun
+    count = len(db.statements)
+    store.finish(job)
+    assert len(db.statements) == count
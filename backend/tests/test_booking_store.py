@@ -0,0 +1,115 @@
+"""Tes MemoryBookingStore tanpa database: nomor bebas diambil dari heap per tanggal."""
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('psycopg2')
+
+import app as sicakap  # noqa: E402
+
+DAY = '2026-10-18'
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = sicakap.MemoryBookingStore(ttl=60, reap_interval=0.05)
+    store.used = {DAY: {602, 604}}
+    store.queries = 0
+
+    def load_used(reg_date, start_number, end_number):
+        store.queries += 1
+        return {n for n in store.used.get(reg_date, ()) if start_number <= n <= end_number}
+
+    monkeypatch.setattr(store, '_load_used_numbers', load_used)
+    return store
+
+
+def test_book_skips_used_numbers_and_queries_once(store):
+    numbers = [store.book(f's{i}', DAY, 601, 606)[0] for i in range(4)]
+    assert numbers == [601, 603, 605, 606]
+    assert store.book('s9', DAY, 601, 606) == (None, None)
+    assert store.queries == 1
+
+
+def test_same_session_gets_existing_number(store):
+    assert store.book('a', DAY, 601, 606) == (601, 'new')
+    assert store.book('a', DAY, 601, 606) == (601, 'existing')
+    assert store.count_for_date(DAY) == 1
+
+
+def test_release_returns_number_confirm_consumes_it(store):
+    store.book('a', DAY, 601, 606)
+    store.book('b', DAY, 601, 606)
+    assert store.release('a', 601) == DAY
+    assert store.book('c', DAY, 601, 606)[0] == 601
+    assert store.confirm('b', 603) == DAY
+    assert store.release('b', 603) is None
+    assert [store.book(s, DAY, 601, 606)[0] for s in 'de'] == [605, 606]
+
+
+def test_expired_booking_returns_to_pool(store):
+    store.book('a', DAY, 601, 606)
+    with store._cond:
+        assert store._reap_expired(time.time() + store.ttl + 1) == 1
+    assert store.count_for_date(DAY) == 0
+    assert store.book('b', DAY, 601, 606)[0] == 601
+
+
+def test_reaper_thread_expires_bookings(store):
+    store.ttl = 0.1
+    store.start()
+    store.book('a', DAY, 601, 606)
+    deadline = time.time() + 5
+    while store._bookings and time.time() < deadline:
+        time.sleep(0.02)
+    assert not store._bookings and not store._by_session and not store._by_date
+
+
+def test_stale_heap_entry_after_rebook_is_ignored(store):
+    store.book('a', DAY, 601, 606)
+    expires_at = store._bookings[(DAY, 601)][1]
+    store.release('a', 601)
+    store.book('b', DAY, 601, 606)
+    with store._cond:
+        # Entri heap milik reservasi 'a' sudah basi dan tidak boleh menghapus milik 'b'
+        assert store._reap_expired(expires_at) == 0
+    assert store._bookings[(DAY, 601)][0] == 'b'
+
+
+def test_release_session_releases_every_date(store):
+    store.book('a', DAY, 601, 606)
+    store.book('a', '2026-10-19', 601, 606)
+    store.book('b', DAY, 601, 606)
+    assert store.release_session('a') == 2
+    assert 'a' not in store._by_session
+    assert store.count_for_date('2026-10-19') == 0
+    assert store.book('c', DAY, 601, 606)[0] == 601
+
+
+def test_clear_date_only_touches_that_date(store):
+    store.book('a', DAY, 601, 606)
+    store.book('b', '2026-10-19', 601, 606)
+    assert store.clear_date(DAY) == 1
+    assert store.count_for_date(DAY) == 0
+    assert store.count_for_date('2026-10-19') == 1
+    # Heap tanggal itu diisi ulang dari pencatatan
+    store.used[DAY] |= {601}
+    assert store.book('c', DAY, 601, 606)[0] == 603
+    assert store.queries == 3
+
+
+def test_mark_used_and_range_change(store):
+    store.book('a', DAY, 601, 606)
+    store.mark_used(DAY, 603)
+    assert store.book('b', DAY, 601, 606)[0] == 605
+    # Rentang berubah di pengaturan: heap diisi ulang untuk rentang baru
+    store.used[DAY] |= {601, 603, 605}
+    assert store.book('c', DAY, 601, 610)[0] == 606
+
+
+def test_forget_free_numbers_reloads_from_database(store):
+    store.book('a', DAY, 601, 606)
+    store.used[DAY] = set()  # pencatatan 602 dan 604 dihapus
+    store.forget_free_numbers()
+    assert store.book('b', DAY, 601, 606)[0] == 602
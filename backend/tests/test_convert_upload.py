@@ -0,0 +1,61 @@
+"""Tes /api/arsip/convert-upload: nama file divalidasi sebelum file apa pun disimpan."""
+import io
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('psycopg2')
+
+import app as sicakap  # noqa: E402
+
+PDF = b'%PDF-1.4\n1 0 obj <<>> endobj\ntrailer <<>>\n%%EOF\n'
+
+
+@pytest.fixture
+def processed(monkeypatch, tmp_path):
+    monkeypatch.setattr(sicakap, '_startup_done', True)
+    monkeypatch.setitem(sicakap.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(sicakap, 'UPLOAD_SESSION_FOLDER', str(tmp_path / '.uploads'))
+    processed = []
+    monkeypatch.setattr(sicakap, 'schedule_arsip_processing', processed.extend)
+    return processed
+
+
+@pytest.fixture
+def client(processed):
+    client = sicakap.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update({'user_id': 1, 'username': 'tes', 'role': 'admin', 'logged_in': True})
+    return client
+
+
+def upload_single_pdf(client, custom_filename):
+    return client.post('/api/arsip/convert-upload', data={
+        'customFileName': custom_filename,
+        'files': [(io.BytesIO(PDF), 'scan.pdf')],
+    }, content_type='multipart/form-data')
+
+
+def saved_files(tmp_path):
+    return sorted(str(p.relative_to(tmp_path)) for p in tmp_path.rglob('*') if p.is_file())
+
+
+def test_single_pdf_saved_as_is(client, processed, tmp_path):
+    response = upload_single_pdf(client, '20261018_601_D')
+    assert response.status_code == 200
+    assert response.get_json()['archive_path'] == '2026/202610/20261018/20261018_601_D.pdf'
+    assert (tmp_path / '2026/202610/20261018/20261018_601_D.pdf').read_bytes() == PDF
+    assert processed == [('2026/202610/20261018/20261018_601_D.pdf', None)]
+
+
+@pytest.mark.parametrize('custom_filename', [
+    '20261399_601_D',      # tanggal tidak ada
+    '20261018_0_D',        # nomor registrasi di luar rentang
+    '20261018_99999999999_D',
+    '20261018_601_ABCDEFGHIJK',  # kode layanan lebih dari 10 karakter
+])
+def test_single_pdf_with_invalid_name_rejected_before_saving(client, processed, tmp_path, custom_filename):
+    response = upload_single_pdf(client, custom_filename)
+    assert response.status_code == 400
+    assert saved_files(tmp_path) == []
+    assert processed == []
@@ -0,0 +1,180 @@
+"""Tes DatabasePool dengan koneksi palsu: timeout saat pool habis, pelepasan koneksi
+request di teardown_appcontext, dan pembuangan koneksi yang rusak."""
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+psycopg2 = pytest.importorskip('psycopg2')
+
+import app as sicakap  # noqa: E402
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = 0
+        self.in_transaction = False
+        self.broken = False
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        if self.in_transaction:
+            return psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        if self.broken:
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+        self.conn.in_transaction = True
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """Daftar koneksi palsu yang dibuka pool (menggantikan _connect_db)."""
+    opened = []
+
+    def connect():
+        conn = FakeConnection(len(opened) + 1)
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(sicakap, '_connect_db', connect)
+    return opened
+
+
+def test_getconn_times_out_when_pool_exhausted(opened):
+    pool = sicakap.DatabasePool(0, 2, timeout=0.1)
+    first, second = pool.getconn(), pool.getconn()
+    started = time.time()
+    with pytest.raises(Exception, match='pool exhausted'):
+        pool.getconn()
+    assert time.time() - started >= 0.1
+    assert pool.metrics()['timeouts'] == 1
+    assert pool.metrics()['in_use'] == 2
+
+    pool.putconn(first)
+    assert pool.getconn() is first
+    pool.putconn(second)
+    assert len(opened) == 2
+
+
+def test_waiting_checkout_gets_released_connection(opened):
+    pool = sicakap.DatabasePool(0, 1, timeout=5)
+    conn = pool.getconn()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.getconn()))
+    waiter.start()
+    time.sleep(0.05)
+    assert pool.metrics()['waiters'] == 1
+    pool.putconn(conn)
+    waiter.join(2)
+    assert got == [conn]
+    assert pool.metrics()['timeouts'] == 0
+
+
+def test_request_connection_released_on_teardown(opened, monkeypatch):
+    pool = sicakap.DatabasePool(0, 1, timeout=0.1)
+    monkeypatch.setattr(sicakap, '_db_pool', pool)
+
+    with sicakap.app.app_context():
+        conn = sicakap.get_db_connection()
+        conn.cursor().execute("UPDATE pencatatan SET status = 'SELESAI'")
+        conn.close()  # Diabaikan: koneksi dipakai bersama sampai teardown
+        assert sicakap.get_db_connection() is conn
+        assert pool.metrics()['in_use'] == 1
+
+    assert conn.released
+    assert pool.metrics()['in_use'] == 0
+    assert pool.metrics()['idle'] == 1
+    # Transaksi yang tertinggal di-rollback sebelum koneksi kembali ke pool
+    assert opened[0].rollbacks == 1
+    assert not opened[0].in_transaction
+
+    with sicakap.app.app_context():
+        assert sicakap.get_db_connection()._conn is opened[0]
+    assert len(opened) == 1
+
+
+def test_connection_outside_request_released_on_close(opened, monkeypatch):
+    pool = sicakap.DatabasePool(0, 1, timeout=0.1)
+    monkeypatch.setattr(sicakap, '_db_pool', pool)
+    conn = sicakap.get_db_connection()
+    conn.close()
+    assert conn.released
+    assert pool.metrics()['in_use'] == 0
+    with pytest.raises(Exception, match='dikembalikan ke pool'):
+        conn.cursor()
+
+
+def test_broken_connection_discarded_on_putconn(opened):
+    pool = sicakap.DatabasePool(0, 2, timeout=0.1)
+    conn = pool.getconn()
+    conn.in_transaction = True
+    conn.broken = True
+    pool.putconn(conn)
+    assert conn.closed
+    assert pool.metrics()['idle'] == 0
+    assert pool.metrics()['discarded'] == 1
+
+    assert pool.getconn() is opened[1]
+
+
+def test_closed_connection_discarded_on_checkout(opened):
+    pool = sicakap.DatabasePool(0, 2, timeout=0.1)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.closed = 2  # Server memutus koneksi selagi idle
+
+    fresh = pool.getconn()
+    assert fresh is opened[1]
+    assert pool.metrics()['discarded'] == 1
+    assert pool.metrics()['in_use'] == 1
+
+
+def test_stale_idle_connection_pinged_before_checkout(opened, monkeypatch):
+    monkeypatch.setattr(sicakap, 'PG_POOL_CHECK_IDLE', 0)
+    pool = sicakap.DatabasePool(0, 2, timeout=0.1)
+    healthy = pool.getconn()
+    pool.putconn(healthy)
+    assert pool.getconn() is healthy  # Ping berhasil, koneksi dipakai lagi
+    assert healthy.rollbacks == 1
+
+    healthy.broken = True
+    pool.putconn(healthy)
+    assert pool.getconn() is opened[1]
+    assert healthy.closed
+    assert pool.metrics()['discarded'] == 1
+
+
+def test_failed_connect_frees_reserved_slot(opened, monkeypatch):
+    pool = sicakap.DatabasePool(0, 1, timeout=0.1)
+
+    def refuse():
+        raise Exception('Cannot connect to database: connection refused')
+
+    monkeypatch.setattr(sicakap, '_connect_db', refuse)
+    with pytest.raises(Exception, match='connection refused'):
+        pool.getconn()
+    assert pool.metrics()['in_use'] == 0
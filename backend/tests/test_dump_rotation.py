@@ -0,0 +1,69 @@
+"""Tes rotasi dump database: dump terbaru per hari dan per bulan, format nama lama dan baru."""
+import os
+
+from backup import rotate_dumps
+
+
+def make(backup_dir, name):
+    path = os.path.join(backup_dir, name)
+    if name.endswith(('.sql', '.dump')):
+        with open(path, 'w') as f:
+            f.write('dump')
+    else:
+        # Format directory pg_dump
+        os.makedirs(path)
+        with open(os.path.join(path, 'toc.dat'), 'w') as f:
+            f.write('toc')
+
+
+def test_rotation_keeps_latest_per_day_and_month_across_formats(tmp_path):
+    backup_dir = str(tmp_path)
+    names = [
+        # Format lama (pg_dump teks, satu per hari)
+        'sicakap_db_backup_2026-07-03.sql',
+        'sicakap_db_backup_2026-07-20.sql',
+        'sicakap_db_backup_2026-08-01.sql',
+        'sicakap_db_backup_2026-09-30.sql',
+        # Format baru: directory dan custom (.dump)
+        'sicakap_db_backup_20260930_180000',
+        'sicakap_db_backup_20261015_080000.dump',
+        'sicakap_db_backup_20261016_080000',
+        'sicakap_db_backup_20261017_070000.dump',
+        'sicakap_db_backup_20261017_190000',
+        # Bukan dump database ini: tidak boleh tersentuh
+        'arsip_backup_2026-07-01',
+        'lain_db_backup_2026-07-01.sql',
+        'sicakap_db_backup_2026-07-01.txt',
+    ]
+    for name in names:
+        make(backup_dir, name)
+
+    removed = rotate_dumps(backup_dir, 'sicakap_db', keep_daily=3, keep_monthly=3)
+
+    assert sorted(os.listdir(backup_dir)) == sorted([
+        # 3 hari terakhir (dump terbaru per hari)
+        'sicakap_db_backup_20261017_190000',
+        'sicakap_db_backup_20261016_080000',
+        'sicakap_db_backup_20261015_080000.dump',
+        # 3 bulan terakhir: Oktober sudah terwakili, September dan Agustus dump terbarunya
+        'sicakap_db_backup_20260930_180000',
+        'sicakap_db_backup_2026-08-01.sql',
+        'arsip_backup_2026-07-01',
+        'lain_db_backup_2026-07-01.sql',
+        'sicakap_db_backup_2026-07-01.txt',
+    ])
+    assert sorted(removed) == sorted([
+        'sicakap_db_backup_2026-07-03.sql',
+        'sicakap_db_backup_2026-07-20.sql',
+        'sicakap_db_backup_2026-09-30.sql',
+        'sicakap_db_backup_20261017_070000.dump',
+    ])
+
+
+def test_old_format_dump_counts_as_start_of_day(tmp_path):
+    backup_dir = str(tmp_path)
+    make(backup_dir, 'sicakap_db_backup_2026-10-17.sql')
+    make(backup_dir, 'sicakap_db_backup_20261017_000500.dump')
+    assert rotate_dumps(backup_dir, 'sicakap_db', keep_daily=1, keep_monthly=1) == [
+        'sicakap_db_backup_2026-10-17.sql'
+    ]
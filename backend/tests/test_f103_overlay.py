@@ -0,0 +1,106 @@
+"""Tes paritas render F-1.03: hasil overlay template harus sama dengan render penuh.
+
+Overlay memakai internal fpdf2 (content stream halaman, resource catalog), jadi tes ini
+yang menjaga rentang versi fpdf2 di requirements_f103.txt:
+
+    python -m pytest tests/test_f103_overlay.py
+"""
+import base64
+import io
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('fpdf')
+pymupdf = pytest.importorskip('pymupdf')
+Image = pytest.importorskip('PIL.Image')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import f103  # noqa: E402
+
+pytestmark = pytest.mark.skipif(f103.f103_bp is None, reason='dependensi F-1.03 tidak lengkap')
+
+PARITY_DPI = 100
+
+
+def signature_data_url():
+    img = Image.new('RGBA', (300, 150), (0, 0, 0, 0))
+    for x in range(20, 280):
+        img.putpixel((x, 75 + (x % 40) - 20), (0, 0, 0, 255))
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def form_data(jumlah_anggota, **extra):
+    data = {
+        'nik_pemohon': '3205123456780001',
+        'nama_lengkap_pemohon': 'Siti Aminah',
+        'no_kk': '3205123456780002',
+        'no_hp': '081234567890',
+        'email': 'siti@example.com',
+        'jenis_permohonan': 'SKPWNI',
+        'klasifikasi_kepindahan': 'ANTAR_KABUPATEN',
+        'alasan_pindah': 'PEKERJAAN',
+        'jenis_kepindahan': 'KEPALA_KELUARGA',
+        'status_kk_pindah': 'NUMPANG_KK',
+        'status_kk_tidak_pindah': 'MEMBUAT_KK_BARU',
+        'jumlah_anggota': jumlah_anggota,
+    }
+    for i in range(1, jumlah_anggota + 1):
+        data[f'anggota_nik_{i}'] = f'3205123456780{i:03d}'
+        data[f'anggota_nama_{i}'] = f'Anggota Keluarga {i}'
+        data[f'anggota_shdk_{i}'] = 'ANAK'
+    data.update(extra)
+    return data
+
+
+def render(data, signature, jumlah_anggota, template_enabled, monkeypatch):
+    monkeypatch.setattr(f103, 'F103_TEMPLATE_ENABLED', template_enabled)
+    return bytes(f103.generate_pdf_f103(data, signature, jumlah_anggota))
+
+
+def page_pixels(pdf_bytes):
+    with pymupdf.open(stream=pdf_bytes, filetype='pdf') as doc:
+        assert doc.page_count == 1
+        pix = doc[0].get_pixmap(dpi=PARITY_DPI, alpha=False)
+        return pix.width, pix.height, pix.samples
+
+
+def page_words(pdf_bytes):
+    """Kata di halaman (terurut): overlay menulis teks statis lebih dulu, jadi urutan ekstraksi berbeda."""
+    with pymupdf.open(stream=pdf_bytes, filetype='pdf') as doc:
+        return sorted(doc[0].get_text().split())
+
+
+CASES = [
+    pytest.param(1, {}, False, id='1-anggota'),
+    pytest.param(10, {}, False, id='10-anggota'),
+    pytest.param(3, {'alasan_pindah': 'LAINNYA', 'alasan_lainnya': 'Ikut suami'}, False, id='alasan-lainnya'),
+    pytest.param(2, {'custom_signer_name': 'Budi'}, True, id='tanda-tangan'),
+]
+
+
+@pytest.mark.parametrize('jumlah_anggota,extra,with_signature', CASES)
+def test_overlay_matches_full_render(monkeypatch, jumlah_anggota, extra, with_signature):
+    lainnya = extra.get('alasan_pindah') == 'LAINNYA'
+    monkeypatch.setattr(f103, 'F103_TEMPLATE_ENABLED', True)
+    assert f103.get_f103_template(jumlah_anggota, lainnya) is not None, 'template tidak terbentuk'
+
+    data = form_data(jumlah_anggota, **extra)
+    signature = signature_data_url() if with_signature else None
+    overlay = render(data, signature, jumlah_anggota, True, monkeypatch)
+    full = render(data, signature, jumlah_anggota, False, monkeypatch)
+
+    assert page_words(overlay) == page_words(full)
+    assert page_pixels(overlay) == page_pixels(full)
+
+
+def test_overlay_does_not_fall_back(monkeypatch):
+    """generate_pdf_f103 diam-diam kembali ke render penuh jika internal fpdf berubah; di sini harus lolos langsung."""
+    monkeypatch.setattr(f103, 'F103_TEMPLATE_ENABLED', True)
+    template = f103.get_f103_template(1, False)
+    assert template is not None
+    out = f103.render_f103_overlay(template, form_data(1), None, 1)
+    assert bytes(out).startswith(b'%PDF-')
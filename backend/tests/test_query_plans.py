@@ -0,0 +1,105 @@
+"""Tes regresi rencana eksekusi: query utama tidak boleh jatuh ke Seq Scan pada pencatatan.
+
+Query dibangun dari fungsi/konstanta yang sama dengan yang dipakai endpoint, jadi
+perubahan query di app.py langsung ikut dites. Tes ini MENGISI ULANG tabel pencatatan,
+jadi hanya jalan terhadap database uji yang disebut eksplisit:
+
+    SICAKAP_PLAN_TEST_DB=sicakap_plan_test PG_USER=... PG_PASS=... python -m pytest tests/test_query_plans.py
+"""
+import json
+import os
+import sys
+from datetime import date
+
+import pytest
+
+TEST_DB = os.getenv('SICAKAP_PLAN_TEST_DB')
+SEED_ROWS = int(os.getenv('SICAKAP_PLAN_TEST_ROWS', '200000'))
+
+pytestmark = pytest.mark.skipif(not TEST_DB, reason='SICAKAP_PLAN_TEST_DB belum diisi')
+
+if TEST_DB:
+    os.environ['PG_DB'] = TEST_DB
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    import app as sicakap  # noqa: E402
+    from bench_search import seed_pencatatan  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def cur():
+    sicakap.ensure_schema(force=True)
+    conn = sicakap._connect_db()
+    cursor = conn.cursor()
+    seed_pencatatan(cursor, SEED_ROWS)
+    conn.commit()
+    yield cursor
+    conn.rollback()
+    cursor.close()
+    conn.close()
+
+
+def plan_nodes(cur, sql, values):
+    cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", tuple(values))
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    nodes = []
+    stack = [plan[0]['Plan']]
+    while stack:
+        node = stack.pop()
+        nodes.append((node.get('Node Type'), node.get('Relation Name'), node.get('Index Name')))
+        stack.extend(node.get('Plans', []))
+    return nodes
+
+
+def assert_no_seq_scan(cur, sql, values):
+    nodes = plan_nodes(cur, sql, values)
+    seq = [n for n in nodes if n[0] == 'Seq Scan' and n[1] == 'pencatatan']
+    assert not seq, f"Seq Scan pada pencatatan: {nodes}"
+    return nodes
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'status': 'DIPROSES'},
+    {'service_code': 'P'},
+    {'start_date': '2024-01-01', 'end_date': '2024-01-31'},
+    {'search': '3205000000007919'},
+])
+def test_pencatatan_page_uses_index(cur, params):
+    where, values = sicakap.build_pencatatan_filters(params)
+    sql, values = sicakap.build_pencatatan_page_query(where, values, per_page=20)
+    assert_no_seq_scan(cur, sql, values)
+
+
+def test_pencatatan_cursor_page_uses_index(cur):
+    where, values = sicakap.build_pencatatan_filters({})
+    sql, values = sicakap.build_pencatatan_page_query(where, values, per_page=20,
+                                                      after=(date(2024, 6, 1), 1000), cursor_mode=True)
+    assert_no_seq_scan(cur, sql, values)
+
+
+@pytest.mark.parametrize('search', ['md5tidakada', '3205000012', '0079190', '601', '3205-00'])
+def test_substring_search_uses_trigram_index(cur, search):
+    cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    if not cur.fetchone():
+        pytest.skip('pg_trgm tidak terpasang')
+    where, values = sicakap.build_pencatatan_filters({'search': search})
+    sql, values = sicakap.build_pencatatan_page_query(where, values, per_page=20)
+    assert_no_seq_scan(cur, sql, values)
+
+
+def test_book_reg_number_uses_index(cur):
+    today = date.today().isoformat()
+    nodes = assert_no_seq_scan(cur, sicakap.FREE_REG_NUMBER_SQL, (601, 800, today, today))
+    assert any(n[2] == 'idx_pencatatan_reg_date_reg_number' for n in nodes), nodes
+
+
+def test_max_reg_number_uses_index(cur):
+    assert_no_seq_scan(cur, sicakap.MAX_REG_NUMBER_SQL, (date.today().isoformat(),))
+
+
+def test_bulk_archive_update_uses_index(cur):
+    row = cur.mogrify("(%s, %s, %s, %s)", (date.today().isoformat(), 601, 'P', 'x.pdf')).decode()
+    sql = sicakap.BULK_ARCHIVE_UPDATE_SQL.replace('%s', row, 1)
+    assert_no_seq_scan(cur, sql, ())
@@ -0,0 +1,90 @@
+"""Tes RenderPool: job yang macet tidak boleh menahan slot setelah timeout."""
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('fpdf')
+
+import f103  # noqa: E402
+from f103 import RenderPool, RenderTimeoutError  # noqa: E402
+
+
+@pytest.fixture
+def pool():
+    pool = RenderPool(max_workers=1, max_queue=0, timeout=1.0)
+    yield pool
+    if pool._executor is not None:
+        pool._recycle(pool._executor)
+
+
+def test_timeout_recycles_worker_and_frees_slot(pool):
+    for _ in range(3):
+        # Tanpa daur ulang, timeout kedua sudah ditolak RenderBusyError karena slot tertahan
+        with pytest.raises(RenderTimeoutError):
+            pool.run(time.sleep, 60)
+    assert pool.run(pow, 2, 10) == 1024
+    stats = pool.stats()
+    assert stats['timeouts'] == 3 and stats['recycled'] == 3 and stats['active'] == 0
+
+
+def test_job_interrupted_by_recycle_is_retried():
+    """Job sehat yang ikut terhenti karena pool didaur ulang (timeout job lain) diulang di pool baru."""
+    pool = RenderPool(max_workers=1, max_queue=1, timeout=30)
+    results = {}
+
+    def healthy():
+        results['value'] = pool.run(pow, 2, 5) if pool.run(time.sleep, 1.0) is None else None
+
+    try:
+        pool.run(pow, 1, 1)  # worker sudah siap sebelum job sehat dikirim
+        executor = pool._executor
+        thread = threading.Thread(target=healthy)
+        thread.start()
+        deadline = time.time() + 10
+        while pool.stats()['active'] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.2)
+        pool._recycle(executor)
+        thread.join(60)
+        assert results.get('value') == 32
+        assert pool._executor is not executor
+        assert pool.stats()['active'] == 0
+    finally:
+        if pool._executor is not None:
+            pool._recycle(pool._executor)
+
+
+def test_batch_hung_item_does_not_block_batch(monkeypatch):
+    """Satu item batch yang macet dilaporkan gagal (timeout); item lain tetap dibuat."""
+    pytest.importorskip('flask')
+    pytest.importorskip('pypdf')
+    import app as sicakap
+
+    pool = RenderPool(max_workers=1, max_queue=4, timeout=8)
+    monkeypatch.setattr(f103, 'render_pool', pool)
+    monkeypatch.setattr(sicakap, '_startup_done', True)
+    original = f103.render_pdf_f103_cached
+
+    def render(data, signature=None, jumlah_anggota=1, wait=None, cache=None):
+        if data.get('nama_lengkap_pemohon') == 'MACET':
+            return pool.run(time.sleep, 600, wait=wait)
+        return original(data, signature, jumlah_anggota, wait=wait, cache=f103.RenderCache(1 << 20, 60))
+
+    monkeypatch.setattr(f103, 'render_pdf_f103_cached', render)
+    client = sicakap.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update({'user_id': 1, 'username': 'tes', 'role': 'admin', 'logged_in': True})
+    try:
+        started = time.time()
+        forms = [{'nama_lengkap_pemohon': 'MACET'}] + [{'nama_lengkap_pemohon': f'Warga {i}'} for i in range(2)]
+        response = client.post('/api/f103/batch', json={'forms': forms})
+        assert response.status_code == 200
+        assert response.headers['X-Batch-Succeeded'] == '2'
+        assert response.headers['X-Batch-Failed'] == '1'
+        assert 'melebihi' in response.headers['X-Batch-Errors']
+        assert time.time() - started < 60
+        response.close()
+    finally:
+        if pool._executor is not None:
+            pool._recycle(pool._executor)
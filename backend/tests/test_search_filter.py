@@ -0,0 +1,38 @@
+"""Tes build_search_filter: pilihan kolom dan pola untuk setiap jenis isian pencarian."""
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('psycopg2')
+
+import app as sicakap  # noqa: E402
+
+
+def test_full_nik_is_exact_match():
+    sql, values = sicakap.build_search_filter(' 3205 1234 5678 0001 ')
+    assert sql == "(nik = %s OR no_kk = %s)"
+    assert values == ['3205123456780001', '3205123456780001']
+
+
+def test_partial_digits_match_substring_of_nik_kk_and_reg_number():
+    sql, values = sicakap.build_search_filter('12 34')
+    assert sql == "(nik LIKE %s OR no_kk LIKE %s OR reg_number::text LIKE %s)"
+    assert values == ['%1234%'] * 3
+
+
+def test_text_without_digits_matches_name_only():
+    sql, values = sicakap.build_search_filter('  siti aminah ')
+    assert sql == "name ILIKE %s"
+    assert values == ['%siti aminah%']
+
+
+@pytest.mark.parametrize('term', ['3201-12', '320l123456', '12 34a'])
+def test_text_with_digits_also_matches_nik_and_kk(term):
+    sql, values = sicakap.build_search_filter(term)
+    assert 'nik LIKE %s' in sql and 'no_kk LIKE %s' in sql and 'name ILIKE %s' in sql
+    # Isian dipakai apa adanya: spasi dan tanda baca tidak dibuang
+    assert values == [f'%{term}%'] * 4
+
+
+def test_like_wildcards_are_escaped():
+    _, values = sicakap.build_search_filter('50%_a')
+    assert values == ['%50\\%\\_a%'] * 4
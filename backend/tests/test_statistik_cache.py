@@ -0,0 +1,66 @@
+"""Tes cache /api/statistik: hasil yang dihitung sebelum invalidasi tidak boleh disimpan."""
+import threading
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('psycopg2')
+
+import app as sicakap  # noqa: E402
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(sicakap, '_startup_done', True)
+    monkeypatch.setattr(sicakap, 'require_schema', lambda: None)
+    monkeypatch.setattr(sicakap, '_statistik_cache', {})
+    client = sicakap.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update({'user_id': 1, 'username': 'tes', 'role': 'admin', 'logged_in': True})
+    return client
+
+
+def test_result_computed_before_invalidation_is_not_cached(client, monkeypatch):
+    started = threading.Event()
+    proceed = threading.Event()
+    calls = []
+
+    def compute(today):
+        calls.append(today)
+        if len(calls) == 1:
+            # Hitungan pertama sedang berjalan saat data pencatatan berubah
+            started.set()
+            assert proceed.wait(5)
+        return {'total': len(calls), 'per_status': {}, 'per_service': {}, 'hari_ini': 0}
+
+    monkeypatch.setattr(sicakap, 'compute_statistik', compute)
+    responses = []
+    request = threading.Thread(target=lambda: responses.append(client.get('/api/statistik')))
+    request.start()
+    assert started.wait(5)
+    sicakap.invalidate_statistik_cache()
+    proceed.set()
+    request.join(5)
+
+    assert responses[0].status_code == 200
+    assert responses[0].get_json()['total'] == 1
+    assert sicakap._statistik_cache == {}
+
+    # Request berikutnya menghitung ulang dan hasil segar ini yang di-cache
+    assert client.get('/api/statistik').get_json()['total'] == 2
+    assert client.get('/api/statistik').get_json()['total'] == 2
+    assert len(calls) == 2
+
+
+def test_cached_result_served_until_invalidated(client, monkeypatch):
+    calls = []
+
+    def compute(today):
+        calls.append(today)
+        return {'total': len(calls), 'per_status': {}, 'per_service': {}, 'hari_ini': 0}
+
+    monkeypatch.setattr(sicakap, 'compute_statistik', compute)
+    assert client.get('/api/statistik').get_json()['total'] == 1
+    assert client.get('/api/statistik').get_json()['total'] == 1
+    sicakap.invalidate_statistik_cache()
+    assert client.get('/api/statistik').get_json()['total'] == 2
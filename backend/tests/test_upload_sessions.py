@@ -0,0 +1,173 @@
+"""Tes upload arsip bertahap (/api/arsip/uploads): offset, melanjutkan upload, dan finalisasi."""
+import hashlib
+import os
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('psycopg2')
+
+import app as sicakap  # noqa: E402
+
+CONTENT = b'%PDF-1.4\n' + bytes(range(256)) * 40
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+
+@pytest.fixture
+def processed(monkeypatch, tmp_path):
+    monkeypatch.setattr(sicakap, '_startup_done', True)
+    monkeypatch.setitem(sicakap.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(sicakap, 'UPLOAD_SESSION_FOLDER', str(tmp_path / '.uploads'))
+    monkeypatch.setattr(sicakap, '_upload_hashers', {})
+    processed = []
+    monkeypatch.setattr(sicakap, 'schedule_arsip_processing', processed.extend)
+    return processed
+
+
+@pytest.fixture
+def client(processed):
+    client = sicakap.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update({'user_id': 1, 'username': 'tes', 'role': 'admin', 'logged_in': True})
+    return client
+
+
+def start_upload(client, **overrides):
+    data = {
+        'filename': 'berkas.pdf',
+        'reg_date': '2026-10-18',
+        'reg_number': 601,
+        'nik': '3205123456780001',
+        'total_size': len(CONTENT),
+        'sha256': SHA256,
+    }
+    data.update(overrides)
+    return client.post('/api/arsip/uploads', json=data)
+
+
+def patch(client, upload_id, offset, body):
+    return client.patch(f'/api/arsip/uploads/{upload_id}?offset={offset}', data=body,
+                        content_type='application/octet-stream')
+
+
+def archive_file(tmp_path, archive_path):
+    return tmp_path / archive_path
+
+
+def test_chunks_in_order_complete_upload(client, processed, tmp_path):
+    session = start_upload(client).get_json()
+    assert session['archive_path'] == '2026/202610/20261018/20261018_601_3205123456780001.pdf'
+
+    first = patch(client, session['upload_id'], 0, CONTENT[:4000])
+    assert first.get_json() == {'upload_id': session['upload_id'], 'offset': 4000, 'complete': False}
+    done = patch(client, session['upload_id'], 4000, CONTENT[4000:]).get_json()
+
+    assert done['complete'] is True
+    assert done['sha256'] == SHA256
+    assert archive_file(tmp_path, session['archive_path']).read_bytes() == CONTENT
+    assert processed == [(session['archive_path'], SHA256)]
+    assert client.get(f"/api/arsip/uploads/{session['upload_id']}").status_code == 404
+
+
+def test_out_of_order_chunk_rejected_with_current_offset(client, processed):
+    upload_id = start_upload(client).get_json()['upload_id']
+    assert patch(client, upload_id, 0, CONTENT[:1000]).status_code == 200
+
+    skipped = patch(client, upload_id, 3000, CONTENT[3000:])
+    assert skipped.status_code == 409
+    assert skipped.get_json()['offset'] == 1000
+    replayed = patch(client, upload_id, 0, CONTENT[:1000])
+    assert replayed.status_code == 409
+    assert replayed.get_json()['offset'] == 1000
+
+    # Potongan yang ditolak tidak mengubah isi .part
+    assert client.get(f'/api/arsip/uploads/{upload_id}').get_json()['offset'] == 1000
+    assert processed == []
+
+
+def test_resumed_upload_continues_from_stored_offset(client, processed, tmp_path, monkeypatch):
+    session = start_upload(client).get_json()
+    upload_id = session['upload_id']
+    patch(client, upload_id, 0, CONTENT[:2500])
+    # Worker lain / setelah restart: state sha256 di memori hilang, dihitung ulang dari .part
+    monkeypatch.setattr(sicakap, '_upload_hashers', {})
+
+    status = client.get(f'/api/arsip/uploads/{upload_id}').get_json()
+    assert status['offset'] == 2500
+    assert status['total_size'] == len(CONTENT)
+    done = patch(client, upload_id, status['offset'], CONTENT[status['offset']:]).get_json()
+
+    assert done['complete'] is True
+    assert archive_file(tmp_path, session['archive_path']).read_bytes() == CONTENT
+    assert processed == [(session['archive_path'], SHA256)]
+
+
+def test_truncated_part_file_is_resumed_not_finalized(client, processed, tmp_path):
+    session = start_upload(client).get_json()
+    upload_id = session['upload_id']
+    patch(client, upload_id, 0, CONTENT[:6000])
+    part_path = sicakap._upload_part_path(sicakap._load_upload_meta(upload_id))
+    # Ekor .part hilang (disk penuh / crash) setelah klien mengira 6000 byte tersimpan
+    with open(part_path, 'r+b') as f:
+        f.truncate(4096)
+
+    stale = patch(client, upload_id, 6000, CONTENT[6000:])
+    assert stale.status_code == 409
+    assert stale.get_json()['offset'] == 4096
+    assert not archive_file(tmp_path, session['archive_path']).exists()
+
+    done = patch(client, upload_id, 4096, CONTENT[4096:]).get_json()
+    assert done['complete'] is True
+    assert done['sha256'] == SHA256
+    assert archive_file(tmp_path, session['archive_path']).read_bytes() == CONTENT
+
+
+def test_corrupted_upload_fails_checksum_and_removes_session(client, processed, tmp_path):
+    session = start_upload(client).get_json()
+    upload_id = session['upload_id']
+    part_path = sicakap._upload_part_path(sicakap._load_upload_meta(upload_id))
+    corrupted = CONTENT[:-1] + b'\x00'
+
+    response = patch(client, upload_id, 0, corrupted)
+    assert response.status_code == 422
+    assert response.get_json()['sha256'] == hashlib.sha256(corrupted).hexdigest()
+    assert not os.path.exists(part_path)
+    assert not archive_file(tmp_path, session['archive_path']).exists()
+    assert client.get(f'/api/arsip/uploads/{upload_id}').status_code == 404
+    assert processed == []
+
+
+def test_data_beyond_total_size_is_truncated_back(client, processed):
+    upload_id = start_upload(client).get_json()['upload_id']
+    patch(client, upload_id, 0, CONTENT[:1000])
+
+    response = patch(client, upload_id, 1000, CONTENT[1000:] + b'ekstra')
+    assert response.status_code == 400
+    assert response.get_json()['offset'] == 1000
+    assert client.get(f'/api/arsip/uploads/{upload_id}').get_json()['offset'] == 1000
+
+
+def test_busy_session_rejects_concurrent_chunk(client, processed):
+    fcntl = pytest.importorskip('fcntl')
+    upload_id = start_upload(client).get_json()['upload_id']
+    with open(sicakap._upload_meta_path(upload_id)) as held:
+        fcntl.flock(held.fileno(), fcntl.LOCK_EX)
+        busy = patch(client, upload_id, 0, CONTENT)
+        cancel = client.delete(f'/api/arsip/uploads/{upload_id}')
+    assert busy.status_code == 409
+    assert busy.get_json()['offset'] == 0
+    assert cancel.status_code == 409
+
+    assert client.delete(f'/api/arsip/uploads/{upload_id}').status_code == 200
+    assert patch(client, upload_id, 0, CONTENT).status_code == 404
+
+
+@pytest.mark.parametrize('overrides', [
+    {'filename': 'berkas.exe'},
+    {'total_size': 0},
+    {'nik': '12345'},
+    {'reg_number': 'abc'},
+    {'reg_date': '18-10-2026'},
+])
+def test_invalid_session_request_rejected(client, overrides):
+    assert start_upload(client, **overrides).status_code == 400
@@ -100,6 +100,13 @@ export async function backupArsip() {
     return handleResponse(response);
 }
 
+export async function getBackupJob(jobId) {
+    const response = await fetch(`${API_URL}/backup/jobs/${jobId}`, {
+        credentials: 'include'
+    });
+    return handleResponse(response);
+}
+
 // Redaksi functions
 export async function fetchAllRedaksi() {
     const response = await fetch(`${API_URL}/redaksi`, {
@@ -6,7 +6,7 @@ import {
     deleteRedaksi, uploadArsip, setupDatabase, bookRegNumber,
     releaseRegNumber, confirmRegNumber, getSettings, updateSettings,
     resetNumbers, downloadArsip, resetDailyNumbers, getDateStatistics,
-    switchSystemDate
+    switchSystemDate, getBackupJob
 } from './api.js';
 import { initRedaksiManagement } from './redaksi.js';
 
@@ -1228,11 +1228,27 @@ document.getElementById('inputForm').addEventListener('submit', async (e) => {
     }
 });
 
+// Backup berjalan di server sebagai job; pantau statusnya sampai selesai
+async function waitForBackupJob(jobId, label) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        const job = await getBackupJob(jobId);
+        if (job.state === 'succeeded') {
+            showNotification(`Backup ${label} berhasil!`, 'success');
+            return job;
+        }
+        if (job.state === 'failed') {
+            throw new Error(job.error || `Backup ${label} gagal`);
+        }
+    }
+}
+
 // Handler untuk tombol backup
 document.getElementById('backupDbBtn')?.addEventListener('click', async () => {
     try {
         const result = await backupDatabase();
-        showNotification(result.message || 'Backup database berhasil!', 'success');
+        showNotification(result.message || 'Backup database dijadwalkan', 'success');
+        if (result.job_id) await waitForBackupJob(result.job_id, 'database');
     } catch (error) {
         showNotification('Backup database gagal', 'error');
     }
@@ -1241,7 +1257,8 @@ document.getElementById('backupDbBtn')?.addEventListener('click', async () => {
 document.getElementById('backupArsipBtn')?.addEventListener('click', async () => {
     try {
         const result = await backupArsip();
-        showNotification(result.message || 'Backup arsip berhasil!', 'success');
+        showNotification(result.message || 'Backup arsip dijadwalkan', 'success');
+        if (result.job_id) await waitForBackupJob(result.job_id, 'arsip');
     } catch (error) {
         showNotification('Backup arsip gagal', 'error');
     }
@@ -2789,6 +2806,8 @@ window.generateF103PDF = async function() {
                 throw new Error('Endpoint F-1.03 belum tersedia di backend. Silakan hubungi administrator untuk mengaktifkan fitur ini.');
             } else if (response.status === 500) {
                 throw new Error('Server error: Endpoint F-1.03 belum diimplementasi di backend.');
+            } else if (response.status === 503 || response.status === 504) {
+                throw new Error('Server sedang sibuk membuat formulir. Silakan coba lagi beberapa saat.');
             }
             throw new Error(`HTTP ${response.status}: ${response.statusText}`);
         }
@@ -2894,6 +2913,8 @@ window.generateF103Image = async function() {
                 throw new Error('Endpoint F-1.03 image belum tersedia di backend. Silakan hubungi administrator untuk mengaktifkan fitur ini.');
             } else if (response.status === 500) {
                 throw new Error('Server error: Endpoint F-1.03 image belum diimplementasi di backend.');
+            } else if (response.status === 503 || response.status === 504) {
+                throw new Error('Server sedang sibuk membuat formulir. Silakan coba lagi beberapa saat.');
             }
             throw new Error(`HTTP ${response.status}: ${response.statusText}`);
         }